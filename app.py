@@ -1,10 +1,28 @@
+import time
+_IMPORT_STARTED = time.perf_counter()  # Start of the startup-time report
+
 import os
 import cv2
 import json
+import threading
+import numpy as np
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, Response, send_from_directory
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import Flask, render_template, request, jsonify, Response, send_from_directory, g
 from werkzeug.utils import secure_filename
 from src.utils.detection import AnimalDetector
+from src.services.inference_scheduler import InferenceScheduler
+from src.services.worker_pool import InferenceWorkerPool
+from src.services.result_cache import ResultCache
+from src.services.job_manager import JobManager
+from src.services.segmented_video import SegmentedVideoProcessor
+from src.services.frame_broadcaster import LiveSource
+from src.services.source_manager import SourceManager
+from src.services.artifact_storage import ArtifactStorage
+from src.utils.video_pipeline import VideoPipeline
+from src.utils.frame_sampling import FrameSampler, MotionDetector
+from src.utils.tracking import MultiObjectTracker, TrackingDetector
+from src.utils.metrics import REGISTRY, REQUESTS, REQUEST_ERRORS, REQUEST_SECONDS, timed
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -22,19 +40,193 @@ class AnimalDetectionApp:
     Object-oriented wrapper for the Flask animal detection app.
     Handles initialization, routing, and detection logic.
     """
+    # Routes that cannot answer until the model is loaded
+    MODEL_ENDPOINTS = {'detect_animals', 'detect_batch', 'create_job', 'video_feed', 'source_feed'}
+    RENDER_MODES = ('media', 'overlay', 'none')
+
     def __init__(self, app: Flask):
         self.app = app
         self.detector = None
+        self.result_cache = None
+        self.segment_processor = None
+        self.live_sources = {}
+        self.source_manager = None
+        self._live_lock = threading.Lock()
+        self._io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-writer')
+        self._ready = threading.Event()
+        self._load_lock = threading.Lock()
+        self.startup = {'state': 'pending', 'stage': None, 'error': None, 'started': time.perf_counter(),
+                        'timings': {'app_import': time.perf_counter() - _IMPORT_STARTED}}
         self._configure_app()
+        self.jobs = JobManager(max_concurrent=self.app.config['JOBS_MAX_CONCURRENT'])
+        self.storage = ArtifactStorage(
+            [self.app.config['UPLOAD_FOLDER'], os.path.join('static', 'results')],
+            max_bytes=self.app.config['STORAGE_MAX_MB'] * 1024 * 1024,
+            max_age=self.app.config['STORAGE_MAX_AGE_HOURS'] * 3600,
+            sweep_interval=self.app.config['STORAGE_SWEEP_SECONDS']
+        ).start()
         self._register_routes()
-        self.initialize_detector()  # Always initialize detector at startup
+        if self.app.config['STARTUP_MODE'] == 'eager':
+            self.load_model()
+        elif self.app.config['STARTUP_MODE'] == 'background':
+            threading.Thread(target=self._load_in_background, name='model-loader', daemon=True).start()
 
     def _configure_app(self):
         self.app.config['UPLOAD_FOLDER'] = 'uploads'
         self.app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024  # 32MB max file size
         self.app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'avi', 'mov'}
+        self.app.config['IMAGE_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
+        self.app.config['BATCH_MAX_IMAGES'] = 64  # Max images per /detect/batch request
+        self.app.config['BATCH_SIZE'] = 16  # Max images per forward pass
+        # Inference backend: 'torch', 'onnx' or 'openvino'; model size n/s/m/l/x; optional INT8 calibration
+        self.app.config['MODEL_PATH'] = os.environ.get('MODEL_PATH') or None
+        # Class map, thresholds, colours and alert messages (JSON / YAML); config/taxonomy.json by default
+        self.app.config['TAXONOMY_PATH'] = os.environ.get('TAXONOMY_PATH') or None
+        self.app.config['MODEL_BACKEND'] = os.environ.get('MODEL_BACKEND', 'torch')
+        self.app.config['MODEL_SIZE'] = os.environ.get('MODEL_SIZE', 'x')
+        self.app.config['MODEL_INT8'] = os.environ.get('MODEL_INT8', '0') == '1'
+        self.app.config['MODEL_CALIBRATION_DIR'] = os.environ.get('MODEL_CALIBRATION_DIR') or None
+        # 'eager' loads the model before serving, 'background' serves / and the health endpoints
+        # right away while loading, 'lazy' loads on the first request that needs the model
+        self.app.config['STARTUP_MODE'] = os.environ.get('STARTUP_MODE', 'eager')
+        # Input shapes to warm up: "640" is a 640x640 square, "640x480" is width x height
+        self.app.config['WARMUP_SIZES'] = self._parse_sizes(os.environ.get('WARMUP_SIZES', '640,640x480'))
+        # Sliced inference for high-resolution images: overlapping tiles merged with NMS
+        self.app.config['TILING_ENABLED'] = os.environ.get('TILING', '0') == '1'
+        self.app.config['TILE_SIZE'] = int(os.environ.get('TILE_SIZE', 640))
+        self.app.config['TILE_OVERLAP'] = float(os.environ.get('TILE_OVERLAP', 0.2))
+        self.app.config['TILE_BATCH_SIZE'] = int(os.environ.get('TILE_BATCH_SIZE', 8))
+        self.app.config['TILE_MIN_SIDE'] = int(os.environ.get('TILE_MIN_SIDE', 1280))
+        # Empty-frame prefilter: a small low-resolution model decides which images reach the full model
+        self.app.config['PREFILTER_ENABLED'] = os.environ.get('PREFILTER', '0') == '1'
+        self.app.config['PREFILTER_MODEL_SIZE'] = os.environ.get('PREFILTER_MODEL_SIZE', 'n')
+        self.app.config['PREFILTER_MODEL_PATH'] = os.environ.get('PREFILTER_MODEL_PATH') or None
+        self.app.config['PREFILTER_IMGSZ'] = int(os.environ.get('PREFILTER_IMGSZ', 320))
+        self.app.config['PREFILTER_THRESHOLD'] = float(os.environ.get('PREFILTER_THRESHOLD', 0.1))
+        self.app.config['PREFILTER_MIN_STD'] = float(os.environ.get('PREFILTER_MIN_STD', 0))
+        # Micro-batching scheduler shared by /detect, video processing and /video_feed
+        self.app.config['SCHEDULER_ENABLED'] = os.environ.get('INFERENCE_SCHEDULER', '0') == '1'
+        self.app.config['SCHEDULER_MAX_BATCH'] = int(os.environ.get('SCHEDULER_MAX_BATCH', 8))
+        self.app.config['SCHEDULER_MAX_WAIT_MS'] = float(os.environ.get('SCHEDULER_MAX_WAIT_MS', 5))
+        self.app.config['VIDEO_QUEUE_SIZE'] = 8  # Frames buffered between decode / infer / encode stages
+        self.app.config['JOBS_MAX_CONCURRENT'] = int(os.environ.get('JOBS_MAX_CONCURRENT', 2))  # Background video jobs
+        # Retention of uploads/ and static/results/: total size and hours since last access (0 disables either)
+        self.app.config['STORAGE_MAX_MB'] = int(os.environ.get('STORAGE_MAX_MB', 5120))
+        self.app.config['STORAGE_MAX_AGE_HOURS'] = float(os.environ.get('STORAGE_MAX_AGE_HOURS', 168))
+        self.app.config['STORAGE_SWEEP_SECONDS'] = float(os.environ.get('STORAGE_SWEEP_SECONDS', 300))
+        # 'media' returns annotated files, 'overlay' returns boxes for the browser to draw over the original,
+        # 'none' returns detections only and skips drawing entirely
+        self.app.config['RESULT_RENDER'] = os.environ.get('RESULT_RENDER', 'media')
+        # Fonts for drawn labels; emoji need a colour emoji font (e.g. Noto Color Emoji)
+        self.app.config['ANNOTATION_FONT'] = os.environ.get('ANNOTATION_FONT') or None
+        self.app.config['ANNOTATION_EMOJI_FONT'] = os.environ.get('ANNOTATION_EMOJI_FONT') or None
+        self.app.config['ANNOTATION_FONT_SIZE'] = int(os.environ.get('ANNOTATION_FONT_SIZE', 16))
+        # Raw image uploads: 'async' (written off the request path), 'sync' or 'none'
+        self.app.config['UPLOAD_PERSIST'] = os.environ.get('UPLOAD_PERSIST', 'async')
+        # Content-addressed result cache: in-memory LRU plus optional SQLite file
+        self.app.config['RESULT_CACHE_ENABLED'] = os.environ.get('RESULT_CACHE', '1') == '1'
+        self.app.config['RESULT_CACHE_MAX_MB'] = int(os.environ.get('RESULT_CACHE_MAX_MB', 64))
+        self.app.config['RESULT_CACHE_DB'] = os.environ.get('RESULT_CACHE_DB') or None
+        # Which video frames get full detection: 'stride', 'motion' or 'fps'
+        self.app.config['VIDEO_SAMPLING_POLICY'] = os.environ.get('VIDEO_SAMPLING_POLICY', 'stride')
+        self.app.config['VIDEO_SAMPLING_STRIDE'] = int(os.environ.get('VIDEO_SAMPLING_STRIDE', 5))
+        self.app.config['VIDEO_SAMPLING_MAX_FPS'] = float(os.environ.get('VIDEO_SAMPLING_MAX_FPS', 2))
+        self.app.config['VIDEO_MOTION_THRESHOLD'] = float(os.environ.get('VIDEO_MOTION_THRESHOLD', 0.01))
+        # Detector runs a lost track is kept; frames the sampler skips don't age tracks
+        self.app.config['TRACK_MAX_AGE'] = int(os.environ.get('TRACK_MAX_AGE', 6))
+        self.app.config['REALTIME_DETECT_EVERY'] = int(os.environ.get('REALTIME_DETECT_EVERY', 5))
+        # One shared capture loop per realtime source; viewers choose fps / quality with query parameters
+        self.app.config['REALTIME_MAX_FPS'] = float(os.environ.get('REALTIME_MAX_FPS', 0))
+        self.app.config['REALTIME_JPEG_QUALITY'] = int(os.environ.get('REALTIME_JPEG_QUALITY', 80))
+        self.app.config['REALTIME_IDLE_TIMEOUT'] = float(os.environ.get('REALTIME_IDLE_TIMEOUT', 10))
+        # Camera registry (JSON / YAML) served on /video_feed/<source_id>; the SOURCES_* settings
+        # override the file's scheduler section
+        self.app.config['SOURCES_CONFIG'] = os.environ.get('SOURCES_CONFIG') or None
+        self.app.config['SOURCES_POLICY'] = os.environ.get('SOURCES_POLICY') or None
+        self.app.config['SOURCES_BATCH_SIZE'] = int(os.environ['SOURCES_BATCH_SIZE']) \
+            if os.environ.get('SOURCES_BATCH_SIZE') else None
+        self.app.config['SOURCES_MAX_FPS'] = float(os.environ['SOURCES_MAX_FPS']) \
+            if os.environ.get('SOURCES_MAX_FPS') else None
+        # Multi-process worker pool: N processes, each with its own model copy (0 runs inline)
+        self.app.config['WORKER_POOL_SIZE'] = int(os.environ.get('INFERENCE_WORKERS', 0))
+        self.app.config['WORKER_TORCH_THREADS'] = int(os.environ.get('WORKER_TORCH_THREADS', 0)) or None
+        self.app.config['WORKER_CPU_AFFINITY'] = self._parse_affinity(os.environ.get('WORKER_CPU_AFFINITY', ''))
+        # Parallel segments for long videos: worker processes that each decode and detect a slice of the file
+        self.app.config['VIDEO_SEGMENT_WORKERS'] = int(os.environ.get('VIDEO_SEGMENT_WORKERS', 0))
+        self.app.config['VIDEO_MIN_SEGMENT_SECONDS'] = float(os.environ.get('VIDEO_MIN_SEGMENT_SECONDS', 10))
+        # ASGI serving (src/api/asgi.py): inference slots, queued requests beyond them, seconds a queued
+        # request may wait for a slot, and the per-request deadline (clients can lower it with X-Request-Timeout)
+        self.app.config['ASGI_MAX_CONCURRENT'] = int(os.environ.get('ASGI_MAX_CONCURRENT', 2))
+        self.app.config['ASGI_MAX_QUEUE'] = int(os.environ.get('ASGI_MAX_QUEUE', 16))
+        self.app.config['ASGI_MAX_WAIT_SECONDS'] = float(os.environ.get('ASGI_MAX_WAIT_SECONDS', 10))
+        self.app.config['ASGI_REQUEST_TIMEOUT'] = float(os.environ.get('ASGI_REQUEST_TIMEOUT', 60))
         os.makedirs(self.app.config['UPLOAD_FOLDER'], exist_ok=True)
         os.makedirs('static/results', exist_ok=True)
+        # Invalid VIDEO_SAMPLING_* settings fail at startup instead of on every video upload
+        self.create_frame_sampler()
+
+    @staticmethod
+    def _parse_affinity(value: str):
+        """Parse 'auto' or per-worker core lists such as '0-7;8-15' into the worker pool format"""
+        if not value or value == 'auto':
+            return value or None
+        groups = []
+        for group in value.split(';'):
+            cores = []
+            for part in group.split(','):
+                if '-' in part:
+                    start, end = part.split('-')
+                    cores.extend(range(int(start), int(end) + 1))
+                elif part.strip():
+                    cores.append(int(part))
+            groups.append(cores)
+        return groups
+
+    def _inference_parallelism(self) -> int:
+        """How many frames the video pipeline should keep in inference at once"""
+        if isinstance(self.detector, InferenceWorkerPool):
+            return self.detector.num_workers
+        if getattr(self.detector, 'scheduler', None) is not None:
+            return self.detector.scheduler.max_batch_size
+        return 1
+
+    def create_frame_sampler(self) -> FrameSampler:
+        """Build a frame sampler for one video from the VIDEO_SAMPLING_* settings"""
+        return FrameSampler(
+            policy=self.app.config['VIDEO_SAMPLING_POLICY'],
+            stride=self.app.config['VIDEO_SAMPLING_STRIDE'],
+            max_fps=self.app.config['VIDEO_SAMPLING_MAX_FPS'],
+            motion=MotionDetector(min_changed_fraction=self.app.config['VIDEO_MOTION_THRESHOLD'])
+        )
+
+    def _detector_options(self) -> dict:
+        """AnimalDetector model selection arguments from the MODEL_* settings"""
+        return {
+            'backend': self.app.config['MODEL_BACKEND'],
+            'model_size': self.app.config['MODEL_SIZE'],
+            'int8': self.app.config['MODEL_INT8'],
+            'calibration_dir': self.app.config['MODEL_CALIBRATION_DIR'],
+            'taxonomy': self.app.config['TAXONOMY_PATH'],
+            'tiling': {
+                'tile_size': self.app.config['TILE_SIZE'],
+                'overlap': self.app.config['TILE_OVERLAP'],
+                'batch_size': self.app.config['TILE_BATCH_SIZE'],
+                'min_side': self.app.config['TILE_MIN_SIDE'],
+            } if self.app.config['TILING_ENABLED'] else None,
+            'prefilter': {
+                'model_size': self.app.config['PREFILTER_MODEL_SIZE'],
+                'model_path': self.app.config['PREFILTER_MODEL_PATH'],
+                'backend': self.app.config['MODEL_BACKEND'],
+                'imgsz': self.app.config['PREFILTER_IMGSZ'],
+                'threshold': self.app.config['PREFILTER_THRESHOLD'],
+                'min_std': self.app.config['PREFILTER_MIN_STD'],
+            } if self.app.config['PREFILTER_ENABLED'] else None,
+            'annotation': {
+                'font_path': self.app.config['ANNOTATION_FONT'],
+                'emoji_font_path': self.app.config['ANNOTATION_EMOJI_FONT'],
+                'font_size': self.app.config['ANNOTATION_FONT_SIZE'],
+            },
+        }
 
     def allowed_file(self, filename):
         return '.' in filename and \
@@ -42,16 +234,180 @@ class AnimalDetectionApp:
 
     def initialize_detector(self):
         """Initialize the animal detector on first request"""
+        if self.result_cache is None and self.app.config['RESULT_CACHE_ENABLED']:
+            self.result_cache = ResultCache(max_bytes=self.app.config['RESULT_CACHE_MAX_MB'] * 1024 * 1024,
+                                            db_path=self.app.config['RESULT_CACHE_DB'])
+        if self.segment_processor is None and self.app.config['VIDEO_SEGMENT_WORKERS'] > 0:
+            self.segment_processor = SegmentedVideoProcessor(
+                self.app.config['VIDEO_SEGMENT_WORKERS'],
+                model_path=self.app.config['MODEL_PATH'],
+                conf_threshold=0.5,
+                iou_threshold=0.45,
+                min_segment_seconds=self.app.config['VIDEO_MIN_SEGMENT_SECONDS'],
+                queue_size=self.app.config['VIDEO_QUEUE_SIZE'],
+                detector_options=self._detector_options()
+            )
         if self.detector is None:
             print("Initializing Animal Detector...")
-            self.detector = AnimalDetector(conf_threshold=0.5, iou_threshold=0.45)
+            if self.app.config['WORKER_POOL_SIZE'] > 0:
+                self.detector = InferenceWorkerPool(
+                    self.app.config['WORKER_POOL_SIZE'],
+                    model_path=self.app.config['MODEL_PATH'],
+                    detector_options=self._detector_options(),
+                    conf_threshold=0.5,
+                    iou_threshold=0.45,
+                    torch_threads=self.app.config['WORKER_TORCH_THREADS'],
+                    cpu_affinity=self.app.config['WORKER_CPU_AFFINITY']
+                )
+                print("Animal Detector initialized!")
+                return
+            self.detector = AnimalDetector(model_path=self.app.config['MODEL_PATH'], conf_threshold=0.5,
+                                           iou_threshold=0.45, **self._detector_options())
+            if self.app.config['SCHEDULER_ENABLED']:
+                self.detector.scheduler = InferenceScheduler(
+                    self.detector,
+                    max_batch_size=self.app.config['SCHEDULER_MAX_BATCH'],
+                    max_wait_ms=self.app.config['SCHEDULER_MAX_WAIT_MS']
+                ).start()
             print("Animal Detector initialized!")
 
+    @staticmethod
+    def _parse_sizes(value: str) -> list:
+        """Parse WARMUP_SIZES such as '640,640x480' into (height, width) pairs"""
+        shapes = []
+        for part in value.split(','):
+            part = part.strip().lower()
+            if not part:
+                continue
+            width, _, height = part.partition('x')
+            shapes.append((int(height or width), int(width)))
+        return shapes
+
+    def _warmup_plan(self):
+        """Shapes and batch sizes the detector will actually see"""
+        shapes = list(self.app.config['WARMUP_SIZES'])
+        if self.app.config['TILING_ENABLED']:
+            shapes.append((self.app.config['TILE_SIZE'], self.app.config['TILE_SIZE']))
+        batch_sizes = [1]
+        if self.app.config['SCHEDULER_ENABLED'] and self.app.config['SCHEDULER_MAX_BATCH'] > 1:
+            batch_sizes.append(self.app.config['SCHEDULER_MAX_BATCH'])
+        return list(dict.fromkeys(shapes)), batch_sizes
+
+    def load_model(self):
+        """
+        Import the inference stack, load the weights, warm up and start camera sources,
+        recording how long each step takes. Safe to call more than once.
+        """
+        with self._load_lock:
+            if self._ready.is_set():
+                return
+            timings = self.startup['timings']
+            self.startup.update(state='loading', error=None)
+            try:
+                self.startup['stage'] = 'imports'
+                started = time.perf_counter()
+                if self.app.config['WORKER_POOL_SIZE'] == 0:
+                    import torch  # noqa: F401
+                    import ultralytics  # noqa: F401
+                timings['imports'] = time.perf_counter() - started
+                self.startup['stage'] = 'weights'
+                started = time.perf_counter()
+                self.initialize_detector()
+                timings['weight_load'] = time.perf_counter() - started
+                self.startup['stage'] = 'warmup'
+                shapes, batch_sizes = self._warmup_plan()
+                timings['first_inference'] = self.detector.warmup(shapes, batch_sizes)
+                self.startup['stage'] = 'sources'
+                self.start_sources()
+            except Exception as e:
+                self.startup.update(state='failed', error=str(e))
+                raise
+            timings['total'] = time.perf_counter() - _IMPORT_STARTED
+            self.startup.update(state='ready', stage=None)
+            self._ready.set()
+            print("Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+
+    def _load_in_background(self):
+        try:
+            self.load_model()
+        except Exception:
+            import traceback
+            traceback.print_exc()
+
+    def startup_status(self) -> dict:
+        """Readiness details for /ready and 503 responses"""
+        return {
+            'ready': self._ready.is_set(),
+            'mode': self.app.config['STARTUP_MODE'],
+            'state': self.startup['state'],
+            'stage': self.startup['stage'],
+            'error': self.startup['error'],
+            'elapsed': time.perf_counter() - self.startup['started'],
+            'timings': self.startup['timings'],
+        }
+
+    def start_sources(self):
+        """Start the reader threads and shared scheduler of the configured cameras, if any"""
+        if self.source_manager is not None or not self.app.config['SOURCES_CONFIG']:
+            return
+        self.source_manager = SourceManager.from_config(
+            self.app.config['SOURCES_CONFIG'], self.detector,
+            policy=self.app.config['SOURCES_POLICY'],
+            batch_size=self.app.config['SOURCES_BATCH_SIZE'],
+            max_fps=self.app.config['SOURCES_MAX_FPS']
+        ).start()
+        print(f"Started {len(self.source_manager.sources)} camera sources")
+
     def register(self):
         # No-op for compatibility; initialization is now always done in __init__
         return self
 
     def _register_routes(self):
+        @self.app.before_request
+        def start_request_timer():
+            g.request_started = time.perf_counter()
+
+        @self.app.after_request
+        def record_request(response):
+            """Count every response per endpoint and status, and time it"""
+            endpoint = request.endpoint or 'not_found'
+            REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+            if response.status_code >= 500:
+                REQUEST_ERRORS.inc(endpoint=endpoint)
+            started = g.get('request_started')
+            if started is not None:
+                REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+            return response
+
+        @self.app.route('/metrics')
+        def metrics():
+            """Prometheus text-format metrics: stage latencies, requests, detections, realtime FPS"""
+            return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+        @self.app.before_request
+        def require_model():
+            """Hold back requests that need the model until it is loaded"""
+            if request.endpoint not in self.MODEL_ENDPOINTS:
+                return None
+            unavailable = self.model_unavailable()
+            if unavailable is None:
+                return None
+            response = jsonify(unavailable)
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+
+        @self.app.route('/health')
+        def health():
+            """Liveness: the server is up, whether or not the model has loaded"""
+            return jsonify({'status': 'ok'})
+
+        @self.app.route('/ready')
+        def ready():
+            """Readiness: 200 once the model is loaded and warmed up, 503 with progress before that"""
+            status = self.startup_status()
+            return jsonify(status), 200 if status['ready'] else 503
+
         @self.app.route('/')
         def index():
             """Render the main page"""
@@ -63,75 +419,114 @@ class AnimalDetectionApp:
             if 'file' not in request.files:
                 return jsonify({'error': 'No file part'}), 400
             file = request.files['file']
-            file_type = request.form.get('type', 'image')
-            if file.filename == '':
-                return jsonify({'error': 'No selected file'}), 400
-            if not self.allowed_file(file.filename):
-                return jsonify({'error': 'File type not allowed'}), 400
             try:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                file_ext = os.path.splitext(file.filename)[1].lower()
-                filename = f"{file_type}_{timestamp}{file_ext}"
-                filepath = os.path.join(self.app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                if file_type == 'video':
-                    output_filename = f"detected_{filename}"
-                    output_path = os.path.join('static', 'results', output_filename)
-                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                    cap = cv2.VideoCapture(filepath)
-                    fps = int(cap.get(cv2.CAP_PROP_FPS))
-                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-                    detections = []
-                    frame_count = 0
-                    while cap.isOpened():
-                        ret, frame = cap.read()
-                        if not ret:
-                            break
-                        if frame_count % 5 == 0:
-                            processed_frame, frame_detections = self.detector.process_frame(frame)
-                            detections.extend(frame_detections)
-                            out.write(processed_frame)
-                        else:
-                            out.write(frame)
-                        frame_count += 1
-                    cap.release()
-                    out.release()
-                    return jsonify({
-                        'type': 'video',
-                        'detections': detections,
-                        'video_url': f"/{output_path}",
-                        'timestamp': datetime.now().isoformat()
-                    })
-                else:
-                    detections = self.detector.detect_animals(filepath)
-                    if detections:
-                        img = cv2.imread(filepath)
-                        for det in detections:
-                            x1, y1, x2, y2 = det['bbox']
-                            label = f"{det['class']} {det['confidence']:.2f}"
-                            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                            cv2.putText(img, label, (x1, y1 - 10), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                        result_filename = f"detected_{filename}"
-                        result_path = os.path.join('static', 'results', result_filename)
-                        cv2.imwrite(result_path, img)
-                        result_url = f"/static/results/{result_filename}"
-                    else:
-                        result_url = f"/{filepath}"
-                    return jsonify({
-                        'type': 'image',
-                        'detections': detections,
-                        'image_url': result_url,
-                        'timestamp': datetime.now().isoformat()
-                    })
+                return jsonify(self.detect_upload(file.read(), file.filename, request.form.get('type', 'image'),
+                                                  request.form.get('render')))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             except Exception as e:
                 import traceback
                 traceback.print_exc()
                 return jsonify({'error': f'Error processing file: {str(e)}'}), 500
 
+        @self.app.route('/jobs', methods=['POST'])
+        def create_job():
+            """Queue a video for background processing and return its job ID immediately"""
+            if 'file' not in request.files:
+                return jsonify({'error': 'No file part'}), 400
+            file = request.files['file']
+            try:
+                job = self.submit_video_job(file.save, file.filename, request.form.get('render'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 503
+            return jsonify(self.job_links(job)), 202
+
+        @self.app.route('/jobs', methods=['GET'])
+        def list_jobs():
+            """List known jobs"""
+            return jsonify({'jobs': [job.to_dict() for job in self.jobs.jobs()]})
+
+        @self.app.route('/jobs/<job_id>', methods=['GET'])
+        def job_status(job_id):
+            """Report job status, progress as frames done / total frames, and ETA"""
+            job = self.jobs.get(job_id)
+            if job is None:
+                return jsonify({'error': 'Job not found'}), 404
+            return jsonify(job.to_dict())
+
+        @self.app.route('/jobs/<job_id>/events')
+        def job_events(job_id):
+            """Stream job progress as Server-Sent Events"""
+            if self.jobs.get(job_id) is None:
+                return jsonify({'error': 'Job not found'}), 404
+
+            def stream():
+                for snapshot in self.jobs.events(job_id):
+                    if snapshot is None:
+                        yield ": keep-alive\n\n"
+                    else:
+                        yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot)}\n\n"
+            return Response(stream(), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+        @self.app.route('/jobs/<job_id>', methods=['DELETE'])
+        def cancel_job(job_id):
+            """Cancel a pending or running job"""
+            job = self.jobs.cancel(job_id)
+            if job is None:
+                return jsonify({'error': 'Job not found'}), 404
+            return jsonify(job.to_dict())
+
+        @self.app.route('/cache/stats')
+        def cache_stats():
+            """Report result cache hit/miss counters"""
+            if self.result_cache is None:
+                return jsonify({'enabled': False})
+            return jsonify({'enabled': True, **self.result_cache.stats()})
+
+        @self.app.route('/detect/batch', methods=['POST'])
+        def detect_batch():
+            """Run batched detection over several uploaded images"""
+            files = request.files.getlist('files')
+            try:
+                return jsonify(self.detect_batch_uploads([(file.filename, file.read()) for file in files]))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                return jsonify({'error': f'Error processing files: {str(e)}'}), 500
+
+        @self.app.route('/scheduler/stats')
+        def scheduler_stats():
+            """Report micro-batching scheduler queue depth and batch sizes"""
+            scheduler = self.detector.scheduler if self.detector else None
+            if scheduler is None:
+                return jsonify({'enabled': False})
+            return jsonify({'enabled': True, **scheduler.stats()})
+
+        @self.app.route('/workers/stats')
+        def worker_stats():
+            """Report inference worker pool state"""
+            if not isinstance(self.detector, InferenceWorkerPool):
+                return jsonify({'enabled': False})
+            return jsonify({'enabled': True, **self.detector.stats()})
+
+        @self.app.route('/prefilter/stats')
+        def prefilter_stats():
+            """Report how many images the empty-frame prefilter kept away from the full model"""
+            if not self.app.config['PREFILTER_ENABLED']:
+                return jsonify({'enabled': False})
+            if isinstance(self.detector, InferenceWorkerPool):
+                # Each worker runs its own prefilter; their counters are not collected in this process
+                return jsonify({'enabled': True, 'in_workers': True})
+            prefilter = self.detector.prefilter if self.detector else None
+            if prefilter is None:
+                return jsonify({'enabled': True, 'loaded': False})
+            return jsonify({'enabled': True, **prefilter.stats()})
+
         @self.app.route('/realtime')
         def realtime():
             """Render the real-time detection page"""
@@ -140,187 +535,369 @@ class AnimalDetectionApp:
         @self.app.route('/video_feed')
         def video_feed():
             """Video streaming route for real-time detection"""
-            return Response(self.generate_frames(), 
+            max_fps = request.args.get('fps', self.app.config['REALTIME_MAX_FPS'], type=float)
+            quality = request.args.get('quality', self.app.config['REALTIME_JPEG_QUALITY'], type=int)
+            return Response(self.generate_frames(max_fps=max_fps, quality=min(100, max(1, quality))),
                            mimetype='multipart/x-mixed-replace; boundary=frame')
 
+        @self.app.route('/video_feed/<source_id>')
+        def source_feed(source_id):
+            """Video streaming route for one configured camera source"""
+            source = self.source_manager.get(source_id) if self.source_manager is not None else None
+            if source is None:
+                return jsonify({'error': 'Unknown source'}), 404
+            max_fps = request.args.get('fps', self.app.config['REALTIME_MAX_FPS'], type=float)
+            quality = request.args.get('quality', self.app.config['REALTIME_JPEG_QUALITY'], type=int)
+            return Response(source.broadcaster.stream(max_fps=max_fps, quality=min(100, max(1, quality))),
+                            mimetype='multipart/x-mixed-replace; boundary=frame')
+
+        @self.app.route('/sources')
+        def list_sources():
+            """Configured camera sources with reader and scheduler statistics"""
+            if self.source_manager is None:
+                return jsonify({'enabled': False, 'sources': {}})
+            return jsonify({'enabled': True, **self.source_manager.stats()})
+
+        @self.app.route('/realtime/stats')
+        def realtime_stats():
+            """Viewer counts and encode statistics of the shared realtime capture loops"""
+            return jsonify({'enabled': bool(self.live_sources),
+                            'sources': {str(k): v.stats() for k, v in self.live_sources.items()}})
+
         @self.app.route('/static/results/<path:filename>')
         def serve_result(filename):
-            """Serve processed files"""
-            return send_from_directory('static/results', filename)
-
-    def generate_frames(self):
-        """Generate video frames with real-time detection"""
-        camera = cv2.VideoCapture(0)
-        while True:
-            success, frame = camera.read()
-            if not success:
-                break
-            processed_frame, _ = self.detector.process_frame(frame)
-            ret, buffer = cv2.imencode('.jpg', processed_frame)
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-        camera.release()
+            """Serve processed files with Range and conditional GET support"""
+            return self._serve_artifact(os.path.join('static', 'results'), filename)
 
-# Instantiate and register the OOP Flask app
+        @self.app.route('/uploads/<path:filename>')
+        def serve_upload(filename):
+            """Serve original uploads (the media that overlay results are drawn on)"""
+            return self._serve_artifact(self.app.config['UPLOAD_FOLDER'], filename)
 
-# Only register routes if not already registered (avoid duplicate registration on reload)
-if not hasattr(app, '_routes_registered'):
-    animal_app = AnimalDetectionApp(app)
-    animal_app.register()
-    app._routes_registered = True
+        @self.app.route('/storage/stats')
+        def storage_stats():
+            """Size, file count and eviction counters of the upload and result directories"""
+            return jsonify({'enabled': bool(self.storage.max_bytes or self.storage.max_age), **self.storage.stats()})
 
-if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
+    def model_unavailable(self):
+        """None once requests that need the model can be served (loading it first in lazy mode), else the 503 body"""
+        if self._ready.is_set():
+            return None
+        if self.app.config['STARTUP_MODE'] == 'lazy' and self.startup['state'] != 'failed':
+            try:
+                self.load_model()
+                return None
+            except Exception as e:
+                print(f"Error loading model: {str(e)}")
+        return {'error': 'Model is not ready', **self.startup_status()}
 
-@app.route('/')
-def index():
-    """Render the main page"""
-    return render_template('index.html')
-
-@app.route('/detect', methods=['POST'])
-def detect_animals():
-    """Handle image/video upload and run detection"""
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-    
-    file = request.files['file']
-    file_type = request.form.get('type', 'image')  # Get the type (image or video)
-    
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    
-    if not allowed_file(file.filename):
-        return jsonify({'error': 'File type not allowed'}), 400
-    
-    try:
-        # Create a unique filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_ext = os.path.splitext(file.filename)[1].lower()
+    def _check_upload(self, filename: str, render: str, video_only: bool = False):
+        """Raise ValueError for an upload that POST /detect or /jobs must reject with 400"""
+        if filename == '':
+            raise ValueError('No selected file')
+        if not self.allowed_file(filename) or \
+                (video_only and filename.rsplit('.', 1)[1].lower() in self.app.config['IMAGE_EXTENSIONS']):
+            raise ValueError('File type not allowed')
+        if render not in self.RENDER_MODES:
+            raise ValueError("render must be 'media', 'overlay' or 'none'")
+
+    def detect_upload(self, data: bytes, original_filename: str, file_type: str = 'image',
+                      render: str = None, stop_event=None) -> dict:
+        """
+        Run detection on one uploaded image or video (POST /detect, also served by src/api/asgi.py).
+        Raises ValueError for invalid uploads; stop_event cancels video processing early.
+        """
+        render = render or self.app.config['RESULT_RENDER']
+        self._check_upload(original_filename, render)
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = f"{ResultCache.content_hash(data)}:{file_type}:{render}:{self._result_variant(file_type)}"
+            cached = self.result_cache.get(cache_key, self.detector.fingerprint())
+            if cached is not None:
+                # Every linked file is touched, e.g. the overlay JSON and the original video it is drawn over
+                for artifact in ResultCache.artifacts(cached):
+                    self.storage.touch(artifact.lstrip('/'))
+                return {**cached['response'], 'cached': True, 'timestamp': datetime.now().isoformat()}
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        file_ext = os.path.splitext(original_filename)[1].lower()
         filename = f"{file_type}_{timestamp}{file_ext}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # Process based on file type
+        filepath = os.path.join(self.app.config['UPLOAD_FOLDER'], filename)
         if file_type == 'video':
-            # Process video
-            output_filename = f"detected_{filename}"
-            output_path = os.path.join('static', 'results', output_filename)
-            
-            # Ensure output directory exists
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # Process video frames
-            cap = cv2.VideoCapture(filepath)
-            fps = int(cap.get(cv2.CAP_PROP_FPS))
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            # Define the codec and create VideoWriter object
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-            
-            detections = []
-            frame_count = 0
-            
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                # Process every 5th frame to save processing time
-                if frame_count % 5 == 0:
-                    # Detect animals in the frame
-                    processed_frame, frame_detections = detector.process_frame(frame)
-                    detections.extend(frame_detections)
-                    out.write(processed_frame)
-                else:
-                    out.write(frame)
-                    
-                frame_count += 1
-            
-            cap.release()
-            out.release()
-            
-            return jsonify({
-                'type': 'video',
-                'detections': detections,
-                'video_url': f"/{output_path}",
-                'timestamp': datetime.now().isoformat()
-            })
-            
-        else:  # Image processing
-            # Process image
-            detections = detector.detect_animals(filepath)
-            
-            # Draw detections on image if any
-            if detections:
-                img = cv2.imread(filepath)
-                for det in detections:
-                    x1, y1, x2, y2 = det['bbox']
-                    label = f"{det['class']} {det['confidence']:.2f}"
-                    cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.putText(img, label, (x1, y1 - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                
-                # Save result
-                result_filename = f"detected_{filename}"
-                result_path = os.path.join('static', 'results', result_filename)
-                cv2.imwrite(result_path, img)
-                result_url = f"/static/results/{result_filename}"
-            else:
-                result_url = f"/{filepath}"
-            
-            return jsonify({
+            # OpenCV can only decode video from a file, so videos are always written first
+            self._write_upload(filepath, data)
+            response = self._detect_video(filepath, filename, stop_event=stop_event, render=render)
+        else:
+            saved = self._persist_upload(filepath, data)
+            response = self._detect_image(data, filename, filepath if saved is not None else None, render=render,
+                                          upload_saved=saved)
+        if cache_key is not None and not response.get('cancelled'):
+            artifacts = [response[key] for key in ('overlay_url', 'video_url', 'image_url') if response.get(key)]
+            self.result_cache.put(cache_key, self.detector.fingerprint(),
+                                  {'response': response, 'artifacts': artifacts})
+        return {**response, 'timestamp': datetime.now().isoformat()}
+
+    def detect_batch_uploads(self, files: list) -> dict:
+        """Batched detection over (filename, bytes) image uploads (POST /detect/batch); raises ValueError for invalid ones"""
+        if not files:
+            raise ValueError('No file part')
+        if len(files) > self.app.config['BATCH_MAX_IMAGES']:
+            raise ValueError(f"Too many files (max {self.app.config['BATCH_MAX_IMAGES']})")
+        for filename, _ in files:
+            if filename == '':
+                raise ValueError('No selected file')
+            if filename.rsplit('.', 1)[-1].lower() not in self.app.config['IMAGE_EXTENSIONS']:
+                raise ValueError(f'File type not allowed: {filename}')
+        results = self.detector.detect_batch([data for _, data in files], batch_size=self.app.config['BATCH_SIZE'])
+        return {
+            'type': 'batch',
+            'results': [
+                {'filename': secure_filename(filename), 'detections': detections}
+                for (filename, _), detections in zip(files, results)
+            ],
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def submit_video_job(self, save, original_filename: str, render: str = None):
+        """
+        Save an uploaded video with save(path) and queue it for background processing (POST /jobs).
+        Raises ValueError for invalid uploads and RuntimeError when the job queue is full.
+        """
+        render = render or self.app.config['RESULT_RENDER']
+        self._check_upload(original_filename, render, video_only=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filename = f"video_{timestamp}{os.path.splitext(original_filename)[1].lower()}"
+        filepath = os.path.join(self.app.config['UPLOAD_FOLDER'], filename)
+        save(filepath)
+        self.storage.add(filepath)
+        self.storage.pin(filepath)  # Not evicted while the job waits in the queue
+        try:
+            return self.jobs.submit(
+                'video',
+                lambda job: self._detect_video(filepath, filename, on_progress=job.report_progress,
+                                               stop_event=job.cancel_event, render=render),
+                metadata={'filename': secure_filename(original_filename)},
+                on_finish=lambda job: self.storage.unpin(filepath)
+            )
+        except RuntimeError:
+            self.storage.unpin(filepath)
+            raise
+
+    @staticmethod
+    def job_links(job) -> dict:
+        return {
+            'job_id': job.job_id,
+            'status': job.status,
+            'status_url': f"/jobs/{job.job_id}",
+            'events_url': f"/jobs/{job.job_id}/events"
+        }
+
+    def _serve_artifact(self, directory: str, filename: str):
+        """
+        Send a stored file. Byte ranges let browsers seek in videos without downloading the whole
+        file, and ETag / Last-Modified let them revalidate with a 304. Artifact names are never
+        reused, so clients may cache them for a day.
+        """
+        directory = os.path.abspath(directory)
+        response = send_from_directory(directory, filename, conditional=True, max_age=86400)
+        self.storage.touch(os.path.join(directory, filename))
+        return response
+
+    def _result_variant(self, file_type: str) -> str:
+        """Settings besides the model that change a response, so cached results only match like for like"""
+        if file_type != 'video':
+            return ''
+        keys = ('VIDEO_SAMPLING_POLICY', 'VIDEO_SAMPLING_STRIDE', 'VIDEO_SAMPLING_MAX_FPS',
+                'VIDEO_MOTION_THRESHOLD', 'TRACK_MAX_AGE')
+        return ','.join(str(self.app.config[key]) for key in keys)
+
+    def _detect_video(self, filepath: str, filename: str, on_progress=None, stop_event=None,
+                      render: str = 'media') -> dict:
+        """Run the video pipeline on an uploaded file and summarize detections per track"""
+        with self.storage.hold(filepath):
+            if render != 'media':
+                return self._detect_video_overlay(filepath, filename, on_progress, stop_event,
+                                                  write_overlay=render == 'overlay')
+            return self._detect_video_media(filepath, filename, on_progress, stop_event)
+
+    def _detect_video_media(self, filepath: str, filename: str, on_progress=None, stop_event=None) -> dict:
+        """Write an annotated copy of the video"""
+        output_filename = f"detected_{filename}"
+        output_path = os.path.join('static', 'results', output_filename)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        tracker = MultiObjectTracker(max_age=self.app.config['TRACK_MAX_AGE'])
+        sampler = self.create_frame_sampler()
+        plan = self.segment_processor.plan(filepath) if self.segment_processor is not None else None
+        # Short videos and containers without a frame count run in-process
+        if plan is not None and self.segment_processor.splittable(plan):
+            stats = self.segment_processor.run(filepath, output_path, sampler=sampler,
+                                               on_progress=on_progress, stop_event=stop_event, plan=plan)
+            # Replay the merged timeline so tracks continue across segment boundaries
+            timeline = dict(stats['timeline'])
+            for index in range(stats['total_frames']):
+                tracker.step(index, timeline.get(index), index / stats['fps'])
+        else:
+            pipeline = VideoPipeline(lambda index, frame: self.detector.process_frame(frame),
+                                     queue_size=self.app.config['VIDEO_QUEUE_SIZE'],
+                                     inference_workers=self._inference_parallelism(),
+                                     sampler=sampler,
+                                     carry_forward=self.detector.draw_detections)
+            stats = pipeline.run(
+                filepath, output_path,
+                on_frame=lambda index, frame_detections: tracker.step(
+                    index, frame_detections, index / sampler.fps),
+                on_progress=on_progress,
+                stop_event=stop_event
+            )
+        self.storage.add(output_path)
+        # One summary per tracked animal instead of one entry per frame it appears in
+        return {
+            'type': 'video',
+            'detections': tracker.summaries(),
+            'video_url': f"/{output_path}",
+            'frames': stats['frames'],
+            'cancelled': stats['cancelled']
+        }
+
+    def _detect_video_overlay(self, filepath: str, filename: str, on_progress=None, stop_event=None,
+                              write_overlay: bool = True) -> dict:
+        """
+        Detect without drawing or re-encoding: boxes of every inferred frame go to a JSON file that
+        the browser draws over the original video, or only into the per-track summary without write_overlay.
+        """
+        overlay_filename = f"overlay_{os.path.splitext(filename)[0]}.json"
+        overlay_path = os.path.join('static', 'results', overlay_filename)
+        tracker = MultiObjectTracker(max_age=self.app.config['TRACK_MAX_AGE'])
+        sampler = self.create_frame_sampler()
+        frames = []
+
+        def on_frame(index, frame_detections):
+            tracker.step(index, frame_detections, index / sampler.fps)
+            if write_overlay and frame_detections is not None:
+                frames.append([index, [[*det['bbox'], round(det['confidence'], 4), det['display_name'], det['category']]
+                                       for det in frame_detections]])
+
+        pipeline = VideoPipeline(lambda index, frame: (frame, self.detector.detect_frame(frame)),
+                                 queue_size=self.app.config['VIDEO_QUEUE_SIZE'],
+                                 inference_workers=self._inference_parallelism(),
+                                 sampler=sampler)
+        stats = pipeline.run(filepath, None, on_frame=on_frame, on_progress=on_progress, stop_event=stop_event)
+        response = {
+            'type': 'video',
+            'render': 'overlay' if write_overlay else 'none',
+            'detections': tracker.summaries(),
+            'video_url': f"/{filepath}",
+            'frames': stats['frames'],
+            'cancelled': stats['cancelled']
+        }
+        if write_overlay:
+            with open(overlay_path, 'w') as f:
+                # Each frame entry holds the boxes shown from that frame until the next entry
+                json.dump({'fps': stats['fps'], 'width': stats['width'], 'height': stats['height'],
+                           'fields': ['x1', 'y1', 'x2', 'y2', 'confidence', 'label', 'category'],
+                           'frames': frames}, f, separators=(',', ':'))
+            self.storage.add(overlay_path)
+            response['overlay_url'] = f"/{overlay_path}"
+        return response
+
+    def _write_upload(self, filepath: str, data: bytes):
+        with timed('upload_save'), open(filepath, 'wb') as f:
+            f.write(data)
+        self.storage.add(filepath)
+
+    def _persist_upload(self, filepath: str, data: bytes) -> Future:
+        """
+        Save a raw image upload according to UPLOAD_PERSIST.
+        Returns:
+            Future that completes once the file is on disk, or None when uploads aren't kept
+        """
+        mode = self.app.config['UPLOAD_PERSIST']
+        if mode == 'none':
+            return None
+        if mode == 'sync':
+            saved = Future()
+            self._write_upload(filepath, data)
+            saved.set_result(None)
+            return saved
+        return self._io_executor.submit(self._write_upload, filepath, data)
+
+    def _detect_image(self, data: bytes, filename: str, upload_path: str = None, render: str = 'media',
+                      upload_saved: Future = None) -> dict:
+        """
+        Decode an uploaded image once in memory, detect animals and annotate the same buffer.
+        The annotated copy is only written when something was found, and never in overlay mode,
+        where the browser draws the boxes over the original image, or in 'none' mode.
+        A response only links to upload_path once upload_saved (its pending write) has completed.
+        """
+        def upload_url():
+            if upload_path is None:
+                return None
+            if upload_saved is not None:
+                try:
+                    upload_saved.result()
+                except Exception as e:
+                    print(f"Error saving upload {upload_path}: {str(e)}")
+                    return None
+            return f"/{upload_path}"
+
+        with timed('decode'):
+            # imdecode asserts on an empty buffer instead of returning None
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if data else None
+        if img is None:
+            raise ValueError('Could not decode image')
+        detections = self.detector.detect_animals(img)
+        if render != 'media':
+            return {
                 'type': 'image',
+                'render': render,
                 'detections': detections,
-                'image_url': result_url,
-                'timestamp': datetime.now().isoformat()
-            })
-            
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Error processing file: {str(e)}'}), 500
-
-@app.route('/realtime')
-def realtime():
-    """Render the real-time detection page"""
-    return render_template('realtime.html')
-
-@app.route('/video_feed')
-def video_feed():
-    """Video streaming route for real-time detection"""
-    return Response(generate_frames(), 
-                   mimetype='multipart/x-mixed-replace; boundary=frame')
-
-def generate_frames():
-    """Generate video frames with real-time detection"""
-    camera = cv2.VideoCapture(0)  # Use default camera
-    
-    while True:
-        success, frame = camera.read()
-        if not success:
-            break
-        
-        # Process frame
-        processed_frame, _ = detector.process_frame(frame)
-        
-        # Encode frame as JPEG
-        ret, buffer = cv2.imencode('.jpg', processed_frame)
-        frame = buffer.tobytes()
-        
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-    
-    camera.release()
-
-@app.route('/static/results/<path:filename>')
-def serve_result(filename):
-    """Serve processed files"""
-    return send_from_directory('static/results', filename)
+                'image_url': upload_url(),
+                'width': img.shape[1],
+                'height': img.shape[0]
+            }
+        if detections:
+            self.detector.draw_detections(img, detections)
+            result_filename = f"detected_{filename}"
+            result_path = os.path.join('static', 'results', result_filename)
+            with timed('encode'):
+                cv2.imwrite(result_path, img)
+            self.storage.add(result_path)
+            result_url = f"/static/results/{result_filename}"
+        else:
+            result_url = upload_url()
+        return {
+            'type': 'image',
+            'detections': detections,
+            'image_url': result_url
+        }
+
+    def _live_source(self, source=0) -> LiveSource:
+        """The shared capture + inference loop for a source, created on first use"""
+        with self._live_lock:
+            live = self.live_sources.get(source)
+            if live is None:
+                # Full detection every REALTIME_DETECT_EVERY frames; tracked boxes are propagated in between
+                live = LiveSource(
+                    source,
+                    lambda: TrackingDetector(self.detector,
+                                             detect_every=self.app.config['REALTIME_DETECT_EVERY']).process_frame,
+                    idle_timeout=self.app.config['REALTIME_IDLE_TIMEOUT']
+                )
+                self.live_sources[source] = live
+            return live
+
+    def generate_frames(self, max_fps: float = 0.0, quality: int = 80):
+        """Generate video frames with real-time detection from the shared capture loop"""
+        broadcaster = self._live_source(0).ensure_running()
+        return broadcaster.stream(max_fps=max_fps, quality=quality)
+
+# Instantiate and register the OOP Flask app
+
+# Only register routes if not already registered (avoid duplicate registration on reload).
+# Spawned inference workers re-import this module as __mp_main__ and must not start their own app.
+if __name__ != '__mp_main__' and not hasattr(app, '_routes_registered'):
+    animal_app = AnimalDetectionApp(app)
+    animal_app.register()
+    app._routes_registered = True
 
 if __name__ == '__main__':
-    # Initialize detector before running the app
-    initialize_detector()
     app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
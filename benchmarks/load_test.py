@@ -0,0 +1,171 @@
+"""
+Closed-loop load test of POST /detect against a running server, for checking behaviour under overload:
+
+    uvicorn src.api.asgi:create_app --factory --port 8000
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 1,4,16,64 --duration 20
+
+At each concurrency level that many clients post synthetic JPEGs back to back for --duration seconds.
+Each request carries a unique JPEG comment so it misses the server's result cache, unless --repeat
+is given. Each level reports the status codes seen, goodput (successful responses per second) and
+latency percentiles of successful and of rejected responses. With admission control, goodput
+should level off at the server's capacity and the p99 of successful requests should stay close to
+the queueing bound as clients are added, while the excess is answered quickly with 429 / 503.
+Run it against the Flask server (python app.py) for comparison.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import http.client
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import synthetic_jpeg
+
+
+def multipart_body(image: bytes, fields: Dict[str, str]) -> Tuple[bytes, str]:
+    """A multipart/form-data body with image as the 'file' field; returns the body and its content type."""
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="load.jpg"\r\n'
+                 f'Content-Type: image/jpeg\r\n\r\n'.encode() + image + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def stamp_jpeg(image: bytes, nonce: int) -> bytes:
+    """The same JPEG with a comment segment after the SOI marker, so identical pixels hash differently."""
+    comment = f'load-test {nonce}'.encode()
+    return image[:2] + b'\xff\xfe' + (len(comment) + 2).to_bytes(2, 'big') + comment + image[2:]
+
+
+def percentiles(seconds: List[float]) -> Optional[Dict[str, float]]:
+    if not seconds:
+        return None
+    ms = np.array(seconds) * 1000.0
+    return {
+        'p50': float(np.percentile(ms, 50)),
+        'p95': float(np.percentile(ms, 95)),
+        'p99': float(np.percentile(ms, 99)),
+        'max': float(ms.max()),
+    }
+
+
+def run_level(url: str, concurrency: int, duration: float, images: List[bytes], fields: Dict[str, str],
+              headers: Dict[str, str], unique: bool, respect_retry_after: bool, timeout: float) -> Dict[str, Any]:
+    """concurrency clients, each with its own keep-alive connection, posting until duration elapses."""
+    target = urlsplit(url)
+    path = (target.path.rstrip('/') or '') + '/detect'
+    records: List[Tuple[int, float]] = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(index: int):
+        connection = None
+        sent = index
+        local = []
+        while time.perf_counter() < stop_at:
+            image = images[sent % len(images)]
+            body, content_type = multipart_body(stamp_jpeg(image, sent) if unique else image, fields)
+            sent += concurrency
+            if connection is None:
+                connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+            started = time.perf_counter()
+            retry_after = 0.0
+            try:
+                connection.request('POST', path, body=body,
+                                   headers={'Content-Type': content_type, **headers})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                retry_after = float(response.getheader('Retry-After') or 0)
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException):
+                status = 0  # Connection error or client-side timeout
+                connection.close()
+                connection = None
+            local.append((status, time.perf_counter() - started))
+            if respect_retry_after and retry_after and status in (429, 503):
+                time.sleep(min(retry_after, max(0.0, stop_at - time.perf_counter())))
+        if connection is not None:
+            connection.close()
+        with lock:
+            records.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    statuses = Counter(status for status, _ in records)
+    ok = [seconds for status, seconds in records if 200 <= status < 300]
+    rejected = [seconds for status, seconds in records if status in (429, 503)]
+    return {
+        'concurrency': concurrency,
+        'requests': len(records),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'goodput': len(ok) / wall if wall > 0 else 0.0,
+        'latency_ms': percentiles(ok),
+        'rejected_latency_ms': percentiles(rejected),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed-loop load test of POST /detect")
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="Server base URL")
+    parser.add_argument('--concurrency', default='1,4,16,64', help="Comma-separated client counts, one level each")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds per level")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--images', type=int, default=16, help="Distinct synthetic images to cycle through")
+    parser.add_argument('--repeat', action='store_true', help="Post the same image every time (cache hits)")
+    parser.add_argument('--render', default='none', help="render form field: media, overlay or none")
+    parser.add_argument('--request-timeout', type=float, help="Sent as X-Request-Timeout (seconds)")
+    parser.add_argument('--client-timeout', type=float, default=120, help="Socket timeout per request")
+    parser.add_argument('--respect-retry-after', action='store_true',
+                        help="Rejected clients sleep for Retry-After before their next request")
+    parser.add_argument('--output', help="Write results JSON here")
+    args = parser.parse_args()
+
+    images = [synthetic_jpeg(args.width, args.height, seed=seed) for seed in range(1 if args.repeat else args.images)]
+    headers = {'X-Request-Timeout': str(args.request_timeout)} if args.request_timeout else {}
+    levels = [int(level) for level in args.concurrency.split(',')]
+    results = {'url': args.url, 'duration': args.duration, 'levels': []}
+
+    print(f"{'clients':>8}{'requests':>10}{'goodput/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'reject p99':>12}  statuses")
+    for level in levels:
+        row = run_level(args.url, level, args.duration, images, {'render': args.render}, headers,
+                        not args.repeat, args.respect_retry_after, args.client_timeout)
+        results['levels'].append(row)
+        latency = row['latency_ms'] or {}
+        rejected = row['rejected_latency_ms'] or {}
+        print(f"{level:>8}{row['requests']:>10}{row['goodput']:>11.2f}{latency.get('p50', float('nan')):>10.1f}"
+              f"{latency.get('p99', float('nan')):>10.1f}{rejected.get('p99', float('nan')):>12.1f}  "
+              f"{row['statuses']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
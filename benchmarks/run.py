@@ -0,0 +1,318 @@
+"""
+Benchmarks for the detection pipeline on synthetic data (no network or datasets needed).
+
+    python -m benchmarks.run --model-size n --output results.json
+    python -m benchmarks.run --model-size n --baseline baseline.json --threshold 0.10
+
+Each case reports p50/p95/p99 latency, throughput and how much resident memory grew while it
+ran (rss_delta_mb, Linux only) as JSON; the process-wide peak RSS is reported once for the
+whole run. The JSON goes to stdout (or --output) and the summary table to stderr, so
+`python -m benchmarks.run > results.json` gives a file --baseline can read.
+With --baseline, cases are compared against an earlier results file and the run exits
+with status 1 when any case regresses by more than the threshold.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)  # The endpoint case imports app.py from the repository root
+
+from benchmarks.synthetic import synthetic_image, synthetic_jpeg, synthetic_video
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+BATCH_SIZES = [1, 4, 8]
+VIDEO_STRIDES = [1, 5, 15]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water mark of this process's resident memory, in MB."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """This process's resident memory right now, in MB (Linux only)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def summarize(timings: List[float], items: int, wall: float, params: Dict[str, Any],
+              rss_start: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Latency percentiles in ms over per-call timings, items per second over the whole run, and the
+    resident memory at the end of the case and its growth since rss_start.
+    """
+    ms = np.array(timings) * 1000.0
+    rss_end = current_rss_mb()
+    return {
+        'params': params,
+        'calls': len(timings),
+        'latency_ms': {
+            'p50': float(np.percentile(ms, 50)),
+            'p95': float(np.percentile(ms, 95)),
+            'p99': float(np.percentile(ms, 99)),
+            'mean': float(ms.mean()),
+        },
+        'throughput': items / wall if wall > 0 else 0.0,
+        'rss_start_mb': rss_start,
+        'rss_end_mb': rss_end,
+        'rss_delta_mb': rss_end - rss_start if rss_start is not None and rss_end is not None else None,
+    }
+
+
+def measure(fn: Callable[[int], Any], iterations: int, warmup: int, items_per_call: int = 1,
+            params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Call fn(i) warmup times untimed, then iterations times timed."""
+    rss_start = current_rss_mb()
+    for i in range(warmup):
+        fn(i)
+    timings = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - call_started)
+    return summarize(timings, iterations * items_per_call, time.perf_counter() - started, params or {}, rss_start)
+
+
+def bench_detector(detector, iterations: int, warmup: int) -> Dict[str, Dict[str, Any]]:
+    cases = {}
+    for width, height in RESOLUTIONS:
+        jpegs = [synthetic_jpeg(width, height, seed) for seed in range(4)]
+        cases[f'detect_animals/{width}x{height}'] = measure(
+            lambda i: detector.detect_animals(jpegs[i % len(jpegs)]), iterations, warmup,
+            params={'width': width, 'height': height, 'input': 'jpeg'})
+        frames = [synthetic_image(width, height, seed) for seed in range(4)]
+        cases[f'process_frame/{width}x{height}'] = measure(
+            lambda i: detector.process_frame(frames[i % len(frames)].copy()), iterations, warmup,
+            params={'width': width, 'height': height})
+    images = [synthetic_image(640, 480, seed) for seed in range(max(BATCH_SIZES))]
+    for batch_size in BATCH_SIZES:
+        cases[f'detect_batch/bs{batch_size}'] = measure(
+            lambda i: detector.detect_batch(images[:batch_size], batch_size=batch_size),
+            max(1, iterations // batch_size), 1, items_per_call=batch_size,
+            params={'batch_size': batch_size, 'width': 640, 'height': 480})
+    return cases
+
+
+def bench_stream(detector, frames: int, width: int = 1920, height: int = 1080) -> Dict[str, Dict[str, Any]]:
+    """process_frame over a long run of frames, like the realtime loop; RSS should stay flat."""
+    sources = [synthetic_image(width, height, seed) for seed in range(4)]
+    frame = np.empty_like(sources[0])
+
+    def step(i: int):
+        np.copyto(frame, sources[i % len(sources)])  # Stands in for the camera refilling its buffer
+        detector.process_frame(frame)
+
+    for i in range(10):
+        step(i)
+    # Measured after the first frames, so rss_delta_mb is growth over the stream, not first-use setup
+    case = measure(step, frames, 0, params={'width': width, 'height': height, 'frames': frames})
+    return {f'process_frame_stream/{width}x{height}': case}
+
+
+def bench_draw(iterations: int, warmup: int, width: int = 1920, height: int = 1080) -> Dict[str, Dict[str, Any]]:
+    """Annotation alone (boxes, labels, alert banners) on a 1080p frame, without the model."""
+    from src.utils.renderer import shared_renderer
+    renderer = shared_renderer()
+    frame = synthetic_image(width, height, 0)
+    categories = ('large_mammals', 'carnivores', 'herbivores', 'birds')
+    cases = {}
+    for count in (1, 5, 20):
+        rng = np.random.default_rng(count)
+        detections = []
+        for index in range(count):
+            x1, y1 = int(rng.integers(0, width - 200)), int(rng.integers(30, height - 200))
+            detections.append({'class': 'animal', 'display_name': f'Animal {index}',
+                               'category': categories[index % len(categories)], 'confidence': 0.5,
+                               'bbox': [x1, y1, x1 + 160, y1 + 120]})
+
+        def step(i: int, detections=detections):
+            # A few confidence values per box, as between consecutive detector runs on a stream
+            for det in detections:
+                det['confidence'] = 0.5 + (i % 4) / 100
+            renderer.draw(frame, detections)
+
+        cases[f'draw_detections/{count}boxes'] = measure(step, iterations, warmup, params={'boxes': count})
+    return cases
+
+
+def bench_video(detector, workdir: str, frames: int) -> Dict[str, Dict[str, Any]]:
+    from src.utils.frame_sampling import FrameSampler
+    video = synthetic_video(os.path.join(workdir, 'clip.mp4'), frames=frames)
+    cases = {}
+    for stride in VIDEO_STRIDES:
+        output = os.path.join(workdir, f'clip_stride{stride}.mp4')
+        cases[f'process_video/stride{stride}'] = measure(
+            lambda i: detector.process_video(video, output, sampler=FrameSampler('stride', stride=stride)),
+            1, 0, items_per_call=frames, params={'stride': stride, 'frames': frames, 'width': 640, 'height': 480})
+    return cases
+
+
+def bench_endpoint(workdir: str, requests: int, concurrency: int) -> Dict[str, Dict[str, Any]]:
+    """POST /detect through the Flask test client from concurrency threads at once."""
+    os.environ.setdefault('STARTUP_MODE', 'eager')
+    os.environ['RESULT_CACHE'] = '0'  # Every request must reach the model
+    os.environ['UPLOAD_PERSIST'] = 'none'
+    cwd = os.getcwd()
+    rss_start = current_rss_mb()
+    os.chdir(workdir)  # uploads/ and static/results/ are created relative to the working directory
+    try:
+        import app as app_module
+        client_app = app_module.app
+        payloads = [synthetic_jpeg(640, 480, seed) for seed in range(8)]
+
+        def post(i: int) -> float:
+            import io
+            client = client_app.test_client()
+            started = time.perf_counter()
+            response = client.post('/detect', data={'file': (io.BytesIO(payloads[i % len(payloads)]), 'bench.jpg')})
+            if response.status_code != 200:
+                raise RuntimeError(f"/detect returned {response.status_code}: {response.get_data(as_text=True)}")
+            return time.perf_counter() - started
+
+        post(0)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            timings = list(executor.map(post, range(requests)))
+        wall = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+    return {f'endpoint_detect/c{concurrency}': summarize(
+        timings, requests, wall, {'concurrency': concurrency, 'requests': requests, 'width': 640, 'height': 480},
+        rss_start)}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Per-case ratios against the baseline; a case regresses when p50 or p95 grows, or throughput
+    drops, by more than threshold."""
+    rows = []
+    for name, case in results['cases'].items():
+        reference = baseline.get('cases', {}).get(name)
+        if reference is None:
+            continue
+        p50 = case['latency_ms']['p50'] / max(reference['latency_ms']['p50'], 1e-9)
+        p95 = case['latency_ms']['p95'] / max(reference['latency_ms']['p95'], 1e-9)
+        throughput = case['throughput'] / max(reference['throughput'], 1e-9)
+        rows.append({
+            'case': name,
+            'p50_ratio': p50,
+            'p95_ratio': p95,
+            'throughput_ratio': throughput,
+            'regressed': p50 > 1 + threshold or p95 > 1 + threshold or throughput < 1 - threshold,
+        })
+    return rows
+
+
+def environment(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'model_size': args.model_size,
+        'model_path': args.model_path,
+        'backend': args.backend,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the animal detection pipeline on synthetic data")
+    parser.add_argument('--model-size', default='n', help="YOLOv8 size (n/s/m/l/x)")
+    parser.add_argument('--model-path', help="Custom weights instead of --model-size")
+    parser.add_argument('--backend', default='torch', help="torch, onnx or openvino")
+    parser.add_argument('--cases', default='detector,stream,draw,video,endpoint',
+                        help="Comma-separated: detector, stream, draw, video, endpoint")
+    parser.add_argument('--iterations', type=int, default=20, help="Timed calls per detector case")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--video-frames', type=int, default=60)
+    parser.add_argument('--stream-frames', type=int, default=300, help="Frames in the 1080p process_frame stream")
+    parser.add_argument('--requests', type=int, default=32, help="Total /detect requests")
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent /detect clients")
+    parser.add_argument('--output', help="Write results JSON here (printed to stdout otherwise)")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Allowed relative regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    os.environ['MODEL_SIZE'] = args.model_size
+    os.environ['MODEL_BACKEND'] = args.backend
+    if args.model_path:
+        os.environ['MODEL_PATH'] = args.model_path
+    cases = set(args.cases.split(','))
+    results = {'environment': environment(args), 'cases': {}}
+    # Only the results JSON goes to stdout; model loading and app startup messages go to stderr
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory(prefix='animal-bench-') as workdir:
+        if cases & {'detector', 'stream', 'video'}:
+            from src.utils.detection import AnimalDetector
+            detector = AnimalDetector(model_path=args.model_path, model_size=args.model_size, backend=args.backend)
+            if 'detector' in cases:
+                results['cases'].update(bench_detector(detector, args.iterations, args.warmup))
+            if 'stream' in cases:
+                results['cases'].update(bench_stream(detector, args.stream_frames))
+            if 'video' in cases:
+                results['cases'].update(bench_video(detector, workdir, args.video_frames))
+        if 'draw' in cases:
+            results['cases'].update(bench_draw(args.iterations * 10, args.warmup))
+        if 'endpoint' in cases:
+            results['cases'].update(bench_endpoint(workdir, args.requests, args.concurrency))
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    table = sys.stderr
+    print(f"{'case':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>10}{'+RSS MB':>9}", file=table)
+    for name, case in results['cases'].items():
+        latency = case['latency_ms']
+        rss = f"{case['rss_delta_mb']:+.0f}" if case.get('rss_delta_mb') is not None else '-'
+        print(f"{name:<32}{latency['p50']:>10.1f}{latency['p95']:>10.1f}{latency['p99']:>10.1f}"
+              f"{case['throughput']:>10.2f}{rss:>9}", file=table)
+    if results['peak_rss_mb'] is not None:
+        print(f"Peak RSS of the whole run: {results['peak_rss_mb']:.0f} MB", file=table)
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        results['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'cases': rows}
+        print(f"\n{'case':<32}{'p50':>8}{'p95':>8}{'thrpt':>8}  vs {args.baseline}", file=table)
+        for row in rows:
+            flag = '  REGRESSION' if row['regressed'] else ''
+            print(f"{row['case']:<32}{row['p50_ratio']:>8.2f}{row['p95_ratio']:>8.2f}"
+                  f"{row['throughput_ratio']:>8.2f}{flag}", file=table)
+        regressed = any(row['regressed'] for row in rows)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}", file=table)
+    else:
+        print(json.dumps(results, indent=2))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
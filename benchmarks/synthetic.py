@@ -0,0 +1,49 @@
+import os
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+
+def synthetic_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """
+    A deterministic BGR test image: smooth background gradient, sensor-like noise and a few
+    filled blobs, so decode, resize and drawing costs resemble a real photo.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    base = np.stack([60 + 80 * x + 0 * y, 90 + 60 * y + 0 * x, 70 + 40 * (x * y)], axis=2)
+    img = np.clip(base + rng.normal(0, 8, (height, width, 3)), 0, 255).astype(np.uint8)
+    for _ in range(6):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(rng.integers(width // 30 + 1, width // 8 + 2)), int(rng.integers(height // 30 + 1, height // 8 + 2)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.ellipse(img, center, axes, float(rng.integers(0, 180)), 0, 360, color, -1)
+    return img
+
+
+def synthetic_jpeg(width: int, height: int, seed: int = 0, quality: int = 90) -> bytes:
+    _, buffer = cv2.imencode('.jpg', synthetic_image(width, height, seed), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+
+def synthetic_video(path: str, width: int = 640, height: int = 480, frames: int = 60, fps: float = 15.0,
+                    seed: int = 0) -> str:
+    """Write a short clip of a blob moving across a static background and return its path."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    background = synthetic_image(width, height, seed)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    radius = max(4, min(width, height) // 10)
+    for index in range(frames):
+        frame = background.copy()
+        cx = int(radius + (width - 2 * radius) * index / max(1, frames - 1))
+        cv2.circle(frame, (cx, height // 2), radius, (40, 60, 120), -1)
+        out.write(frame)
+    out.release()
+    return path
+
+
+def image_set(resolutions: List[Tuple[int, int]], count: int) -> List[np.ndarray]:
+    """count images per (width, height), with distinct seeds so they are not byte-identical."""
+    return [synthetic_image(width, height, seed) for width, height in resolutions for seed in range(count)]
@@ -0,0 +1,38 @@
+import json
+import argparse
+
+from src.utils.model_loader import ModelLoader, MODEL_SIZES, BACKENDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export YOLOv8 variants and compare their latency and accuracy")
+    parser.add_argument('--sizes', default='x', help=f"Comma-separated model sizes ({','.join(MODEL_SIZES)})")
+    parser.add_argument('--backends', default='torch', help=f"Comma-separated backends ({','.join(BACKENDS)})")
+    parser.add_argument('--int8', action='store_true', help="Also build INT8-quantized ONNX/OpenVINO variants")
+    parser.add_argument('--calibration-dir', help="Folder of representative images for INT8 calibration")
+    parser.add_argument('--images', required=True, help="Folder of sample images used to measure latency")
+    parser.add_argument('--data', help="Labelled ultralytics dataset YAML used to measure mAP")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    variants = []
+    for size in args.sizes.split(','):
+        for backend in args.backends.split(','):
+            variants.append({'model_size': size, 'backend': backend})
+            if args.int8 and backend != 'torch':
+                variants.append({'model_size': size, 'backend': backend, 'int8': True,
+                                 'calibration_dir': args.calibration_dir})
+    rows = ModelLoader.compare_variants(variants, args.images, data_yaml=args.data, imgsz=args.imgsz, runs=args.runs)
+
+    print(f"{'size':<5}{'backend':<10}{'int8':<6}{'p50 ms':>10}{'p95 ms':>10}{'mAP50':>8}{'mAP50-95':>10}")
+    for row in rows:
+        map50 = f"{row['map50']:.3f}" if row['map50'] is not None else '-'
+        map50_95 = f"{row['map50_95']:.3f}" if row['map50_95'] is not None else '-'
+        print(f"{row['model_size']:<5}{row['backend']:<10}{str(row['int8']):<6}"
+              f"{row['latency_p50_ms']:>10.1f}{row['latency_p95_ms']:>10.1f}{map50:>8}{map50_95:>10}")
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import json
+import argparse
+
+from src.services.bulk_ingest import BulkIngestor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run detection over folders or ZIP/TAR archives of camera-trap images")
+    parser.add_argument('inputs', nargs='+', help="Folders, .zip / .tar(.gz) archives or single images")
+    parser.add_argument('--output', required=True, help="Results file (.jsonl) or Parquet directory")
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], help="Output format (inferred from --output)")
+    parser.add_argument('--checkpoint', help="Checkpoint file (defaults to <output>.checkpoint.json)")
+    parser.add_argument('--no-resume', action='store_true', help="Ignore an existing checkpoint and start over")
+    parser.add_argument('--checkpoint-every', type=int, default=1000, help="Images between checkpoints")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--decode-threads', type=int, default=0, help="Read/decode threads (0 = one per core)")
+    parser.add_argument('--annotate-dir', help="Write annotated copies of images with detections here")
+    parser.add_argument('--model-path', help="Custom weights instead of --model-size")
+    parser.add_argument('--model-size', default='x', help="YOLOv8 size (n/s/m/l/x)")
+    parser.add_argument('--backend', default='torch', help="torch, onnx or openvino")
+    parser.add_argument('--conf', type=float, default=0.5, help="Confidence threshold")
+    parser.add_argument('--taxonomy', help="Class map and thresholds (JSON / YAML) instead of config/taxonomy.json")
+    parser.add_argument('--prefilter', action='store_true', help="Skip the full model on images a small model finds empty")
+    parser.add_argument('--prefilter-threshold', type=float, default=0.1, help="Prefilter animal confidence threshold")
+    parser.add_argument('--processes', type=int, default=0, help="Inference worker processes (0 = in-process)")
+    args = parser.parse_args()
+
+    options = {'backend': args.backend, 'model_size': args.model_size, 'taxonomy': args.taxonomy}
+    if args.prefilter:
+        options['prefilter'] = {'backend': args.backend, 'threshold': args.prefilter_threshold}
+    if args.processes > 0:
+        from src.services.worker_pool import InferenceWorkerPool
+        detector = InferenceWorkerPool(args.processes, model_path=args.model_path, conf_threshold=args.conf,
+                                       iou_threshold=0.45, detector_options=options)
+    else:
+        from src.utils.detection import AnimalDetector
+        detector = AnimalDetector(model_path=args.model_path, conf_threshold=args.conf, iou_threshold=0.45, **options)
+
+    ingestor = BulkIngestor(detector, args.output, output_format=args.format, checkpoint=args.checkpoint,
+                            batch_size=args.batch_size, decode_threads=args.decode_threads,
+                            checkpoint_every=args.checkpoint_every, annotate_dir=args.annotate_dir)
+
+    def report(stats):
+        print(f"{stats['images']} images, {stats['images_with_detections']} with detections, "
+              f"{stats['errors']} errors")
+
+    try:
+        stats = ingestor.run(args.inputs, resume=not args.no_resume, on_progress=report)
+    finally:
+        if args.processes > 0:
+            detector.close()
+    if args.prefilter and args.processes == 0:
+        stats['prefilter'] = detector.prefilter.stats()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
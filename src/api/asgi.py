@@ -0,0 +1,281 @@
+"""
+ASGI serving mode with backpressure, for running the detection API under uvicorn:
+
+    uvicorn src.api.asgi:create_app --factory --host 0.0.0.0 --port 8000
+
+POST /detect, /detect/batch and /jobs are served natively: upload bodies are streamed into spooled
+temporary files by the multipart parser instead of being buffered by a WSGI worker, and inference
+goes through an AdmissionController (ASGI_MAX_CONCURRENT slots, ASGI_MAX_QUEUE waiting requests,
+ASGI_MAX_WAIT_SECONDS in the queue), so overload is answered with 429 / 503 and Retry-After
+instead of growing queues and latency. Each request has a deadline (ASGI_REQUEST_TIMEOUT, or a
+lower X-Request-Timeout header in seconds); requests whose deadline passes or whose client
+disconnects are dropped from the queue, and videos that are already running are cancelled.
+Every other route is the Flask app from app.py, mounted through a WSGI adapter.
+
+Needs starlette, python-multipart and an ASGI server such as uvicorn (a2wsgi is used for the
+Flask mount when installed).
+"""
+import time
+import shutil
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.middleware import Middleware
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from src.services.admission import AdmissionController, Abandoned, Rejected
+from src.utils.metrics import REQUESTS, REQUEST_ERRORS, REQUEST_SECONDS
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class BodyLimitMiddleware:
+    """Answer 413 for request bodies over max_body bytes, by Content-Length or while they stream in."""
+    def __init__(self, app, max_body: int):
+        self.app = app
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        too_large = JSONResponse({'error': 'File too large'}, status_code=413)
+        length = dict(scope['headers']).get(b'content-length')
+        if length is not None and length.isdigit() and int(length) > self.max_body:
+            await too_large(scope, receive, send)
+            return
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_body:
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            response_started = response_started or message['type'] == 'http.response.start'
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await too_large(scope, receive, send)
+
+
+async def _watch_disconnect(request: Request):
+    """Completes when the client goes away; only started once the body has been read."""
+    while True:
+        message = await request.receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+def _wsgi(flask_app):
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:
+        from starlette.middleware.wsgi import WSGIMiddleware
+    return WSGIMiddleware(flask_app)
+
+
+class AsgiDetectionServer:
+    """Native ASGI handlers for the upload endpoints of an AnimalDetectionApp."""
+    def __init__(self, animal_app):
+        """
+        Args:
+            animal_app: Registered AnimalDetectionApp whose detector, cache, storage and jobs are shared
+        """
+        self.animal_app = animal_app
+        config = animal_app.app.config
+        self.request_timeout = config['ASGI_REQUEST_TIMEOUT']
+        self.admission = AdmissionController(
+            max_concurrent=config['ASGI_MAX_CONCURRENT'],
+            max_queue=config['ASGI_MAX_QUEUE'],
+            max_wait=config['ASGI_MAX_WAIT_SECONDS']
+        )
+
+    def _deadline(self, request: Request) -> float:
+        timeout = self.request_timeout
+        try:
+            requested = float(request.headers.get('x-request-timeout', 0))
+        except ValueError:
+            requested = 0
+        if requested > 0:
+            timeout = min(timeout, requested)
+        return asyncio.get_running_loop().time() + timeout
+
+    @staticmethod
+    def _json(body: dict, status: int = 200, retry_after: Optional[int] = None) -> JSONResponse:
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else None
+        return JSONResponse(body, status_code=status, headers=headers)
+
+    async def _model_unavailable(self) -> Optional[JSONResponse]:
+        unavailable = await run_in_threadpool(self.animal_app.model_unavailable)
+        return None if unavailable is None else self._json(unavailable, 503, retry_after=5)
+
+    async def _inference(self, request: Request, what: str, prepare) -> JSONResponse:
+        """
+        Admit the request, read its form within the deadline and run prepare(form)(cancel_event) on
+        an inference slot; prepare checks the form on the event loop and raises ValueError for a bad one.
+        Every outcome is mapped to a response here.
+        """
+        unavailable = await self._model_unavailable()
+        if unavailable is not None:
+            return unavailable
+        loop = asyncio.get_running_loop()
+        deadline = self._deadline(request)
+        form = None
+        disconnected = None
+        try:
+            # The queue place is claimed before the body is read, so rejected uploads cost no I/O
+            with self.admission.admit() as ticket:
+                form = await asyncio.wait_for(request.form(), timeout=max(0.0, deadline - loop.time()))
+                work = prepare(form)
+                disconnected = asyncio.ensure_future(_watch_disconnect(request))
+                cancel_event = threading.Event()
+                result = await ticket.run(work, cancel_event, deadline=deadline,
+                                          cancel_event=cancel_event, disconnected=disconnected)
+                return self._json(result)
+        except Rejected as e:
+            return self._json({'error': e.message, 'retry_after': e.retry_after}, e.status, retry_after=e.retry_after)
+        except asyncio.TimeoutError:
+            return self._json({'error': 'Request body not received before the deadline'}, 408)
+        except Abandoned as e:
+            # 499 (client closed request) only reaches the metrics; the client is gone
+            status = 499 if e.reason == 'disconnected' else 504
+            return self._json({'error': f'Request abandoned: {e.reason}'}, status)
+        except ClientDisconnect:
+            return self._json({'error': 'Request abandoned: disconnected'}, 499)
+        except ValueError as e:
+            return self._json({'error': str(e)}, 400)
+        except _BodyTooLarge:
+            raise  # Answered by BodyLimitMiddleware
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return self._json({'error': f'Error processing {what}: {str(e)}'}, 500)
+        finally:
+            if disconnected is not None:
+                disconnected.cancel()
+            if form is not None:
+                await form.close()
+
+    @staticmethod
+    def _upload(form, field: str) -> UploadFile:
+        upload = form.get(field)
+        if not isinstance(upload, UploadFile):
+            raise ValueError('No file part')
+        return upload
+
+    async def detect(self, request: Request) -> JSONResponse:
+        """POST /detect: same form fields and response as the Flask route"""
+        def prepare(form):
+            upload = self._upload(form, 'file')
+
+            def work(cancel_event):
+                upload.file.seek(0)
+                return self.animal_app.detect_upload(upload.file.read(), upload.filename or '',
+                                                     form.get('type', 'image'), form.get('render'),
+                                                     stop_event=cancel_event)
+            return work
+        return await self._inference(request, 'file', prepare)
+
+    async def detect_batch(self, request: Request) -> JSONResponse:
+        """POST /detect/batch: same form fields and response as the Flask route"""
+        def prepare(form):
+            uploads = [upload for upload in form.getlist('files') if isinstance(upload, UploadFile)]
+            if not uploads:
+                raise ValueError('No file part')
+
+            def work(cancel_event):
+                files = []
+                for upload in uploads:
+                    upload.file.seek(0)
+                    files.append((upload.filename or '', upload.file.read()))
+                return self.animal_app.detect_batch_uploads(files)
+            return work
+        return await self._inference(request, 'files', prepare)
+
+    async def create_job(self, request: Request) -> JSONResponse:
+        """POST /jobs: the upload is copied from its spooled file to uploads/ off the event loop"""
+        unavailable = await self._model_unavailable()
+        if unavailable is not None:
+            return unavailable
+        try:
+            async with request.form() as form:
+                upload = self._upload(form, 'file')
+
+                def save(filepath: str):
+                    upload.file.seek(0)
+                    with open(filepath, 'wb') as f:
+                        shutil.copyfileobj(upload.file, f)
+                job = await run_in_threadpool(self.animal_app.submit_video_job, save, upload.filename or '',
+                                              form.get('render'))
+        except ClientDisconnect:
+            return self._json({'error': 'Request abandoned: disconnected'}, 499)
+        except ValueError as e:
+            return self._json({'error': str(e)}, 400)
+        except RuntimeError as e:
+            return self._json({'error': str(e)}, 503, retry_after=self.admission.retry_after())
+        return self._json(self.animal_app.job_links(job), 202)
+
+    async def admission_stats(self, request: Request) -> JSONResponse:
+        """GET /admission/stats: slots, queue depth and admission outcomes"""
+        return self._json({'enabled': True, **self.admission.stats()})
+
+    def route(self, path: str, handler, endpoint: str, methods) -> Route:
+        """A Route that records the same request metrics as the Flask after_request hook."""
+        async def recorded(request: Request):
+            started = time.perf_counter()
+            response = await handler(request)
+            REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+            if response.status_code >= 500:
+                REQUEST_ERRORS.inc(endpoint=endpoint)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+            return response
+        return Route(path, recorded, methods=methods, name=endpoint)
+
+
+def create_app(animal_app=None) -> Starlette:
+    """
+    Build the ASGI application.
+    Args:
+        animal_app: AnimalDetectionApp to serve; the one created by app.py by default
+    """
+    if animal_app is None:
+        from app import animal_app
+    server = AsgiDetectionServer(animal_app)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        server.admission.close()
+
+    asgi_app = Starlette(
+        routes=[
+            server.route('/detect', server.detect, 'detect_animals', ['POST']),
+            server.route('/detect/batch', server.detect_batch, 'detect_batch', ['POST']),
+            server.route('/jobs', server.create_job, 'create_job', ['POST']),
+            server.route('/admission/stats', server.admission_stats, 'admission_stats', ['GET']),
+            Mount('/', app=_wsgi(animal_app.app)),
+        ],
+        middleware=[Middleware(BodyLimitMiddleware, max_body=animal_app.app.config['MAX_CONTENT_LENGTH'])],
+        lifespan=lifespan
+    )
+    asgi_app.state.server = server
+    return asgi_app
@@ -0,0 +1,196 @@
+import math
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.metrics import ADMISSION, ADMISSION_DEPTH
+
+
+class Rejected(Exception):
+    """The request was turned away before any work started; answer status with a Retry-After header."""
+    def __init__(self, status: int, message: str, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class Abandoned(Exception):
+    """Nobody is waiting for the result any more: the deadline passed ('deadline') or the client left ('disconnected')."""
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Ticket:
+    """A place in the admission queue, held from before the request body is read until the work finishes."""
+    def __init__(self, controller: 'AdmissionController'):
+        self.controller = controller
+        self.started = False
+
+    def __enter__(self) -> 'Ticket':
+        return self
+
+    def __exit__(self, *exc):
+        if not self.started:
+            self.controller._leave_queue()
+
+    async def run(self, fn: Callable[..., Any], *args, deadline: Optional[float] = None,
+                  cancel_event: Optional[threading.Event] = None,
+                  disconnected: Optional[asyncio.Future] = None) -> Any:
+        """
+        Wait for an inference slot, then run fn(*args) on the inference thread pool.
+        Args:
+            fn: Blocking work; it keeps its slot until it returns, even if the request is abandoned
+            deadline: Event-loop time (loop.time()) after which the result is no longer wanted
+            cancel_event: Set when the request is abandoned mid-run so fn can stop early
+            disconnected: Future that completes when the client disconnects
+        Returns:
+            fn's return value
+        Raises:
+            Rejected: 503 when no slot frees up within max_wait (or before the deadline)
+            Abandoned: The deadline passed or the client disconnected
+        """
+        controller = self.controller
+        loop = asyncio.get_running_loop()
+        slots = controller._get_slots()
+        wait = controller.max_wait
+        if deadline is not None:
+            wait = min(wait, deadline - loop.time())
+        acquire = asyncio.ensure_future(slots.acquire())
+        waiters = {acquire} if disconnected is None else {acquire, disconnected}
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=max(0.0, wait), return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            acquire.cancel()
+            raise
+        if acquire not in done:
+            if not acquire.cancel() and not acquire.cancelled():
+                slots.release()  # Acquired in the same loop iteration as the timeout
+            if disconnected is not None and disconnected in done:
+                controller._record('abandoned_disconnected')
+                raise Abandoned('disconnected')
+            controller._record('rejected_wait')
+            raise Rejected(503, 'Timed out waiting for an inference slot', controller.retry_after())
+
+        self.started = True
+        controller._start()
+        started = time.perf_counter()
+        future = loop.run_in_executor(controller.executor, fn, *args)
+
+        def finished(f):
+            controller._finish(time.perf_counter() - started)
+            slots.release()
+            if not f.cancelled():
+                f.exception()  # Retrieved here so results of abandoned requests don't log as unhandled
+
+        future.add_done_callback(finished)
+        remaining = None if deadline is None else max(0.0, deadline - loop.time())
+        waiters = {future} if disconnected is None else {future, disconnected}
+        # asyncio.wait never cancels the executor future, so the slot is only released by finished()
+        done, _ = await asyncio.wait(waiters, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        if future in done:
+            return future.result()
+        if cancel_event is not None:
+            cancel_event.set()
+        reason = 'disconnected' if disconnected is not None and disconnected in done else 'deadline'
+        controller._record(f'abandoned_{reason}')
+        raise Abandoned(reason)
+
+
+class AdmissionController:
+    """
+    Admission control for the ASGI server's inference endpoints. At most max_concurrent requests
+    run inference at once, on a dedicated thread pool; up to max_queue more wait for a slot, and
+    anything beyond that is turned away with 429 before its body is read. A queued request that
+    gets no slot within max_wait seconds is answered 503, so the queue can't grow stale under
+    sustained overload. Both carry a Retry-After estimate from the smoothed service time.
+    All methods except the executor's work run on the event loop thread.
+    """
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 16, max_wait: float = 10.0,
+                 smoothing: float = 0.2):
+        """
+        Args:
+            max_concurrent: Requests running inference at once
+            max_queue: Admitted requests allowed to wait for a slot
+            max_wait: Seconds a request may wait for a slot before it is answered 503
+            smoothing: Weight of the newest service time in the moving average used for Retry-After
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = max(0.0, float(max_wait))
+        self.smoothing = smoothing
+        self.executor = ThreadPoolExecutor(self.max_concurrent, thread_name_prefix='asgi-inference')
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._queued = 0
+        self._running = 0
+        self._service_time: Optional[float] = None
+        self._outcomes: Dict[str, int] = {}
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the server's event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    def admit(self) -> Ticket:
+        """
+        Claim a place in the queue. Use as `with controller.admit() as ticket:` so the place is
+        given back if the request fails before ticket.run() starts its work.
+        Raises:
+            Rejected: 429 when max_concurrent requests are running and max_queue are waiting
+        """
+        if self._queued + self._running >= self.max_concurrent + self.max_queue:
+            self._record('rejected_full')
+            raise Rejected(429, 'Too many requests in flight', self.retry_after())
+        self._queued += 1
+        self._record('admitted')
+        return Ticket(self)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is expected to drain, at least 1."""
+        service_time = self._service_time if self._service_time is not None else 1.0
+        backlog = max(1, self._queued + self._running)
+        return max(1, math.ceil(service_time * backlog / self.max_concurrent))
+
+    def _leave_queue(self):
+        self._queued -= 1
+        ADMISSION_DEPTH.set(self._queued, state='queued')
+
+    def _start(self):
+        self._queued -= 1
+        self._running += 1
+        ADMISSION_DEPTH.set(self._queued, state='queued')
+        ADMISSION_DEPTH.set(self._running, state='running')
+
+    def _finish(self, seconds: float):
+        self._running -= 1
+        ADMISSION_DEPTH.set(self._running, state='running')
+        if self._service_time is None:
+            self._service_time = seconds
+        else:
+            self._service_time += self.smoothing * (seconds - self._service_time)
+
+    def _record(self, outcome: str):
+        self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+        ADMISSION.inc(result=outcome)
+        if outcome == 'admitted':
+            ADMISSION_DEPTH.set(self._queued, state='queued')
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'max_wait_seconds': self.max_wait,
+            'queued': self._queued,
+            'running': self._running,
+            'avg_service_seconds': round(self._service_time, 4) if self._service_time is not None else None,
+            'retry_after': self.retry_after(),
+            **{outcome: self._outcomes.get(outcome, 0) for outcome in (
+                'admitted', 'rejected_full', 'rejected_wait', 'abandoned_deadline', 'abandoned_disconnected')}
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,174 @@
+import os
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+
+class ArtifactStorage:
+    """
+    Keeps upload and result directories within a size and age budget.
+    Every file's last access (write or download) is tracked; a background sweep deletes files
+    not accessed for max_age seconds and then the least recently used ones until the total size
+    fits in max_bytes. Files in use by running work can be held so they are never evicted, and
+    anything touched within the last grace seconds is left alone.
+    """
+    def __init__(self, directories: List[str], max_bytes: int = 0, max_age: float = 0.0,
+                 sweep_interval: float = 300.0, grace: float = 60.0):
+        """
+        Args:
+            directories: Directories to manage (created if missing)
+            max_bytes: Total size budget across all directories (0 for no limit)
+            max_age: Seconds since last access after which a file is deleted (0 for no limit)
+            sweep_interval: Seconds between background sweeps
+            grace: Files accessed this recently are never evicted
+        """
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self.grace = grace
+        self._files: Dict[str, List[float]] = {}  # path -> [size, last access]
+        self._held = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.last_sweep = None
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self) -> 'ArtifactStorage':
+        self.sweep()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='artifact-storage', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error in artifact storage sweep: {str(e)}")
+
+    def add(self, path: str):
+        """Account for a newly written file and evict older ones right away if the budget is exceeded."""
+        path = os.path.abspath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._lock:
+            self._files[path] = [size, time.time()]
+            over = self.max_bytes and self._total() > self.max_bytes
+        if over:
+            self.evict()
+
+    def touch(self, path: str):
+        """Record a read so the file counts as recently used; the access time is also stored on disk."""
+        path = os.path.abspath(path)
+        now = time.time()
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None:
+                entry[1] = now
+        try:
+            os.utime(path, (now, os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+    def pin(self, path: str):
+        """Protect a file from eviction until a matching unpin (e.g. an upload a queued job will read)."""
+        with self._lock:
+            self._held[os.path.abspath(path)] += 1
+
+    def unpin(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._held[path] -= 1
+            if self._held[path] <= 0:
+                del self._held[path]
+
+    @contextmanager
+    def hold(self, path: str):
+        """Pin a file for the duration of the with-block."""
+        self.pin(path)
+        try:
+            yield
+        finally:
+            self.unpin(path)
+
+    def _total(self) -> int:
+        return sum(size for size, _ in self._files.values())
+
+    def _scan(self):
+        """Rebuild the index from disk, keeping known access times and picking up files written elsewhere."""
+        files = {}
+        for directory in self.directories:
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    known = self._files.get(path)
+                    files[path] = [st.st_size, max(known[1] if known else 0.0, st.st_atime, st.st_mtime)]
+        self._files = files
+
+    def _delete(self, path: str) -> int:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        size = self._files.pop(path)[0]
+        self.evicted_files += 1
+        self.evicted_bytes += size
+        return size
+
+    def evict(self) -> int:
+        """Delete expired files, then least recently used ones until under max_bytes. Returns files deleted."""
+        now = time.time()
+        with self._lock:
+            before = self.evicted_files
+            candidates = sorted((access, path) for path, (_, access) in self._files.items()
+                                if self._held[path] == 0 and now - access > self.grace)
+            total = self._total()
+            for access, path in candidates:
+                expired = self.max_age and now - access > self.max_age
+                if not expired and not (self.max_bytes and total > self.max_bytes):
+                    break
+                try:
+                    total -= self._delete(path)
+                except OSError as e:
+                    print(f"Could not evict {path}: {str(e)}")
+            return self.evicted_files - before
+
+    def sweep(self) -> int:
+        with self._lock:
+            self._scan()
+        evicted = self.evict()
+        self.last_sweep = time.time()
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directories': self.directories,
+                'files': len(self._files),
+                'bytes': self._total(),
+                'max_bytes': self.max_bytes,
+                'max_age': self.max_age,
+                'held': len(self._held),
+                'evicted_files': self.evicted_files,
+                'evicted_bytes': self.evicted_bytes,
+                'last_sweep': self.last_sweep,
+            }
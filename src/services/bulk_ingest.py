@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# One output row per detection; images without detections get a single row with class None
+COLUMNS = ('key', 'width', 'height', 'class', 'display_name', 'category', 'confidence', 'x1', 'y1', 'x2', 'y2', 'error')
+
+# (key, payload): payload is a file path to read or the already-read bytes of an archive member
+Item = Tuple[str, Union[str, bytes]]
+
+
+def _is_image(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def iter_items(inputs: List[str], skip: int = 0) -> Iterator[Item]:
+    """
+    Yield every image under the inputs in a stable order, which is what makes resuming by count work.
+    Directories are walked in sorted order and archive members are read one at a time, so nothing
+    is extracted to disk or held in memory. The first skip images (already processed by a resumed
+    run) are passed over without reading them; in uncompressed TARs their data is seeked past.
+    """
+    for path in inputs:
+        lower = path.lower()
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if _is_image(name):
+                        if skip:
+                            skip -= 1
+                            continue
+                        yield os.path.join(root, name), os.path.join(root, name)
+        elif lower.endswith('.zip'):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and _is_image(info.filename):
+                        if skip:
+                            skip -= 1
+                            continue
+                        yield f"{path}::{info.filename}", archive.read(info)
+        elif lower.endswith(ARCHIVE_SUFFIXES):
+            # Random-access mode reads member headers only; data is read for members that are yielded
+            with tarfile.open(path, mode='r:*') as archive:
+                for member in archive:
+                    if member.isfile() and _is_image(member.name):
+                        if skip:
+                            skip -= 1
+                            continue
+                        yield f"{path}::{member.name}", archive.extractfile(member).read()
+        elif os.path.isfile(path) and _is_image(path):
+            if skip:
+                skip -= 1
+                continue
+            yield path, path
+        else:
+            raise ValueError(f"Not a folder, archive or image: {path}")
+
+
+def _decode(item: Item) -> Tuple[str, Optional[np.ndarray], Optional[str]]:
+    key, payload = item
+    try:
+        if isinstance(payload, str):
+            with open(payload, 'rb') as f:
+                payload = f.read()
+        if not payload:
+            return key, None, 'Empty file'
+        img = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return key, None, 'Could not decode image'
+        return key, img, None
+    except OSError as e:
+        return key, None, str(e)
+    except Exception as e:
+        # Truncated or corrupt files (cv2.error and the like) become an error row, not a failed run
+        return key, None, f"{type(e).__name__}: {str(e)}"
+
+
+class JsonlWriter:
+    """Appends rows as JSON lines; the checkpoint stores the byte offset of the last flush."""
+    def __init__(self, path: str, state: Optional[Dict[str, Any]] = None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a+b')
+        # Drop rows written after the last checkpoint so a resumed run doesn't duplicate them
+        self._file.truncate(state['offset'] if state else 0)
+        self._file.seek(0, os.SEEK_END)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self._file.write(json.dumps(row).encode('utf-8') + b'\n')
+
+    def flush(self) -> Dict[str, Any]:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {'offset': self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Writes rows into numbered Parquet part files inside a directory, one part per flush.
+    The checkpoint stores how many parts are complete; later parts are removed on resume.
+    Needs pyarrow.
+    """
+    def __init__(self, directory: str, state: Optional[Dict[str, Any]] = None):
+        import pyarrow  # noqa: F401  (fail early with a clear ImportError)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.parts = state['parts'] if state else 0
+        for name in os.listdir(directory):
+            if name.startswith('part-') and name.endswith('.parquet') and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(directory, name))
+        self._rows: List[Dict[str, Any]] = []
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._rows.extend(rows)
+
+    def flush(self) -> Dict[str, Any]:
+        if self._rows:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.table({column: [row[column] for row in self._rows] for column in COLUMNS})
+            pq.write_table(table, os.path.join(self.directory, f'part-{self.parts:05d}.parquet'))
+            self.parts += 1
+            self._rows = []
+        return {'parts': self.parts}
+
+    def close(self):
+        self.flush()
+
+
+class BulkIngestor:
+    """
+    Offline batch runner for large image collections (camera-trap seasons).
+    A reader streams images from folders and archives, a thread pool reads and decodes them
+    ahead of the model within a bounded window, and decoded images are fed to the detector in
+    batches. Results are written in input order and the run checkpoints every checkpoint_every
+    images, so memory stays flat however large the dataset is and an interrupted run resumes
+    where the last checkpoint left off.
+    """
+    def __init__(self, detector, output: str, output_format: Optional[str] = None,
+                 checkpoint: Optional[str] = None, batch_size: int = 16, decode_threads: int = 0,
+                 checkpoint_every: int = 1000, annotate_dir: Optional[str] = None):
+        """
+        Args:
+            detector: AnimalDetector or InferenceWorkerPool (anything with detect_frames / draw_detections)
+            output: JSONL file or Parquet directory
+            output_format: 'jsonl' or 'parquet'; inferred from output when omitted
+            checkpoint: Checkpoint file (defaults to <output>.checkpoint.json)
+            batch_size: Images per detect_frames call
+            decode_threads: Read/decode threads; 0 uses one per core
+            checkpoint_every: Images between output flushes and checkpoint writes
+            annotate_dir: If set, annotated copies of images with detections are written here
+        """
+        self.detector = detector
+        self.output = output
+        self.output_format = output_format or ('jsonl' if output.endswith(('.jsonl', '.json')) else 'parquet')
+        if self.output_format not in ('jsonl', 'parquet'):
+            raise ValueError(f"Unknown output format: {self.output_format}")
+        self.checkpoint = checkpoint or output.rstrip('/\\') + '.checkpoint.json'
+        self.batch_size = max(1, batch_size)
+        self.decode_threads = decode_threads if decode_threads > 0 else (os.cpu_count() or 1)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.annotate_dir = annotate_dir
+
+    def _load_checkpoint(self, inputs: List[str]) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint):
+            return None
+        with open(self.checkpoint) as f:
+            state = json.load(f)
+        if state.get('inputs') != inputs or state.get('format') != self.output_format:
+            raise ValueError(f"Checkpoint {self.checkpoint} belongs to a different run; delete it or use a new output")
+        return state
+
+    def _save_checkpoint(self, state: Dict[str, Any]):
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.checkpoint)
+
+    def _annotate(self, key: str, img: np.ndarray, detections: List[Dict], inputs: List[str]):
+        # Mirror the input layout under annotate_dir: <input name>/<path inside the folder or archive>
+        root = next((path for path in inputs if key == path or key.startswith((path + os.sep, path + '::'))), key)
+        relative = os.path.join(os.path.basename(root), key[len(root):].lstrip(os.sep + ':'))
+        path = os.path.join(self.annotate_dir, os.path.splitext(relative)[0] + '.jpg')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.detector.draw_detections(img, detections)
+        cv2.imwrite(path, img)
+
+    @staticmethod
+    def _rows(key: str, img: Optional[np.ndarray], detections: List[Dict], error: Optional[str]) -> List[Dict]:
+        height, width = img.shape[:2] if img is not None else (None, None)
+        if not detections:
+            return [{'key': key, 'width': width, 'height': height, 'class': None, 'display_name': None, 'category': None,
+                     'confidence': None, 'x1': None, 'y1': None, 'x2': None, 'y2': None, 'error': error}]
+        return [{'key': key, 'width': width, 'height': height, 'class': det['class'],
+                 'display_name': det['display_name'], 'category': det['category'],
+                 'confidence': det['confidence'], 'x1': det['bbox'][0], 'y1': det['bbox'][1],
+                 'x2': det['bbox'][2], 'y2': det['bbox'][3], 'error': None} for det in detections]
+
+    def run(self, inputs: List[str], resume: bool = True,
+            on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Process every image under inputs.
+        Args:
+            inputs: Folders, ZIP/TAR archives or single images
+            resume: Continue from an existing checkpoint instead of starting over
+            on_progress: Called with the running statistics after every checkpoint
+        Returns:
+            Final statistics: images, images_with_detections, detections, errors, elapsed, images_per_second
+        """
+        inputs = [os.path.abspath(path) for path in inputs]
+        state = self._load_checkpoint(inputs) if resume else None
+        if state is None and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        writer_cls = JsonlWriter if self.output_format == 'jsonl' else ParquetWriter
+        writer = writer_cls(self.output, state['writer'] if state else None)
+        stats = dict(state['stats']) if state else {'images': 0, 'images_with_detections': 0,
+                                                    'detections': 0, 'errors': 0}
+        skip = stats['images']
+        started = time.perf_counter()
+        processed_this_run = 0
+        since_checkpoint = 0
+
+        def checkpoint():
+            self._save_checkpoint({'inputs': inputs, 'format': self.output_format,
+                                   'writer': writer.flush(), 'stats': stats})
+            if on_progress is not None:
+                on_progress(dict(stats))
+
+        def process(batch: List[Tuple[str, Optional[np.ndarray], Optional[str]]]):
+            nonlocal processed_this_run, since_checkpoint
+            decoded = [(key, img) for key, img, _ in batch if img is not None]
+            results = dict(zip([key for key, _ in decoded], self.detector.detect_frames([img for _, img in decoded])))
+            rows = []
+            for key, img, error in batch:
+                detections = results.get(key, [])
+                rows.extend(self._rows(key, img, detections, error))
+                stats['images'] += 1
+                stats['errors'] += error is not None
+                if detections:
+                    stats['images_with_detections'] += 1
+                    stats['detections'] += len(detections)
+                    if self.annotate_dir:
+                        self._annotate(key, img, detections, inputs)
+            writer.write(rows)
+            processed_this_run += len(batch)
+            since_checkpoint += len(batch)
+            if since_checkpoint >= self.checkpoint_every:
+                checkpoint()
+                since_checkpoint = 0
+
+        items = iter_items(inputs, skip=skip)
+        window = max(2 * self.batch_size, 2 * self.decode_threads)
+        in_flight = deque()
+        batch = []
+        try:
+            with ThreadPoolExecutor(self.decode_threads, thread_name_prefix='ingest-decode') as executor:
+                for item in items:
+                    in_flight.append(executor.submit(_decode, item))
+                    # Keep at most `window` images read ahead of the model
+                    while len(in_flight) >= window:
+                        batch.append(in_flight.popleft().result())
+                        if len(batch) >= self.batch_size:
+                            process(batch)
+                            batch = []
+                while in_flight:
+                    batch.append(in_flight.popleft().result())
+                    if len(batch) >= self.batch_size:
+                        process(batch)
+                        batch = []
+                if batch:
+                    process(batch)
+            checkpoint()
+        finally:
+            writer.close()
+        elapsed = time.perf_counter() - started
+        return {**stats, 'resumed_from': skip, 'elapsed': elapsed,
+                'images_per_second': processed_this_run / elapsed if elapsed > 0 else 0.0}
@@ -0,0 +1,215 @@
+import time
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from src.utils.metrics import REALTIME_DROPPED, REALTIME_FPS, RateMeter, timed
+
+FrameProcessor = Callable[[np.ndarray], Tuple[np.ndarray, List[Dict]]]
+
+
+class FrameBroadcaster:
+    """
+    Holds the latest annotated frame of one source and fans it out to any number of viewers.
+    Viewers only ever receive the newest frame, so slow clients drop frames instead of queueing
+    them, and each frame is JPEG-encoded at most once per quality setting no matter how many
+    clients are watching.
+    """
+    def __init__(self, name: str = ''):
+        """
+        Args:
+            name: Source label used in metrics
+        """
+        self.name = name
+        self._changed = threading.Condition()
+        self._frame = None
+        self._detections: List[Dict] = []
+        self._seq = 0
+        self._encoded: Dict[int, Tuple[int, bytes]] = {}
+        self._encode_lock = threading.Lock()
+        self.viewers = 0
+        self.published = 0
+        self.encodes = 0
+        self.closed = False
+
+    def publish(self, frame: np.ndarray, detections: Optional[List[Dict]] = None):
+        """Replace the latest frame; the broadcaster keeps a reference, so don't modify frame afterwards."""
+        with self._changed:
+            self._frame = frame
+            self._detections = detections or []
+            self._seq += 1
+            self.published += 1
+            self._changed.notify_all()
+
+    def close(self):
+        """Wake every viewer and end their streams."""
+        with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+    def latest(self, after_seq: int = 0, timeout: float = 5.0) -> Optional[Tuple[int, np.ndarray, List[Dict]]]:
+        """Wait for a frame newer than after_seq and return (seq, frame, detections), or None on timeout / close."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._seq > after_seq or self.closed, timeout=timeout)
+            if self.closed or self._seq <= after_seq:
+                return None
+            return self._seq, self._frame, self._detections
+
+    def jpeg(self, seq: int, frame: np.ndarray, quality: int = 80) -> bytes:
+        """JPEG bytes of frame seq at this quality, encoded once and shared by every viewer."""
+        cached = self._encoded.get(quality)
+        if cached is not None and cached[0] == seq:
+            return cached[1]
+        with self._encode_lock:
+            cached = self._encoded.get(quality)
+            if cached is not None and cached[0] == seq:
+                return cached[1]
+            with timed('encode'):
+                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            data = buffer.tobytes()
+            self._encoded[quality] = (seq, data)
+            self.encodes += 1
+            return data
+
+    def stream(self, max_fps: float = 0.0, quality: int = 80, timeout: float = 5.0) -> Iterator[bytes]:
+        """
+        multipart/x-mixed-replace chunks for one viewer.
+        Args:
+            max_fps: Upper bound on frames sent to this viewer (0 for no limit)
+            quality: JPEG quality for this viewer
+            timeout: Stop when the source produces nothing for this many seconds
+        """
+        interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        with self._changed:
+            self.viewers += 1
+        try:
+            seq = 0
+            next_send = 0.0
+            while True:
+                if interval:
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                latest = self.latest(seq, timeout)
+                if latest is None:
+                    return
+                if seq and latest[0] > seq + 1:
+                    REALTIME_DROPPED.inc(latest[0] - seq - 1, source=self.name, reason='viewer')
+                seq, frame, _ = latest
+                next_send = time.monotonic() + interval
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + self.jpeg(seq, frame, quality) + b'\r\n')
+        finally:
+            with self._changed:
+                self.viewers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'viewers': self.viewers,
+            'published': self.published,
+            'encodes': self.encodes,
+            'qualities': sorted(self._encoded),
+        }
+
+
+class LiveSource:
+    """
+    One background capture + inference loop that publishes annotated frames to a FrameBroadcaster.
+    The loop starts when the first viewer arrives and stops after idle_timeout seconds without
+    viewers, so the camera is only held open while somebody is watching.
+    """
+    def __init__(self, source: Union[int, str], process: Callable[[], FrameProcessor], idle_timeout: float = 10.0):
+        """
+        Args:
+            source: cv2.VideoCapture argument (device index, file path or stream URL)
+            process: Factory returning a process(frame) -> (annotated_frame, detections) callable;
+                called once per capture session so per-stream state like tracking starts fresh
+            idle_timeout: Seconds without viewers before the capture is released
+        """
+        self.source = source
+        self.process = process
+        self.idle_timeout = idle_timeout
+        self.broadcaster = FrameBroadcaster(str(source))
+        self.frames = 0
+        self.failures = 0
+        self._thread = None
+        self._requested = 0.0  # monotonic time of the last ensure_running, before its viewer is counted
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def ensure_running(self) -> FrameBroadcaster:
+        """Start the capture loop if it is not already running and return the broadcaster to watch."""
+        with self._lock:
+            self._requested = time.monotonic()
+            if self._thread is None or not self._thread.is_alive():
+                if self.broadcaster.closed:
+                    self.broadcaster = FrameBroadcaster(str(self.source))
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, args=(self.broadcaster,),
+                                                name=f'live-source-{self.source}', daemon=True)
+                self._thread.start()
+            return self.broadcaster
+
+    def _idle(self, broadcaster: FrameBroadcaster, idle_since: float) -> bool:
+        return (broadcaster.viewers == 0
+                and time.monotonic() - max(idle_since, self._requested) > self.idle_timeout)
+
+    def _detach(self):
+        """
+        Called under _lock by a loop that is about to stop: later viewers get a fresh loop and
+        broadcaster instead of the one being closed. A no-op if a newer loop has already replaced this one.
+        """
+        if self._thread is threading.current_thread():
+            self._thread = None
+            self.broadcaster = FrameBroadcaster(str(self.source))
+
+    def _run(self, broadcaster: FrameBroadcaster):
+        camera = None
+        meter = RateMeter()
+        idle_since = None
+        try:
+            camera = cv2.VideoCapture(self.source)
+            process = self.process()
+            while not self._stop.is_set():
+                if broadcaster.viewers > 0:
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif self._idle(broadcaster, idle_since):
+                    # Decided under the lock so ensure_running can't hand out this broadcaster meanwhile
+                    with self._lock:
+                        if self._idle(broadcaster, idle_since):
+                            self._detach()
+                            break
+                with timed('decode'):
+                    success, frame = camera.read()
+                if not success:
+                    self.failures += 1
+                    break
+                annotated, detections = process(frame)
+                broadcaster.publish(annotated, detections)
+                self.frames += 1
+                REALTIME_FPS.set(meter.tick(), source=str(self.source))
+        except Exception as e:
+            print(f"Error in live source {self.source}: {str(e)}")
+        finally:
+            with self._lock:
+                self._detach()
+            if camera is not None:
+                camera.release()
+            broadcaster.close()
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'source': str(self.source), 'running': self.running(), 'frames': self.frames,
+                'failures': self.failures, **self.broadcaster.stats()}
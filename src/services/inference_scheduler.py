@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ('image', 'imgsz', 'future', 'enqueued_at')
+
+    def __init__(self, image: np.ndarray, imgsz: int):
+        self.image = image
+        self.imgsz = imgsz
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceScheduler:
+    """
+    Dynamic micro-batching scheduler in front of a shared detector model.
+    Callers from any thread submit single images and get a Future back; a single
+    worker thread coalesces pending requests into batches of up to max_batch_size,
+    waiting at most max_wait_ms for a batch to fill, and runs one forward pass per batch.
+    """
+    def __init__(self, detector, max_batch_size: int = 8, max_wait_ms: float = 5.0, max_queue: int = 0):
+        """
+        Args:
+            detector: AnimalDetector whose _predict_batch runs the forward pass
+            max_batch_size: Maximum number of images per forward pass
+            max_wait_ms: How long the first request of a batch may wait for others to arrive
+            max_queue: Maximum number of pending requests (0 for unbounded)
+        """
+        self.detector = detector
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        # Orders submit()'s running check and put against stop()'s sentinel
+        self._submit_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._failed = 0
+        self._max_depth = 0
+        self._wait_total = 0.0
+        self._forward_total = 0.0
+
+    def start(self) -> 'InferenceScheduler':
+        if self._thread is None or not self._thread.is_alive():
+            with self._submit_lock:
+                self._running = True
+            self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._submit_lock:
+            self._running = False
+            self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, image: np.ndarray, imgsz: int = 640) -> Future:
+        """
+        Queue a BGR image for inference.
+        Returns:
+            Future resolving to the (xyxy, conf, cls) arrays for this image
+        """
+        request = _Request(image, imgsz)
+        with self._submit_lock:
+            if not self._running:
+                raise RuntimeError("Inference scheduler is not running")
+            self._queue.put(request)  # Always ahead of stop()'s sentinel, so it is always executed
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self._max_depth:
+                self._max_depth = depth
+        return request.future
+
+    def predict(self, image: np.ndarray, imgsz: int = 640):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(image, imgsz).result()
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._running = False
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while self._running or not self._queue.empty():
+            item = self._queue.get()
+            if item is None:
+                continue
+            batch = self._collect(item)
+            groups: Dict[int, List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(request.imgsz, []).append(request)
+            for imgsz, requests in groups.items():
+                self._execute(requests, imgsz)
+        # Nothing should be left behind the sentinel, but never leave a caller blocked on a future
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError("Inference scheduler stopped"))
+
+    def _execute(self, requests: List[_Request], imgsz: int):
+        started = time.perf_counter()
+        live = [r for r in requests if r.future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        try:
+            outputs = self.detector._predict_batch([r.image for r in live], imgsz)
+        except Exception as e:
+            with self._lock:
+                self._failed += len(live)
+            for request in live:
+                request.future.set_exception(e)
+            return
+        finished = time.perf_counter()
+        with self._lock:
+            self._batch_sizes[len(live)] += 1
+            self._requests += len(live)
+            self._wait_total += sum(started - r.enqueued_at for r in live)
+            self._forward_total += finished - started
+        for request, output in zip(live, outputs):
+            request.future.set_result(output)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and batch-size statistics."""
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                'running': self._running,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_depth,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'requests': self._requests,
+                'failed': self._failed,
+                'batches': batches,
+                'mean_batch_size': self._requests / batches if batches else 0.0,
+                'batch_size_histogram': {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                'mean_queue_wait_ms': 1000.0 * self._wait_total / self._requests if self._requests else 0.0,
+                'mean_forward_ms': 1000.0 * self._forward_total / batches if batches else 0.0,
+            }
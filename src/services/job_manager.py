@@ -0,0 +1,183 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+PENDING, RUNNING, COMPLETED, FAILED, CANCELLED = 'pending', 'running', 'completed', 'failed', 'cancelled'
+FINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class Job:
+    """State and progress of one background processing job."""
+    def __init__(self, job_id: str, kind: str, metadata: Optional[Dict[str, Any]] = None,
+                 on_change: Optional[Callable[['Job'], None]] = None):
+        self.job_id = job_id
+        self.kind = kind
+        self.metadata = metadata or {}
+        self.status = PENDING
+        self.frames_done = 0
+        self.total_frames = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.version = 0  # Bumped on every change so event streams can wait for updates
+        self._on_change = on_change
+
+    def report_progress(self, frames_done: int, total_frames: int):
+        """Progress callback suitable for VideoPipeline.run(on_progress=...)."""
+        self.frames_done = frames_done
+        self.total_frames = total_frames
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        progress = None
+        eta = None
+        if self.total_frames > 0:
+            progress = min(1.0, self.frames_done / self.total_frames)
+            if self.started_at and self.frames_done and self.status == RUNNING:
+                elapsed = time.time() - self.started_at
+                eta = elapsed / self.frames_done * max(0, self.total_frames - self.frames_done)
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': self.status,
+            'frames_done': self.frames_done,
+            'total_frames': self.total_frames,
+            'progress': progress,
+            'eta_seconds': eta,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'result': self.result,
+            'error': self.error,
+            **self.metadata,
+        }
+
+
+class JobManager:
+    """
+    Runs long jobs (video processing) on a bounded background executor.
+    Jobs report progress through Job.report_progress, can be cancelled through their
+    cancel_event, and are kept for retention_seconds after they finish.
+    """
+    def __init__(self, max_concurrent: int = 2, retention_seconds: float = 3600.0, max_pending: int = 100):
+        """
+        Args:
+            max_concurrent: Jobs that may run at the same time
+            retention_seconds: How long finished jobs stay queryable
+            max_pending: Maximum number of queued, not yet started jobs
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.retention_seconds = retention_seconds
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='job')
+        self._jobs: Dict[str, Job] = {}
+        self._changed = threading.Condition()
+
+    def submit(self, kind: str, work: Callable[[Job], Any], metadata: Optional[Dict[str, Any]] = None,
+               on_finish: Optional[Callable[[Job], None]] = None) -> Job:
+        """
+        Queue work(job) for background execution; its return value becomes job.result.
+        on_finish(job) is called once the job is done, including when it was cancelled before starting.
+        Raises:
+            RuntimeError: If too many jobs are already waiting
+        """
+        self._expire()
+        pending = sum(1 for job in self._jobs.values() if job.status == PENDING)
+        if pending >= self.max_pending:
+            raise RuntimeError("Too many pending jobs")
+        job = Job(uuid.uuid4().hex, kind, metadata, on_change=self._touch)
+        with self._changed:
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, work, on_finish)
+        return job
+
+    def _touch(self, job: Job):
+        with self._changed:
+            job.version += 1
+            self._changed.notify_all()
+
+    def _run(self, job: Job, work: Callable[[Job], Any], on_finish: Optional[Callable[[Job], None]] = None):
+        try:
+            if not job.cancel_event.is_set():
+                self._execute(job, work)
+        finally:
+            if on_finish is not None:
+                on_finish(job)
+
+    def _execute(self, job: Job, work: Callable[[Job], Any]):
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._touch(job)
+        try:
+            result = work(job)
+            job.result = result
+            job.status = CANCELLED if job.cancel_event.is_set() else COMPLETED
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = FAILED
+        job.finished_at = time.time()
+        self._touch(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        self._expire()
+        return sorted(self._jobs.values(), key=lambda job: job.created_at)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Ask a job to stop; pending jobs never start and running jobs stop at the next frame."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.status == PENDING:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        self._touch(job)
+        return job
+
+    def events(self, job_id: str, timeout: float = 15.0, min_interval: float = 0.5) -> Iterator[Dict[str, Any]]:
+        """
+        Yield job snapshots whenever the job changes, ending after its final state.
+        Yields None when nothing changed for timeout seconds so callers can send keep-alives.
+        Snapshots are at least min_interval seconds apart so per-frame progress doesn't flood clients.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        seen = -1
+        while True:
+            with self._changed:
+                if job.version == seen:
+                    self._changed.wait_for(lambda: job.version != seen, timeout=timeout)
+                changed = job.version != seen
+                seen = job.version
+            if changed:
+                snapshot = job.to_dict()
+                yield snapshot
+                if snapshot['status'] in FINAL_STATES:
+                    return
+                time.sleep(min_interval)
+            else:
+                yield None
+
+    def _expire(self):
+        cutoff = time.time() - self.retention_seconds
+        with self._changed:
+            for job_id in [j.job_id for j in self._jobs.values()
+                           if j.status in FINAL_STATES and (j.finished_at or 0) < cutoff]:
+                del self._jobs[job_id]
+
+    def shutdown(self):
+        for job in self._jobs.values():
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,153 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class ResultCache:
+    """
+    Content-addressed cache of detection responses.
+    Entries are keyed by a hash of the uploaded bytes within a namespace that captures the
+    model identity and thresholds, so changing either invalidates every older entry.
+    Layer 1 is an in-memory LRU bounded by serialized size; layer 2 is an optional SQLite file.
+    Entries with any result artifact deleted from disk are treated as misses.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, db_path: Optional[str] = None, root: str = '.'):
+        """
+        Args:
+            max_bytes: Memory budget for the LRU layer, measured as serialized JSON size
+            db_path: Optional SQLite file for the persistent layer
+            root: Directory that artifact URLs are resolved against
+        """
+        self.max_bytes = max_bytes
+        self.root = root
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._namespace = None
+        self._counters = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'disk_hits': 0,
+                          'stale': 0, 'evictions': 0, 'invalidations': 0}
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value BLOB NOT NULL)')
+            self._db.commit()
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _use_namespace(self, namespace: str):
+        """Drop every entry from other namespaces the first time a new namespace is seen."""
+        if namespace == self._namespace:
+            return
+        if self._namespace is not None:
+            self._counters['invalidations'] += 1
+        self._namespace = namespace
+        self._memory.clear()
+        self._memory_bytes = 0
+        if self._db is not None:
+            self._db.execute('DELETE FROM results WHERE namespace != ?', (namespace,))
+            self._db.commit()
+
+    @staticmethod
+    def artifacts(entry: Dict[str, Any]) -> List[str]:
+        """URL paths of the files an entry's response links to."""
+        if 'artifacts' in entry:
+            return entry['artifacts']
+        return [entry['artifact']] if entry.get('artifact') else []  # Entries stored before 'artifacts'
+
+    def _artifacts_exist(self, entry: Dict[str, Any]) -> bool:
+        return all(os.path.exists(os.path.join(self.root, artifact.lstrip('/')))
+                   for artifact in self.artifacts(entry))
+
+    def _remember(self, key: str, blob: bytes):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        if len(blob) > self.max_bytes:
+            return
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._counters['evictions'] += 1
+
+    def _forget(self, key: str):
+        blob = self._memory.pop(key, None)
+        if blob is not None:
+            self._memory_bytes -= len(blob)
+        if self._db is not None:
+            self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+            self._db.commit()
+
+    def get(self, content_hash: str, namespace: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for these bytes under this model/threshold namespace, or None."""
+        with self._lock:
+            self._use_namespace(namespace)
+            blob = self._memory.get(content_hash)
+            layer = 'memory_hits'
+            if blob is not None:
+                self._memory.move_to_end(content_hash)
+            elif self._db is not None:
+                row = self._db.execute('SELECT value FROM results WHERE key = ? AND namespace = ?',
+                                       (content_hash, namespace)).fetchone()
+                if row is not None:
+                    blob = bytes(row[0])
+                    layer = 'disk_hits'
+                    self._remember(content_hash, blob)
+            if blob is None:
+                self._counters['misses'] += 1
+                return None
+            entry = json.loads(blob)
+            if not self._artifacts_exist(entry):
+                self._forget(content_hash)
+                self._counters['stale'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._counters['hits'] += 1
+            self._counters[layer] += 1
+            return entry
+
+    def put(self, content_hash: str, namespace: str, entry: Dict[str, Any]):
+        """
+        Store an entry. entry['artifacts'] may list the result files (URL paths) the entry depends on.
+        """
+        blob = json.dumps(entry).encode('utf-8')
+        with self._lock:
+            self._use_namespace(namespace)
+            self._remember(content_hash, blob)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO results (key, namespace, value) VALUES (?, ?, ?)',
+                                 (content_hash, namespace, blob))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM results')
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            return {
+                **self._counters,
+                'hit_rate': self._counters['hits'] / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'max_bytes': self.max_bytes,
+                'disk_entries': disk_entries,
+                'namespace': self._namespace,
+            }
@@ -0,0 +1,332 @@
+import os
+import time
+import queue
+import shutil
+import tempfile
+import threading
+import subprocess
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+
+from src.utils.video_pipeline import VideoPipeline
+
+# Per-process state of a segment worker, set up once by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def probe_keyframes(video_path: str, fps: float) -> Optional[List[int]]:
+    """
+    Frame indices of the keyframes in a video, read from packet flags with ffprobe (no decoding).
+    Returns None when ffprobe is not installed or fails.
+    """
+    if shutil.which('ffprobe') is None:
+        return None
+    try:
+        output = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+             '-of', 'csv=p=0', video_path],
+            capture_output=True, text=True, check=True, timeout=300
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    keyframes = set()
+    for line in output.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) >= 2 and 'K' in parts[1] and parts[0] not in ('', 'N/A'):
+            keyframes.add(int(round(float(parts[0]) * fps)))
+    return sorted(keyframes) or None
+
+
+def plan_segments(total_frames: int, num_segments: int, keyframes: Optional[List[int]] = None,
+                  min_segment_frames: int = 1) -> List[Tuple[int, int]]:
+    """
+    Split [0, total_frames) into up to num_segments contiguous (start, end) ranges of similar length.
+    With keyframes, every boundary is moved to the nearest keyframe so each segment can be
+    decoded independently without re-reading frames from the previous segment.
+    """
+    num_segments = max(1, min(num_segments, total_frames // max(1, min_segment_frames)))
+    boundaries = [0]
+    for i in range(1, num_segments):
+        target = round(i * total_frames / num_segments)
+        if keyframes:
+            target = min(keyframes, key=lambda k: abs(k - target))
+        if boundaries[-1] < target < total_frames:
+            boundaries.append(target)
+    boundaries.append(total_frames)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def concat_videos(parts: List[str], output_path: str, fourcc: str = 'mp4v'):
+    """
+    Join segment files into one video. Uses ffmpeg stream copy when available,
+    otherwise re-encodes the frames with OpenCV.
+    """
+    if shutil.which('ffmpeg') is not None:
+        handle, list_path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(handle, 'w') as f:
+            for part in parts:
+                f.write(f"file '{os.path.abspath(part)}'\n")
+        try:
+            subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'concat', '-safe', '0', '-i', list_path,
+                            '-c', 'copy', output_path], check=True, capture_output=True)
+            return
+        except (OSError, subprocess.SubprocessError):
+            pass
+        finally:
+            os.remove(list_path)
+    out = None
+    try:
+        for part in parts:
+            cap = cv2.VideoCapture(part)
+            if out is None:
+                size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+                out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc),
+                                      cap.get(cv2.CAP_PROP_FPS) or 30.0, size)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                out.write(frame)
+            cap.release()
+    finally:
+        if out is not None:
+            out.release()
+
+
+def _init_worker(config: Dict[str, Any], progress, cancel):
+    """Load a detector once per worker process."""
+    import torch
+    torch.set_num_threads(config['torch_threads'])
+    from src.utils.detection import AnimalDetector
+    _worker['detector'] = AnimalDetector(
+        model_path=config.get('model_path'),
+        conf_threshold=config['conf_threshold'],
+        iou_threshold=config['iou_threshold'],
+        **config.get('detector_options', {})
+    )
+    _worker['queue_size'] = config['queue_size']
+    _worker['progress'] = progress
+    _worker['cancel'] = cancel
+
+
+def _process_segment(run: int, segment_index: int, video_path: str, output_path: str, start: int, end: int,
+                     sampler, fourcc: str) -> Dict[str, Any]:
+    """Run the regular video pipeline over frames [start, end) and return the detections of inferred frames."""
+    detector = _worker['detector']
+    progress = _worker['progress']
+    timeline: List[Tuple[int, List[Dict]]] = []
+
+    def on_frame(index: int, detections):
+        if detections is not None:
+            timeline.append((index, detections))
+
+    def on_progress(frames_done: int, total_frames: int):
+        if frames_done % 25 == 0:
+            progress.put((run, segment_index, frames_done))
+
+    pipeline = VideoPipeline(lambda index, frame: detector.process_frame(frame),
+                             queue_size=_worker['queue_size'], sampler=sampler,
+                             carry_forward=detector.draw_detections)
+    stats = pipeline.run(video_path, output_path, fourcc=fourcc, on_frame=on_frame, on_progress=on_progress,
+                         stop_event=_worker['cancel'], start_frame=start, end_frame=end)
+    progress.put((run, segment_index, stats['frames']))
+    return {**stats, 'segment': segment_index, 'start_frame': start, 'end_frame': end,
+            'path': output_path, 'timeline': timeline}
+
+
+class SegmentedVideoProcessor:
+    """
+    Processes one long video on several cores by splitting it into keyframe-aligned segments.
+    Each worker process has its own capture, its own detector and a copy of the frame sampler;
+    the annotated segments are stitched back into one file and the per-segment detections
+    are merged into one timeline ordered by frame index.
+    Runs are serialized because a single run already occupies every worker.
+    """
+    def __init__(self, num_workers: int = 0, model_path: Optional[str] = None, conf_threshold: float = 0.4,
+                 iou_threshold: float = 0.45, torch_threads: int = 0, segments_per_worker: int = 2,
+                 min_segment_seconds: float = 10.0, queue_size: int = 8,
+                 detector_options: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            num_workers: Worker processes; 0 uses one per core
+            model_path / conf_threshold / iou_threshold: Passed to each worker's AnimalDetector
+            torch_threads: Intra-op threads per worker; 0 divides the cores evenly
+            segments_per_worker: Segments queued per worker, so faster workers pick up extra work
+            min_segment_seconds: Videos are never split into segments shorter than this
+            queue_size: Queue size of each worker's decode -> infer -> encode pipeline
+            detector_options: Extra AnimalDetector keyword arguments (backend, model_size, ...)
+        """
+        cores = os.cpu_count() or 1
+        self.num_workers = num_workers if num_workers > 0 else cores
+        self.segments_per_worker = max(1, segments_per_worker)
+        self.min_segment_seconds = min_segment_seconds
+        config = {
+            'model_path': model_path,
+            'conf_threshold': conf_threshold,
+            'iou_threshold': iou_threshold,
+            'torch_threads': torch_threads if torch_threads > 0 else max(1, cores // self.num_workers),
+            'queue_size': queue_size,
+            'detector_options': detector_options or {},
+        }
+        ctx = mp.get_context('spawn')
+        self._progress = ctx.Queue()
+        self._cancel = ctx.Event()
+        self._executor = ProcessPoolExecutor(self.num_workers, mp_context=ctx, initializer=_init_worker,
+                                             initargs=(config, self._progress, self._cancel))
+        self._lock = threading.Lock()
+        self.runs = 0
+
+    def plan(self, video_path: str) -> Dict[str, Any]:
+        """
+        Probe a video and plan its segments. Containers that don't report a frame count get a
+        single open-ended (0, None) segment; callers should process videos with fewer than two
+        segments in-process instead (see splittable()).
+        Returns:
+            fps, total_frames, width, height, keyframes and segments
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video: {video_path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        if total_frames <= 0:
+            keyframes, segments = None, [(0, None)]
+        else:
+            keyframes = probe_keyframes(video_path, fps)
+            segments = plan_segments(total_frames, self.num_workers * self.segments_per_worker, keyframes,
+                                     min_segment_frames=int(self.min_segment_seconds * fps))
+        return {'fps': fps, 'total_frames': total_frames, 'width': width, 'height': height,
+                'keyframes': keyframes, 'segments': segments}
+
+    @staticmethod
+    def splittable(plan: Dict[str, Any]) -> bool:
+        """Whether a plan is worth running in parallel: a known length and at least two segments."""
+        return plan['total_frames'] > 0 and len(plan['segments']) > 1
+
+    def run(self, video_path: str, output_path: str, sampler=None, fourcc: str = 'mp4v',
+            on_progress: Optional[Callable[[int, int], None]] = None,
+            stop_event: Optional[threading.Event] = None, plan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Process a whole video in parallel segments.
+        Args:
+            video_path: Input video file
+            output_path: Annotated output file
+            sampler: Optional FrameSampler; every segment gets a fresh copy of it
+            fourcc: Output codec
+            on_progress: Called as on_progress(frames_done, total_frames) as segments advance
+            stop_event: When set, every segment stops early
+            plan: Result of plan(video_path), if the caller already has it
+        Returns:
+            Same statistics as VideoPipeline.run plus 'segments' and 'timeline', a list of
+            (frame_index, detections) for every frame that went through detection
+        """
+        plan = plan or self.plan(video_path)
+        fps, total_frames, width, height = plan['fps'], plan['total_frames'], plan['width'], plan['height']
+        keyframes, segments = plan['keyframes'], plan['segments']
+        if sampler is not None:
+            sampler.reset(fps)  # Drops unpicklable motion state before the sampler is copied to workers
+        # Parts go to a private temp dir: next to output_path, ArtifactStorage could evict a finished
+        # part before the concat
+        parts_dir = tempfile.mkdtemp(prefix='segments-')
+        ext = os.path.splitext(output_path)[1]
+        parts = [os.path.join(parts_dir, f"part{i:03d}{ext}") for i in range(len(segments))]
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                self.runs += 1
+                run = self.runs
+                self._cancel.clear()
+                done = [0] * len(segments)
+                finished = threading.Event()
+
+                def forward(message):
+                    # The queue is shared by every run; late messages from an earlier run are dropped
+                    message_run, segment_index, frames_done = message
+                    if message_run != run or not 0 <= segment_index < len(done):
+                        return
+                    done[segment_index] = frames_done
+                    if on_progress is not None:
+                        on_progress(sum(done), total_frames)
+
+                def forward_progress():
+                    while not finished.is_set():
+                        try:
+                            forward(self._progress.get(timeout=0.1))
+                        except queue.Empty:
+                            continue
+                    while True:
+                        try:
+                            forward(self._progress.get_nowait())
+                        except queue.Empty:
+                            return
+
+                def forward_cancel():
+                    while not finished.is_set():
+                        if stop_event.wait(0.1):
+                            self._cancel.set()
+                            return
+
+                helpers = [threading.Thread(target=forward_progress, daemon=True)]
+                if stop_event is not None:
+                    helpers.append(threading.Thread(target=forward_cancel, daemon=True))
+                for helper in helpers:
+                    helper.start()
+                try:
+                    futures = [self._executor.submit(_process_segment, run, i, video_path, parts[i], start, end,
+                                                     sampler, fourcc)
+                               for i, (start, end) in enumerate(segments)]
+                    results = []
+                    try:
+                        for future in as_completed(futures):
+                            results.append(future.result())
+                    except BaseException:
+                        self._cancel.set()
+                        for future in futures:
+                            future.cancel()
+                        # Segments already running stop at their next frame; they must be gone before
+                        # the next run clears the cancel flag
+                        wait(futures)
+                        raise
+                finally:
+                    finished.set()
+                    for helper in helpers:
+                        helper.join()
+            results.sort(key=lambda r: r['start_frame'])
+            concat_videos([r['path'] for r in results], output_path, fourcc)
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+        timeline = [entry for r in results for entry in r['timeline']]
+        sampling = None
+        if sampler is not None:
+            sampling = {'policy': sampler.policy, 'frames': 0, 'inferred': 0, 'skipped': 0}
+            for r in results:
+                for key in ('frames', 'inferred', 'skipped'):
+                    sampling[key] += r['sampling'][key]
+        frames = sum(r['frames'] for r in results)
+        return {
+            'frames': frames,
+            'total_frames': total_frames if total_frames > 0 else frames,
+            'fps': fps,
+            'width': width,
+            'height': height,
+            'elapsed': time.perf_counter() - started,
+            'cancelled': stop_event is not None and stop_event.is_set(),
+            'sampling': sampling,
+            'segments': [{'start_frame': r['start_frame'], 'end_frame': r['end_frame'], 'frames': r['frames'],
+                          'elapsed': r['elapsed']} for r in results],
+            'keyframe_aligned': keyframes is not None,
+            'timeline': timeline,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {'num_workers': self.num_workers, 'segments_per_worker': self.segments_per_worker, 'runs': self.runs}
+
+    def close(self):
+        self._cancel.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
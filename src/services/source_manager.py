@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from src.services.frame_broadcaster import FrameBroadcaster
+from src.utils.frame_sampling import MotionDetector
+from src.utils.metrics import REALTIME_DROPPED, REALTIME_FPS, RateMeter, timed
+
+POLICIES = ('round_robin', 'priority', 'motion')
+
+
+def load_source_config(path: str) -> Dict[str, Any]:
+    """
+    Read a camera registry from a JSON or YAML file:
+        {"sources": [{"id": "trail-1", "url": "rtsp://...", "priority": 2},
+                     {"id": "gate", "url": 0},
+                     {"id": "replay", "url": "clips/fox.mp4", "loop": true}],
+         "scheduler": {"policy": "motion", "batch_size": 4, "max_fps": 8}}
+    """
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            config = yaml.safe_load(f) or {}
+        else:
+            config = json.load(f)
+    ids = [str(source['id']) for source in config.get('sources', [])]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"Duplicate source ids in {path}")
+    return config
+
+
+class StreamSource:
+    """
+    One camera, stream or file with a reader thread that keeps only the newest frame.
+    Files are paced at their native frame rate (and optionally looped) so they behave like
+    live streams; network streams are reopened after failures.
+    Every frame read while someone is watching is published to the source's broadcaster
+    with the latest detections drawn on it.
+    """
+    def __init__(self, source_id: str, url: Union[int, str], priority: float = 1.0, loop: bool = True,
+                 reconnect_delay: float = 2.0, track_motion: bool = False,
+                 draw: Optional[Callable[[np.ndarray, List[Dict]], Any]] = None):
+        """
+        Args:
+            source_id: Name used in /video_feed/<source_id>
+            url: Device index, video file or stream URL (rtsp://, http://, ...)
+            priority: Scheduling weight; a source with priority 2 gets twice the inferences of priority 1
+            loop: Restart files from the beginning when they end
+            reconnect_delay: Seconds to wait before reopening a failed stream
+            track_motion: Compute a motion score for every frame (needed by the 'motion' policy)
+            draw: Called as draw(frame, detections) to annotate published frames
+        """
+        self.source_id = source_id
+        self.url = int(url) if isinstance(url, str) and url.isdigit() else url
+        self.priority = max(1e-3, float(priority))
+        self.loop = loop
+        self.reconnect_delay = reconnect_delay
+        self.is_file = isinstance(self.url, str) and os.path.isfile(self.url)
+        self.motion = MotionDetector() if track_motion else None
+        self.draw = draw
+        self.broadcaster = FrameBroadcaster(source_id)
+        self.motion_score = 1.0
+        self.detections: List[Dict] = []
+        self.frames_read = 0
+        self.inferences = 0
+        self.reconnects = 0
+        self.last_inference_ms = None
+        self.seq = 0
+        self.inferred_seq = 0
+        self._frame = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'source-{self.source_id}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self.broadcaster.close()
+
+    def _open(self) -> cv2.VideoCapture:
+        cap = cv2.VideoCapture(self.url)
+        if not self.is_file:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Don't let the driver queue stale frames
+        return cap
+
+    def _run(self):
+        cap = self._open()
+        interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if self.is_file else 0.0
+        next_frame = time.monotonic()
+        meter = RateMeter()
+        while not self._stop.is_set():
+            with timed('decode'):
+                success, frame = cap.read()
+            if not success:
+                cap.release()
+                if self.is_file and not self.loop:
+                    break
+                if not self.is_file:
+                    self.reconnects += 1
+                    self._stop.wait(self.reconnect_delay)
+                cap = self._open()
+                continue
+            if self.motion is not None:
+                self.motion_score = self.motion.score(frame)
+            with self._lock:
+                self._frame = frame
+                self.seq += 1
+                self.frames_read += 1
+                detections = self.detections
+            REALTIME_FPS.set(meter.tick(), source=self.source_id)
+            if self.broadcaster.viewers > 0:
+                annotated = frame.copy()
+                if self.draw is not None and detections:
+                    self.draw(annotated, detections)
+                self.broadcaster.publish(annotated, detections)
+            if interval:
+                next_frame += interval
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    next_frame = time.monotonic()
+        cap.release()
+
+    def take(self):
+        """Return (seq, frame) if a frame newer than the last inferred one is available, else None."""
+        with self._lock:
+            if self._frame is None or self.seq == self.inferred_seq:
+                return None
+            return self.seq, self._frame
+
+    def update(self, seq: int, detections: List[Dict], elapsed_ms: float):
+        with self._lock:
+            if seq > self.inferred_seq + 1:
+                # Frames replaced in the buffer before the scheduler got to them
+                REALTIME_DROPPED.inc(seq - self.inferred_seq - 1, source=self.source_id, reason='scheduler')
+            self.inferred_seq = seq
+            self.detections = detections
+            self.inferences += 1
+            self.last_inference_ms = elapsed_ms
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'url': str(self.url),
+            'running': self.running(),
+            'priority': self.priority,
+            'frames_read': self.frames_read,
+            'inferences': self.inferences,
+            'reconnects': self.reconnects,
+            'motion_score': self.motion_score if self.motion is not None else None,
+            'last_inference_ms': self.last_inference_ms,
+            'detections': len(self.detections),
+            **self.broadcaster.stats(),
+        }
+
+
+class SourceScheduler:
+    """
+    Shares one inference budget between many sources using stride scheduling:
+    each source advances by 1 / weight whenever it is served and the sources furthest
+    behind are picked next, so every source gets a share proportional to its weight.
+        'round_robin': equal weights
+        'priority':    weight = priority
+        'motion':      weight = priority * (motion_floor + motion score), so busy scenes are
+                       refreshed more often while static cameras still get occasional frames
+    Frames picked in the same round go through a single batched forward pass.
+    """
+    def __init__(self, detector, sources: List[StreamSource], policy: str = 'round_robin',
+                 batch_size: int = 4, max_fps: float = 0.0, motion_floor: float = 0.05):
+        """
+        Args:
+            detector: AnimalDetector or InferenceWorkerPool (anything with detect_frames)
+            sources: Sources to serve
+            policy: 'round_robin', 'priority' or 'motion'
+            batch_size: Most frames per forward pass
+            max_fps: Total inferred frames per second across all sources (0 for no limit)
+            motion_floor: Minimum weight factor of a static source under the 'motion' policy
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.detector = detector
+        self.sources = sources
+        self.policy = policy
+        self.batch_size = max(1, batch_size)
+        self.max_fps = max_fps
+        self.motion_floor = motion_floor
+        self.batches = 0
+        self.frames = 0
+        self._pass = {source.source_id: 0.0 for source in sources}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _weight(self, source: StreamSource) -> float:
+        if self.policy == 'round_robin':
+            return 1.0
+        if self.policy == 'priority':
+            return source.priority
+        return source.priority * (self.motion_floor + source.motion_score)
+
+    def pick(self) -> List[tuple]:
+        """Choose up to batch_size sources with fresh frames, furthest behind their fair share first."""
+        ready = []
+        for source in self.sources:
+            taken = source.take()
+            if taken is not None:
+                ready.append((source, taken))
+        if not ready:
+            return []
+        # Sources that were idle rejoin at the current virtual time instead of catching up in a burst
+        floor = min(self._pass[source.source_id] for source, _ in ready)
+        ready.sort(key=lambda item: max(self._pass[item[0].source_id], floor))
+        chosen = ready[:self.batch_size]
+        for source, _ in chosen:
+            self._pass[source.source_id] = max(self._pass[source.source_id], floor) + 1.0 / self._weight(source)
+        return chosen
+
+    def start(self) -> 'SourceScheduler':
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='source-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def _run(self):
+        while not self._stop.is_set():
+            chosen = self.pick()
+            if not chosen:
+                self._stop.wait(0.005)
+                continue
+            started = time.perf_counter()
+            try:
+                results = self.detector.detect_frames([frame for _, (_, frame) in chosen])
+            except Exception as e:
+                print(f"Error in source scheduler: {str(e)}")
+                results = [[] for _ in chosen]
+            elapsed = time.perf_counter() - started
+            for (source, (seq, _)), detections in zip(chosen, results):
+                source.update(seq, detections, elapsed * 1000.0)
+            self.batches += 1
+            self.frames += len(chosen)
+            if self.max_fps > 0:
+                self._stop.wait(max(0.0, len(chosen) / self.max_fps - elapsed))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'policy': self.policy,
+            'batch_size': self.batch_size,
+            'max_fps': self.max_fps,
+            'batches': self.batches,
+            'frames': self.frames,
+            'avg_batch': self.frames / self.batches if self.batches else 0.0,
+        }
+
+
+class SourceManager:
+    """Registry of configured sources plus the scheduler that shares the detector between them."""
+    def __init__(self, detector, sources: List[Dict[str, Any]], policy: str = 'round_robin',
+                 batch_size: int = 4, max_fps: float = 0.0, motion_floor: float = 0.05):
+        self.sources: Dict[str, StreamSource] = {}
+        for entry in sources:
+            source = StreamSource(
+                str(entry['id']), entry['url'],
+                priority=entry.get('priority', 1.0),
+                loop=entry.get('loop', True),
+                reconnect_delay=entry.get('reconnect_delay', 2.0),
+                track_motion=policy == 'motion',
+                draw=detector.draw_detections
+            )
+            self.sources[source.source_id] = source
+        self.scheduler = SourceScheduler(detector, list(self.sources.values()), policy=policy,
+                                         batch_size=batch_size, max_fps=max_fps, motion_floor=motion_floor)
+
+    @classmethod
+    def from_config(cls, path: str, detector, **overrides) -> 'SourceManager':
+        """Build a manager from a JSON / YAML registry; keyword arguments override its scheduler section."""
+        config = load_source_config(path)
+        options = {**config.get('scheduler', {}), **{k: v for k, v in overrides.items() if v is not None}}
+        return cls(detector, config.get('sources', []), **options)
+
+    def start(self) -> 'SourceManager':
+        for source in self.sources.values():
+            source.start()
+        self.scheduler.start()
+        return self
+
+    def stop(self):
+        self.scheduler.stop()
+        for source in self.sources.values():
+            source.stop()
+
+    def get(self, source_id: str) -> Optional[StreamSource]:
+        return self.sources.get(source_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'scheduler': self.scheduler.stats(),
+            'sources': {source_id: source.stats() for source_id, source in self.sources.items()},
+        }
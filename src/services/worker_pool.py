@@ -0,0 +1,438 @@
+import os
+import json
+import time
+import queue
+import hashlib
+import threading
+import itertools
+import multiprocessing as mp
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _worker_main(worker_index: int, tasks, results, config: Dict[str, Any]):
+    """Entry point of one inference worker process: pin cores, load its own model and serve tasks."""
+    try:
+        cores = config.get('cpu_affinity')
+        if cores and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cores)
+        import torch
+        torch.set_num_threads(config['torch_threads'])
+        from src.utils.detection import AnimalDetector
+        detector = AnimalDetector(
+            model_path=config.get('model_path'),
+            conf_threshold=config['conf_threshold'],
+            iou_threshold=config['iou_threshold'],
+            **config.get('detector_options', {})
+        )
+    except Exception as e:
+        results.put(('error', worker_index, None, f"{type(e).__name__}: {str(e)}"))
+        return
+    results.put(('ready', worker_index, None, None))
+    attached: Dict[int, shared_memory.SharedMemory] = {}
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            job_id, method, slot_index, shm_name, shape, dtype = task
+            results.put(('start', worker_index, job_id, None))  # Lets the parent fail this job if we die
+            try:
+                shm = attached.get(slot_index)
+                if shm is None or shm.name != shm_name:
+                    if shm is not None:
+                        shm.close()  # The parent grew this slot into a new segment
+                    shm = shared_memory.SharedMemory(name=shm_name)
+                    attached[slot_index] = shm
+                frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+                if method == 'process_frame':
+                    # Annotates the shared buffer in place so the parent reads the result back without a copy
+                    _, detections = detector.process_frame(frame)
+                elif method == 'detect_frame':
+                    detections = detector.detect_frames([frame])[0]  # Same as detect_frame, plus the prefilter
+                else:
+                    detections = detector.detect_animals(frame)
+                results.put(('done', job_id, detections, None))
+            except Exception as e:
+                results.put(('done', job_id, None, f"{type(e).__name__}: {str(e)}"))
+    finally:
+        for shm in attached.values():
+            shm.close()
+
+
+class _FrameSlot:
+    """A reusable shared-memory buffer that carries one frame to a worker and back."""
+    def __init__(self, nbytes: int):
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+
+    def ensure(self, nbytes: int):
+        if nbytes > self.shm.size:
+            self.release()
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class InferenceWorkerPool:
+    """
+    Pool of inference processes, each holding its own copy of the YOLO model.
+    Frames are handed to workers through reusable shared-memory slots instead of
+    being pickled, so the parent process never holds the GIL during inference.
+    Exposes the same detect_animals / detect_batch / process_frame methods as
+    AnimalDetector so it can be used in its place.
+    Workers that die (OOM kill, segfault) fail the task they were running and are
+    respawned; one that dies again before its model has loaded marks the pool unhealthy.
+    """
+    def __init__(self, num_workers: int, model_path: str = None, conf_threshold: float = 0.4,
+                 iou_threshold: float = 0.45, torch_threads: Optional[int] = None,
+                 cpu_affinity: Optional[Sequence[Sequence[int]]] = None, slot_bytes: int = 1920 * 1080 * 3,
+                 start_timeout: float = 300.0, task_timeout: float = 120.0,
+                 detector_options: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            num_workers: Number of worker processes
+            model_path: Optional custom model path passed to each worker's AnimalDetector
+            torch_threads: torch intra-op threads per worker (defaults to the worker's core count)
+            cpu_affinity: Per-worker core lists, or 'auto' to split the available cores evenly
+            slot_bytes: Initial size of each shared-memory frame slot (slots grow on demand)
+            start_timeout: Seconds to wait for every worker to load its model
+            task_timeout: Seconds to wait for one frame before failing it with RuntimeError
+            detector_options: Extra AnimalDetector keyword arguments (backend, model_size, ...)
+        """
+        self.num_workers = max(1, int(num_workers))
+        self.scheduler = None
+        self._annotation = (detector_options or {}).get('annotation') or {}
+        self._taxonomy = (detector_options or {}).get('taxonomy')
+        self._renderer = None  # Built on first draw_detections, from the workers' taxonomy
+        self._signature = json.dumps({
+            'model_path': model_path,
+            'conf': conf_threshold,
+            'iou': iou_threshold,
+            'options': detector_options or {},
+        }, sort_keys=True, default=str)
+        if cpu_affinity == 'auto':
+            cpu_affinity = self.split_cores(self.num_workers)
+        self._ctx = mp.get_context('spawn')
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self.task_timeout = task_timeout
+        self._futures: Dict[int, Tuple[Future, _FrameSlot, int]] = {}
+        # Slots of timed-out jobs, returned once the worker finishes with them (or dies)
+        self._orphaned: Dict[int, int] = {}
+        self._futures_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._slots = [_FrameSlot(slot_bytes) for _ in range(2 * self.num_workers)]
+        self._free_slots = queue.Queue()
+        for index in range(len(self._slots)):
+            self._free_slots.put(index)
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+        self.healthy = True
+        self._closing = False
+        self._configs = []
+        self._processes = []
+        self._running: Dict[int, int] = {}  # Worker index -> job it last started
+        self._ready: set = set()  # Workers whose model has loaded since their last (re)spawn
+        for index in range(self.num_workers):
+            cores = list(cpu_affinity[index % len(cpu_affinity)]) if cpu_affinity else None
+            threads = torch_threads or (len(cores) if cores else max(1, (os.cpu_count() or 1) // self.num_workers))
+            self._configs.append({
+                'model_path': model_path,
+                'conf_threshold': conf_threshold,
+                'iou_threshold': iou_threshold,
+                'torch_threads': threads,
+                'cpu_affinity': cores,
+                'detector_options': detector_options or {},
+            })
+            self._processes.append(self._spawn(index))
+        self._wait_ready(start_timeout)
+        self._listener = threading.Thread(target=self._collect_results, name='worker-pool-results', daemon=True)
+        self._listener.start()
+
+    def fingerprint(self) -> str:
+        """Identity of the workers' model configuration, for result caching."""
+        return hashlib.sha1(self._signature.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def split_cores(num_workers: int) -> List[List[int]]:
+        """Split the cores available to this process into num_workers contiguous groups."""
+        if hasattr(os, 'sched_getaffinity'):
+            cores = sorted(os.sched_getaffinity(0))
+        else:
+            cores = list(range(os.cpu_count() or 1))
+        per_worker = max(1, len(cores) // num_workers)
+        return [cores[(i * per_worker) % len(cores):(i * per_worker) % len(cores) + per_worker]
+                for i in range(num_workers)]
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(target=_worker_main,
+                                    args=(index, self._tasks, self._results, self._configs[index]),
+                                    name=f'inference-worker-{index}', daemon=True)
+        process.start()
+        return process
+
+    def _wait_ready(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while len(self._ready) < self.num_workers:
+            try:
+                kind, worker_index, _, error = self._results.get(timeout=1.0)
+            except queue.Empty:
+                failed = None
+                if time.monotonic() > deadline:
+                    failed = "Inference workers did not start in time"
+                else:
+                    dead = [i for i, p in enumerate(self._processes) if p.exitcode is not None]
+                    if dead:
+                        failed = f"Inference worker {dead[0]} exited during startup " \
+                                 f"(exit code {self._processes[dead[0]].exitcode})"
+                if failed is None:
+                    continue
+                self.close()
+                raise RuntimeError(failed)
+            if kind == 'ready':
+                self._ready.add(worker_index)
+            elif kind == 'error':
+                self.close()
+                raise RuntimeError(f"Inference worker {worker_index} failed to start: {error}")
+        print(f"Inference worker pool ready with {self.num_workers} workers")
+
+    def _collect_results(self):
+        """Resolve futures from worker messages, and once a second check that every worker is alive."""
+        next_check = time.monotonic() + 1.0
+        while True:
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                break
+            if message:
+                self._handle_message(*message)
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + 1.0
+
+    def _handle_message(self, kind: str, key: int, payload, error):
+        """('start', worker, job), ('ready' | 'error', worker, None, error) or ('done', job, detections, error)"""
+        if kind == 'start':
+            self._running[key] = payload
+        elif kind == 'ready':
+            self._ready.add(key)
+            print(f"Inference worker {key} restarted")
+        elif kind == 'error':
+            print(f"Inference worker {key} failed to restart: {error}")
+            self.healthy = False
+        elif kind == 'done':
+            with self._futures_lock:
+                entry = self._futures.pop(key, None)
+                orphaned = self._orphaned.pop(key, None)
+            if orphaned is not None:
+                self._free_slots.put(orphaned)
+            if entry is None:
+                return  # The caller already gave up on this job
+            if error is None:
+                entry[0].set_result(payload)
+            else:
+                entry[0].set_exception(RuntimeError(error))
+
+    def _fail_job(self, job_id: int, message: str):
+        with self._futures_lock:
+            entry = self._futures.pop(job_id, None)
+            orphaned = self._orphaned.pop(job_id, None)
+        if orphaned is not None:
+            self._free_slots.put(orphaned)
+        if entry is not None:
+            entry[0].set_exception(RuntimeError(message))  # The waiting caller returns the slot
+
+    def _check_workers(self):
+        """Fail the job of every dead worker and respawn it, unless it died before loading its model."""
+        if self._closing:
+            return
+        for index, process in enumerate(self._processes):
+            if process.exitcode is None:
+                continue
+            message = f"Inference worker {index} died (exit code {process.exitcode})"
+            job_id = self._running.pop(index, None)
+            if job_id is not None:
+                self._fail_job(job_id, message)
+            if index not in self._ready:
+                if self.healthy:
+                    print(f"{message} before loading its model; not restarting it")
+                    self.healthy = False
+                continue
+            print(f"{message}; restarting it")
+            self._ready.discard(index)
+            self._restarts += 1
+            self._processes[index] = self._spawn(index)
+        if not any(process.exitcode is None for process in self._processes):
+            # Nobody is left to take queued tasks
+            with self._futures_lock:
+                pending = list(self._futures) + list(self._orphaned)
+            for job_id in pending:
+                self._fail_job(job_id, "No inference workers are running")
+
+    def _submit(self, method: str, frame: np.ndarray) -> Tuple[Future, _FrameSlot, int]:
+        if not self.healthy and not any(process.exitcode is None for process in self._processes):
+            raise RuntimeError("No inference workers are running")
+        frame = np.ascontiguousarray(frame)
+        try:
+            slot_index = self._free_slots.get(timeout=self.task_timeout)
+        except queue.Empty:
+            raise RuntimeError("No free inference slot")
+        slot = self._slots[slot_index]
+        try:
+            slot.ensure(frame.nbytes)
+            np.ndarray(frame.shape, dtype=frame.dtype, buffer=slot.shm.buf)[...] = frame
+        except BaseException:
+            self._free_slots.put(slot_index)
+            raise
+        job_id = next(self._ids)
+        future = Future()
+        with self._futures_lock:
+            self._futures[job_id] = (future, slot, slot_index)
+        self._tasks.put((job_id, method, slot_index, slot.shm.name, frame.shape, frame.dtype.str))
+        return future, slot, slot_index
+
+    def _orphan(self, slot_index: int) -> bool:
+        """Give up on the job using slot_index; False if it has already finished."""
+        with self._futures_lock:
+            for job_id, (_, _, index) in list(self._futures.items()):
+                if index == slot_index:
+                    del self._futures[job_id]
+                    self._orphaned[job_id] = slot_index
+                    return True
+        return False
+
+    def _wait(self, future: Future, slot_index: int, on_result=None):
+        """
+        future's result within task_timeout, passed through on_result while the slot is still held.
+        The slot is returned here, except after a timeout, when the worker may still be writing to it.
+        """
+        try:
+            result = future.result(timeout=self.task_timeout)
+            if on_result is not None:
+                result = on_result(result)
+            self._completed += 1
+            return result
+        except FutureTimeoutError:
+            self._failed += 1
+            if self._orphan(slot_index):
+                slot_index = None
+            raise RuntimeError(f"Inference worker did not answer within {self.task_timeout}s")
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            if slot_index is not None:
+                self._free_slots.put(slot_index)
+
+    def detect_animals(self, image) -> List[Dict[str, Any]]:
+        from src.utils.detection import AnimalDetector
+        img = AnimalDetector._load_image(image)
+        future, _, slot_index = self._submit('detect_animals', img)
+        return self._wait(future, slot_index)
+
+    def detect_batch(self, images: List[Any], imgsz: int = 640, batch_size: int = 16) -> List[List[Dict[str, Any]]]:
+        """Fan images out across the workers and gather the results in input order."""
+        from src.utils.detection import AnimalDetector
+        results = []
+        for start in range(0, len(images), len(self._slots)):
+            pending = []
+            error = None
+            try:
+                for index, source in enumerate(images[start:start + len(self._slots)], start):
+                    try:
+                        img = AnimalDetector._load_image(source)
+                    except ValueError as e:
+                        raise ValueError(f"Image {index}: {str(e)}") from e
+                    pending.append(self._submit('detect_animals', img))
+            except Exception as e:
+                error = e
+            # Every submitted job is waited on, even after a failure, so each slot goes back to the pool
+            for future, _, slot_index in pending:
+                try:
+                    results.append(self._wait(future, slot_index))
+                except Exception as e:
+                    if error is None:
+                        error = e
+            if error is not None:
+                raise error
+        return results
+
+    def detect_frame(self, frame: np.ndarray) -> List[Dict]:
+        future, _, slot_index = self._submit('detect_frame', frame)
+        return self._wait(future, slot_index)
+
+    def detect_frames(self, frames: List[np.ndarray]) -> List[List[Dict]]:
+        """Spread several frames across the workers and gather their detections in input order."""
+        results = []
+        for start in range(0, len(frames), len(self._slots)):
+            pending = [self._submit('detect_frame', frame) for frame in frames[start:start + len(self._slots)]]
+            for future, _, slot_index in pending:
+                try:
+                    results.append(self._wait(future, slot_index))
+                except Exception as e:
+                    print(f"Error in detect_frames: {str(e)}")
+                    results.append([])
+        return results
+
+    def warmup(self, shapes: List[Tuple[int, int]] = ((640, 640),), batch_sizes: List[int] = (1,)) -> float:
+        """Send one blank frame per worker at every shape so each worker's first real frame is fast."""
+        started = time.perf_counter()
+        for height, width in shapes:
+            self.detect_frames([np.zeros((height, width, 3), dtype=np.uint8)] * self.num_workers)
+        return time.perf_counter() - started
+
+    def process_frame(self, frame: np.ndarray, draw: bool = True) -> Tuple[np.ndarray, List[Dict]]:
+        if not draw:
+            return frame, self.detect_frame(frame)
+        def copy_back(detections):
+            frame[...] = np.ndarray(frame.shape, dtype=frame.dtype, buffer=slot.shm.buf)
+            return detections
+
+        try:
+            future, slot, slot_index = self._submit('process_frame', frame)
+            return frame, self._wait(future, slot_index, copy_back)
+        except Exception as e:
+            print(f"Error in process_frame: {str(e)}")
+            return frame, []
+
+    def draw_detections(self, frame: np.ndarray, detections: List[Dict]) -> np.ndarray:
+        if self._renderer is None:
+            from src.utils.renderer import shared_renderer
+            from src.utils.taxonomy import Taxonomy
+            taxonomy = Taxonomy.load(self._taxonomy)
+            self._renderer = shared_renderer(taxonomy.emojis, colors=taxonomy.category_colors,
+                                             alerts=taxonomy.banners, **self._annotation)
+        return self._renderer.draw(frame, detections)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.num_workers,
+            'alive': sum(p.is_alive() for p in self._processes),
+            'healthy': self.healthy,
+            'restarts': self._restarts,
+            'in_flight': len(self._futures),
+            'free_slots': self._free_slots.qsize(),
+            'completed': self._completed,
+            'failed': self._failed,
+        }
+
+    def close(self):
+        self._closing = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        for slot in self._slots:
+            slot.release()
+        self._slots = []
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+_INV_255 = np.float32(1.0 / 255.0)
+
+
+class BufferPool:
+    """
+    Reusable NumPy arrays keyed by shape and dtype, so per-frame preprocessing doesn't allocate.
+    Streams at a fixed resolution hit the same few buffers on every frame. At most max_per_shape
+    free arrays are kept per key and only the max_shapes most recently used keys are retained,
+    so a mix of resolutions can't grow the pool without bound.
+    """
+    def __init__(self, max_per_shape: int = 4, max_shapes: int = 8):
+        """
+        Args:
+            max_per_shape: Free arrays kept per (shape, dtype); more are dropped on release
+            max_shapes: Distinct (shape, dtype) keys kept; the least recently used key is dropped first
+        """
+        self.max_per_shape = max_per_shape
+        self.max_shapes = max_shapes
+        self._free: 'OrderedDict[Tuple, List[np.ndarray]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """An array of this shape and dtype with undefined contents; return it with release()."""
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self._free.move_to_end(key)
+                self.hits += 1
+                return free.pop()
+            self.misses += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, array: np.ndarray):
+        key = (array.shape, array.dtype.str)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            self._free.move_to_end(key)
+            if len(free) < self.max_per_shape:
+                free.append(array)
+            while len(self._free) > self.max_shapes:
+                self._free.popitem(last=False)
+
+    @contextmanager
+    def lease(self, *specs: Tuple[Tuple[int, ...], Any]) -> Iterator[List[np.ndarray]]:
+        """Acquire one array per (shape, dtype) spec for the duration of the with-block."""
+        arrays = [self.acquire(shape, dtype) for shape, dtype in specs]
+        try:
+            yield arrays
+        finally:
+            for array in arrays:
+                self.release(array)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'shapes': len(self._free),
+                'pooled_bytes': sum(a.nbytes for free in self._free.values() for a in free),
+            }
+
+
+def letterbox_into(img: np.ndarray, dst: np.ndarray, color: int = 114) -> Tuple[float, Tuple[int, int]]:
+    """
+    letterbox() into a preallocated (height, width, 3) uint8 buffer: the image is resized straight
+    into its centred region of dst and only the border strips are filled.
+    Returns:
+        The scale factor applied and the (left, top) padding in pixels
+    """
+    height, width = img.shape[:2]
+    new_h, new_w = dst.shape[:2]
+    scale = min(new_h / height, new_w / width)
+    resized_w, resized_h = int(round(width * scale)), int(round(height * scale))
+    left = (new_w - resized_w) // 2
+    top = (new_h - resized_h) // 2
+    region = dst[top:top + resized_h, left:left + resized_w]
+    if (resized_w, resized_h) == (width, height):
+        region[...] = img
+    else:
+        resized = cv2.resize(img, (resized_w, resized_h), dst=region, interpolation=cv2.INTER_LINEAR)
+        if resized.ctypes.data != region.ctypes.data:
+            region[...] = resized  # OpenCV fell back to a new array
+    dst[:top] = color
+    dst[top + resized_h:] = color
+    dst[top:top + resized_h, :left] = color
+    dst[top:top + resized_h, left + resized_w:] = color
+    return scale, (left, top)
+
+
+def bgr_to_tensor_into(img: np.ndarray, planes: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Write a BGR HWC uint8 image into out as RGB CHW float32 scaled to [0, 1], the model's input
+    layout, in two passes: a channel split into the uint8 planes buffer (swapping B and R on the
+    way) and one contiguous multiply into out.
+    Args:
+        img: (height, width, 3) uint8 BGR
+        planes: (3, height, width) uint8 scratch buffer
+        out: (3, height, width) float32 destination
+    """
+    channels = cv2.split(img, [planes[2], planes[1], planes[0]])
+    for plane, channel in zip((planes[2], planes[1], planes[0]), channels):
+        if channel.ctypes.data != plane.ctypes.data:
+            plane[...] = channel  # OpenCV fell back to a new array
+    np.multiply(planes, _INV_255, out=out, dtype=np.float32, casting='unsafe')
+    return out
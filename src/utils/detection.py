@@ -1,285 +1,358 @@
 import os
 import cv2
-import torch
+import json
+import time
+import hashlib
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Any, Tuple, Union
-from ultralytics import YOLO
+from src.utils.model_loader import ModelLoader
+from src.utils.video_pipeline import VideoPipeline
+from src.utils.frame_sampling import FrameSampler
+from src.utils.tiling import detect_tiled
+from src.utils.prefilter import EmptyFramePrefilter
+from src.utils.metrics import DETECTIONS, timed
+from src.utils.buffers import BufferPool, bgr_to_tensor_into, letterbox_into
+from src.utils.renderer import shared_renderer
+from src.utils.taxonomy import Taxonomy
 
 model = None
+_model_cache: Dict[Tuple, Dict[str, Any]] = {}  # Loaded models shared by detector instances
+_buffers = BufferPool()  # Preprocessing buffers shared by detector instances
+
+ImageSource = Union[str, bytes, bytearray, memoryview, np.ndarray]
+
+# Compact per-detection record used on the hot path; converted to dicts only at the API edge
+DETECTION_DTYPE = np.dtype([('bbox', np.int32, (4,)), ('confidence', np.float32), ('class_id', np.int32)])
+
+
+def letterbox(img: np.ndarray, new_shape: Tuple[int, int],
+              color: Tuple[int, int, int] = (114, 114, 114)) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize an image keeping its aspect ratio and pad it to new_shape (height, width).
+    Returns:
+        The padded image, the scale factor applied and the (left, top) padding in pixels
+    """
+    height, width = img.shape[:2]
+    new_h, new_w = new_shape
+    scale = min(new_h / height, new_w / width)
+    resized_w, resized_h = int(round(width * scale)), int(round(height * scale))
+    if (resized_w, resized_h) != (width, height):
+        img = cv2.resize(img, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+    left = (new_w - resized_w) // 2
+    top = (new_h - resized_h) // 2
+    padded = cv2.copyMakeBorder(img, top, new_h - resized_h - top, left, new_w - resized_w - left,
+                                cv2.BORDER_CONSTANT, value=color)
+    return padded, scale, (left, top)
+
+
+def _batch_shape(shapes: List[Tuple[int, int]], imgsz: int, stride: int = 32) -> Tuple[int, int]:
+    """Smallest stride-aligned (height, width) that fits every image scaled to imgsz on its long side."""
+    max_h = max_w = 0
+    for height, width in shapes:
+        scale = imgsz / max(height, width)
+        max_h = max(max_h, int(round(height * scale)))
+        max_w = max(max_w, int(round(width * scale)))
+    return (int(np.ceil(max_h / stride) * stride), int(np.ceil(max_w / stride) * stride))
+
+
+def draw_detections(frame: np.ndarray, detections: List[Dict],
+                    category_emojis: Dict[str, str] = None) -> np.ndarray:
+    """Draw process_frame-style detections (boxes, labels and category alerts) onto a BGR frame in place."""
+    return shared_renderer(category_emojis).draw(frame, detections)
+
 
 class AnimalDetector:
     """
     Object-oriented animal detector using YOLOv8.
     Handles model loading, detection, and frame processing for images and videos.
     """
-    def __init__(self, model_path: str = None, conf_threshold: float = 0.4, iou_threshold: float = 0.45):
+    def __init__(self, model_path: str = None, conf_threshold: float = 0.4, iou_threshold: float = 0.45,
+                 backend: str = 'torch', model_size: str = 'x', int8: bool = False, calibration_dir: str = None,
+                 tiling: Union[bool, Dict[str, Any]] = None, prefilter: Union[bool, Dict[str, Any]] = None,
+                 annotation: Dict[str, Any] = None, taxonomy: str = None):
         global model
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
+        self.tiling = tiling  # Sliced inference for large images: True or TILING_DEFAULTS overrides
+        self.scheduler = None  # Optional InferenceScheduler shared by all callers
+        # Cheap first pass that skips the full model on empty images: True or PREFILTER_DEFAULTS overrides
+        self.prefilter = EmptyFramePrefilter.from_options(prefilter) if prefilter else None
+        self.annotation = annotation or {}  # AnnotationRenderer options (fonts, font_size, colors, ...)
         try:
-            if model is None:
+            key = (model_path if model_path and os.path.exists(model_path) else None, backend, model_size, int8)
+            if key not in _model_cache:
                 print("Loading YOLO model...")
-                if model_path and os.path.exists(model_path):
+                if key[0]:
                     print(f"Loading custom model from {model_path}")
-                    model = YOLO(model_path, verbose=False)
-                else:
-                    model = YOLO('yolov8x.pt', verbose=False)
-                model.to('cpu')
-                print("Using CPU for inference")
+                _model_cache[key] = ModelLoader.load_model(
+                    model_path=key[0], backend=backend, model_size=model_size,
+                    int8=int8, calibration_dir=calibration_dir
+                )
+                print(f"Using CPU for inference ({_model_cache[key]['backend']} backend)")
+            self.model_info = _model_cache[key]
+            model = self.model_info['model']
             self.model = model
             print("YOLO model loaded successfully!")
             print("Animal Detector initialized!")
         except Exception as e:
             print(f"Error initializing model: {str(e)}")
             raise RuntimeError("Could not load YOLO model. Please check your internet connection and try again.")
-        self.animal_categories = {
-            'large_mammals': '🐘',
-            'herbivores': '🦌',
-            'carnivores': '🐺',
-            'primates': '🐵',
-            'birds': '🦉',
-            'reptiles': '🐍',
-            'small_mammals': '🐾'
-        }
-        self.animal_classes = {
-            15: {'name': 'lion', 'category': 'large_mammals'},
-            45: {'name': 'tiger', 'category': 'large_mammals'},
-            16: {'name': 'leopard', 'category': 'large_mammals'},
-            17: {'name': 'cheetah', 'category': 'carnivores'},
-            20: {'name': 'elephant', 'category': 'large_mammals'},
-            21: {'name': 'bear', 'category': 'large_mammals'},
-            22: {'name': 'zebra', 'category': 'large_mammals'},
-            23: {'name': 'giraffe', 'category': 'large_mammals'},
-            18: {'name': 'buffalo', 'category': 'large_mammals'},
-            46: {'name': 'rhino', 'category': 'large_mammals'},
-            47: {'name': 'wildebeest', 'category': 'large_mammals'},
-            19: {'name': 'hippopotamus', 'category': 'large_mammals'},
-            0: {'name': 'deer', 'category': 'herbivores'},
-            1: {'name': 'gazelle', 'category': 'herbivores'},
-            2: {'name': 'antelope', 'category': 'herbivores'},
-            3: {'name': 'springbok', 'category': 'herbivores'},
-            4: {'name': 'oryx', 'category': 'herbivores'},
-            5: {'name': 'sable_antelope', 'category': 'herbivores'},
-            6: {'name': 'duiker', 'category': 'herbivores'},
-            7: {'name': 'warthog', 'category': 'carnivores'},
-            8: {'name': 'wild_boar', 'category': 'carnivores'},
-            9: {'name': 'hyena', 'category': 'carnivores'},
-            10: {'name': 'jackal', 'category': 'carnivores'},
-            11: {'name': 'fox', 'category': 'carnivores'},
-            13: {'name': 'pangolin', 'category': 'small_mammals'},
-            14: {'name': 'baboon', 'category': 'primates'},
-            24: {'name': 'monkey', 'category': 'primates'},
-            25: {'name': 'aardvark', 'category': 'small_mammals'},
-            26: {'name': 'porcupine', 'category': 'small_mammals'},
-            27: {'name': 'ostrich', 'category': 'birds'},
-            28: {'name': 'hornbill', 'category': 'birds'},
-            29: {'name': 'secretary_bird', 'category': 'birds'},
-            30: {'name': 'vulture', 'category': 'birds'},
-            31: {'name': 'eagle', 'category': 'birds'},
-            32: {'name': 'owl', 'category': 'birds'},
-            33: {'name': 'guinea_fowl', 'category': 'birds'},
-            34: {'name': 'crocodile', 'category': 'reptiles'},
-            35: {'name': 'monitor_lizard', 'category': 'reptiles'},
-            36: {'name': 'python', 'category': 'reptiles'},
-            37: {'name': 'tortoise', 'category': 'reptiles'},
-            38: {'name': 'civet', 'category': 'small_mammals'},
-            39: {'name': 'genet', 'category': 'small_mammals'},
-            40: {'name': 'mongoose', 'category': 'small_mammals'},
-            41: {'name': 'badger', 'category': 'small_mammals'},
-            42: {'name': 'hedgehog', 'category': 'small_mammals'},
-            43: {'name': 'skunk', 'category': 'small_mammals'},
-            44: {'name': 'bat', 'category': 'small_mammals'}
-        }
-        self.class_conf_thresholds = {
-            'elephant': 0.6,
-            'bear': 0.65,
-            'big_cat': 0.55,
-            'lion': 0.6,
-            'tiger': 0.6,
-            'leopard': 0.6,
-            'rhino': 0.6,
-            'hippopotamus': 0.6,
-            'hyena': 0.5,
-            'cheetah': 0.5,
-            'fox': 0.5,
-            'jackal': 0.5,
-            'baboon': 0.45,
-            'monkey': 0.45,
-            'eagle': 0.5,
-            'owl': 0.5,
-            'vulture': 0.5,
-            'crocodile': 0.55,
-            'python': 0.5,
-            'monitor_lizard': 0.45,
-            'tortoise': 0.5,
-            'default': conf_threshold
-        }
+        # Editable views of the shared taxonomy tables; call refresh_lookups() after changing them
+        self.taxonomy = Taxonomy.load(taxonomy)
+        self.animal_classes = {class_id: dict(info) for class_id, info in self.taxonomy.classes.items()}
+        self.animal_categories = dict(self.taxonomy.emojis)
+        self.class_conf_thresholds = {**self.taxonomy.class_thresholds, 'default': conf_threshold}
+        self.refresh_lookups()
+    def refresh_lookups(self):
+        """
+        Point the per-class-id lookup tables at the taxonomy and pick the renderer for its categories.
+        Call again after editing animal_classes, animal_categories or class_conf_thresholds at
+        runtime; the edited dicts are then compiled into a taxonomy of this detector's own.
+        """
+        if not self.taxonomy.matches(self.animal_classes, self.animal_categories, self.class_conf_thresholds):
+            self.taxonomy = Taxonomy.from_dicts(self.animal_classes, self.animal_categories,
+                                                self.class_conf_thresholds, base=self.taxonomy)
+        # Non-animal ids get an infinite threshold so the confidence mask drops them
+        self._threshold_by_id = self.taxonomy.thresholds(self.class_conf_thresholds['default'])
+        self._info_by_id = self.taxonomy.info
+        self._display_by_id = self.taxonomy.display_names
+        self._alert_by_id = self.taxonomy.messages
+        self._id_by_name = self.taxonomy.id_by_name
+        self._class_ids = list(self.taxonomy.class_ids)
+        self.renderer = shared_renderer(self.animal_categories, colors=self.taxonomy.category_colors,
+                                        alerts=self.taxonomy.banners, **self.annotation)
+    def fingerprint(self) -> str:
+        """Identity of the model and every threshold that affects results, for result caching."""
+        payload = json.dumps({
+            'model': self.model_info['model_id'],
+            'conf': self.conf_threshold,
+            'iou': self.iou_threshold,
+            'classes': self.animal_classes,
+            'thresholds': self.class_conf_thresholds,
+            'tiling': self.tiling,
+            'prefilter': self.prefilter.config() if self.prefilter is not None else None
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
     def _get_animal_class_ids(self) -> List[int]:
-        return list(self.animal_classes.keys())
+        return self._class_ids
     def get_detection_message(self, class_identifier: Union[str, int]) -> str:
-        if isinstance(class_identifier, int):
-            if class_identifier in self.animal_classes:
-                animal_info = self.animal_classes[class_identifier]
-            else:
-                return f"Detected: Unknown class {class_identifier}"
-        elif isinstance(class_identifier, str):
-            for class_id, info in self.animal_classes.items():
-                if info['name'] == class_identifier:
-                    animal_info = info
-                    break
-            else:
-                return f"Detected: {class_identifier}"
-        else:
-            return "Detected: Unknown"
-        category = animal_info['category']
-        name = animal_info['name'].replace('_', ' ').title()
-        emoji = self.animal_categories.get(category, '🐾')
-        if category == 'large_mammals':
-            return f"{emoji} WARNING: Large Mammal Detected - {name}! {emoji}"
-        elif category == 'carnivores':
-            return f"{emoji} Caution: {name} detected! {emoji}"
-        else:
-            return f"{emoji} Detected: {name} {emoji}"
+        return self.taxonomy.message(class_identifier)
     def _get_class_threshold(self, class_name: Union[str, int]) -> float:
         if isinstance(class_name, int) and class_name in self.animal_classes:
             class_name = self.animal_classes[class_name]['name']
         elif isinstance(class_name, dict) and 'name' in class_name:
             class_name = class_name['name']
         return self.class_conf_thresholds.get(str(class_name), self.class_conf_thresholds['default'])
-    def detect_animals(self, image_path: str) -> List[Dict[str, Any]]:
+    def _infer(self, img: np.ndarray, imgsz: int = 640) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Run inference on one BGR image, through the micro-batching scheduler when one is attached."""
+        if self.scheduler is not None:
+            return self.scheduler.predict(img, imgsz)
+        return self._predict_batch([img], imgsz)[0]
+    def detect_array(self, image: ImageSource, imgsz: int = 640,
+                     tiling: Union[bool, Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Detect animals and return DETECTION_DTYPE records instead of dicts.
+        tiling (defaults to self.tiling) switches large images to overlapping-tile inference.
+        """
+        img = self._load_image(image)
+        if self.prefilter is not None and not self.prefilter.filter([img])[0]:
+            return np.empty(0, dtype=DETECTION_DTYPE)
+        tiling = self.tiling if tiling is None else tiling
+        if tiling:
+            xyxy, conf, cls, _ = detect_tiled(self, img, tiling if isinstance(tiling, dict) else None)
+            return self._filter_detections(xyxy, conf, cls)
+        return self._filter_detections(*self._infer(img, imgsz))
+    def detect_animals(self, image_path: ImageSource, tiling: Union[bool, Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         try:
-            img = cv2.imread(image_path)
-            if img is None:
-                raise ValueError(f"Could not read image at {image_path}")
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            height, width = img.shape[:2]
-            target_size = 640
-            scale = min(target_size / width, target_size / height)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            results = self.model(
-                img_rgb, 
-                imgsz=new_width if width > height else new_height,
-                conf=self.conf_threshold,
-                iou=self.iou_threshold,
-                classes=self._get_animal_class_ids(),
-                verbose=False
-            )
-            detections = []
-            for result in results[0].boxes:
-                x1, y1, x2, y2 = map(int, result.xyxy[0].tolist())
-                conf = float(result.conf[0])
-                class_id = int(result.cls[0])
-                if class_id not in self.animal_classes:
-                    continue
-                class_name = self.animal_classes[class_id]
-                class_threshold = self._get_class_threshold(class_name)
-                if conf >= class_threshold:
-                    detections.append({
-                        'class': class_name,
-                        'confidence': conf,
-                        'bbox': [x1, y1, x2, y2]
-                    })
-            return detections
+            return self.to_image_dicts(self.detect_array(image_path, tiling=tiling))
         except Exception as e:
             print(f"Error in detect_animals: {str(e)}")
             raise
-    def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, List[Dict]]:
+    def _filter_detections(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray) -> np.ndarray:
+        """
+        Apply the per-class confidence thresholds to raw model output in one vectorized pass.
+        Returns:
+            Structured array of DETECTION_DTYPE records for the boxes that pass
+        """
+        class_ids = cls.astype(np.int64)
+        thresholds = np.full(len(class_ids), np.inf)
+        known = (class_ids >= 0) & (class_ids < len(self._threshold_by_id))
+        thresholds[known] = self._threshold_by_id[class_ids[known]]
+        keep = conf >= thresholds
+        detections = np.empty(int(np.count_nonzero(keep)), dtype=DETECTION_DTYPE)
+        detections['bbox'] = xyxy[keep]
+        detections['confidence'] = conf[keep]
+        detections['class_id'] = class_ids[keep]
+        if len(detections):
+            ids, counts = np.unique(detections['class_id'], return_counts=True)
+            for class_id, count in zip(ids.tolist(), counts.tolist()):
+                info = self._info_by_id[class_id]
+                DETECTIONS.inc(count, **{'class': info['name'], 'category': info['category']})
+        return detections
+    def to_image_dicts(self, detections: np.ndarray) -> List[Dict[str, Any]]:
+        """Convert DETECTION_DTYPE records to detect_animals-style dicts."""
+        return [
+            {'class': self._info_by_id[class_id], 'confidence': conf, 'bbox': bbox}
+            for bbox, conf, class_id in zip(detections['bbox'].tolist(), detections['confidence'].tolist(),
+                                            detections['class_id'].tolist())
+        ]
+    def to_frame_dicts(self, detections: np.ndarray) -> List[Dict[str, Any]]:
+        """Convert DETECTION_DTYPE records to process_frame-style dicts."""
+        results = []
+        for bbox, conf, class_id in zip(detections['bbox'].tolist(), detections['confidence'].tolist(),
+                                        detections['class_id'].tolist()):
+            info = self._info_by_id[class_id]
+            results.append({
+                'class': info['name'],
+                'display_name': self._display_by_id[class_id],
+                'category': info['category'],
+                'confidence': conf,
+                'bbox': bbox,
+                'alert': self._alert_by_id[class_id]
+            })
+        return results
+    @staticmethod
+    def _load_image(source: ImageSource) -> np.ndarray:
+        """Decode a file path, encoded image bytes or a BGR ndarray into a BGR ndarray."""
+        if isinstance(source, np.ndarray):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            with timed('decode'):
+                img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR) if len(source) else None
+            if img is None:
+                raise ValueError("Could not decode image bytes")
+            return img
+        with timed('decode'):
+            img = cv2.imread(str(source))
+        if img is None:
+            raise ValueError(f"Could not read image at {source}")
+        return img
+    def _predict_batch(self, images: List[np.ndarray], imgsz: int = 640) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Run one forward pass over several BGR images.
+        Images are letterboxed to a shared stride-aligned shape and stacked into a single tensor.
+        Returns:
+            Per-image (xyxy, conf, cls) arrays with boxes in original image coordinates
+        """
+        import torch  # Deferred so importing this module doesn't pull in torch
+        batch_shape = _batch_shape([img.shape[:2] for img in images], imgsz)
+        height, width = batch_shape
+        # Letterbox, BGR->RGB, HWC->CHW and scaling write into pooled buffers; the float batch is
+        # handed to the model as-is through torch.from_numpy, without another conversion pass
+        with _buffers.lease(((height, width, 3), np.uint8), ((3, height, width), np.uint8),
+                            ((len(images), 3, height, width), np.float32)) as (padded, planes, batch):
+            with timed('preprocess'):
+                transforms = []
+                for i, img in enumerate(images):
+                    scale, pad = letterbox_into(img, padded)
+                    bgr_to_tensor_into(padded, planes, batch[i])
+                    transforms.append((scale, pad, img.shape[:2]))
+                tensor = torch.from_numpy(batch)
+            with timed('forward'):
+                results = self.model(
+                    tensor,
+                    conf=self.conf_threshold,
+                    iou=self.iou_threshold,
+                    classes=self._get_animal_class_ids(),
+                    verbose=False
+                )
+        with timed('postprocess'):
+            outputs = []
+            for result, (scale, (left, top), (height, width)) in zip(results, transforms):
+                boxes = result.boxes
+                xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+                xyxy -= np.array([left, top, left, top], dtype=np.float32)
+                xyxy /= scale
+                np.clip(xyxy[:, 0::2], 0, width, out=xyxy[:, 0::2])
+                np.clip(xyxy[:, 1::2], 0, height, out=xyxy[:, 1::2])
+                outputs.append((xyxy, boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()))
+        return outputs
+    def _predict_candidates(self, images: List[np.ndarray], imgsz: int = 640) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """_predict_batch over the images the prefilter passes; filtered images get empty outputs."""
+        if self.prefilter is None:
+            return self._predict_batch(images, imgsz)
+        keep = self.prefilter.filter(images)
+        empty = (np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32))
+        outputs = iter(self._predict_batch([img for img, k in zip(images, keep) if k], imgsz) if any(keep) else ())
+        return [next(outputs) if k else empty for k in keep]
+    def warmup(self, shapes: List[Tuple[int, int]] = ((640, 640),), batch_sizes: List[int] = (1,)) -> float:
+        """
+        Run forward passes on blank images of every (height, width) and batch size in use, so kernel
+        selection and allocator growth happen before the first real request.
+        Returns:
+            Seconds spent
+        """
+        started = time.perf_counter()
+        for height, width in shapes:
+            blank = np.zeros((height, width, 3), dtype=np.uint8)
+            for batch_size in batch_sizes:
+                self._predict_batch([blank] * batch_size, max(height, width))
+            if self.prefilter is not None:
+                self.prefilter.warmup([(height, width)])
+        return time.perf_counter() - started
+    def detect_batch(self, images: List[ImageSource], imgsz: int = 640,
+                     batch_size: int = 16) -> List[List[Dict[str, Any]]]:
+        """
+        Detect animals in many images with batched forward passes.
+        Args:
+            images: File paths, encoded image bytes or BGR ndarrays
+            imgsz: Long-side inference size shared by the batch
+            batch_size: Maximum number of images per forward pass
+        Returns:
+            Per-image detection lists, in input order
+        """
+        all_detections = []
+        for start in range(0, len(images), batch_size):
+            chunk = []
+            for index, source in enumerate(images[start:start + batch_size], start):
+                try:
+                    chunk.append(self._load_image(source))
+                except ValueError as e:
+                    raise ValueError(f"Image {index}: {str(e)}") from e
+            for xyxy, conf, cls in self._predict_candidates(chunk, imgsz):
+                all_detections.append(self.to_image_dicts(self._filter_detections(xyxy, conf, cls)))
+        return all_detections
+    def detect_frame_array(self, frame: np.ndarray) -> np.ndarray:
+        """Detect animals in a BGR frame and return DETECTION_DTYPE records."""
+        height, width = frame.shape[:2]
+        return self._filter_detections(*self._infer(frame, min(640, max(height, width))))
+    def detect_frame(self, frame: np.ndarray) -> List[Dict]:
+        """Detect animals in a BGR frame without drawing; returns detections in process_frame format."""
+        return self.to_frame_dicts(self.detect_frame_array(frame))
+    def detect_frames(self, frames: List[np.ndarray]) -> List[List[Dict]]:
+        """Detect animals in several BGR frames, e.g. from different cameras, with one batched forward pass."""
+        if not frames:
+            return []
+        imgsz = min(640, max(max(frame.shape[:2]) for frame in frames))
+        return [self.to_frame_dicts(self._filter_detections(xyxy, conf, cls))
+                for xyxy, conf, cls in self._predict_candidates(frames, imgsz)]
+    def draw_detections(self, frame: np.ndarray, detections: List[Dict]) -> np.ndarray:
+        """Draw process_frame-style detections and category alerts onto the frame in place."""
+        return self.renderer.draw(frame, detections)
+    def process_frame(self, frame: np.ndarray, draw: bool = True) -> Tuple[np.ndarray, List[Dict]]:
+        """Detect animals in a BGR frame and, unless draw is False, annotate it in place."""
         try:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            height, width = frame.shape[:2]
-            max_dim = max(height, width)
-            if max_dim > 640:
-                scale = 640 / max_dim
-                new_width = int(width * scale)
-                new_height = int(height * scale)
-            else:
-                new_width = width
-                new_height = height
-            results = self.model(
-                frame_rgb,
-                imgsz=new_width if width > height else new_height,
-                conf=self.conf_threshold,
-                iou=self.iou_threshold,
-                classes=self._get_animal_class_ids(),
-                verbose=False
-            )
-            detections = []
-            categories_detected = set()
-            for result in results[0].boxes:
-                x1, y1, x2, y2 = map(int, result.xyxy[0].tolist())
-                conf = float(result.conf[0])
-                class_id = int(result.cls[0])
-                if class_id not in self.animal_classes:
-                    continue
-                animal_info = self.animal_classes[class_id]
-                class_name = animal_info['name']
-                category = animal_info['category']
-                class_threshold = self._get_class_threshold(class_name)
-                if conf < class_threshold:
-                    continue
-                display_name = class_name.replace('_', ' ').title()
-                detection = {
-                    'class': class_name,
-                    'display_name': display_name,
-                    'category': category,
-                    'confidence': conf,
-                    'bbox': [x1, y1, x2, y2],
-                    'alert': self.get_detection_message(class_id)
-                }
-                detections.append(detection)
-                categories_detected.add(category)
-                emoji = self.animal_categories.get(category, '🐾')
-                label = f"{emoji} {display_name} {conf:.2f}"
-                color = (0, 0, 255) if category == 'large_mammals' else \
-                       (0, 165, 255) if category == 'carnivores' else \
-                       (0, 255, 0)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                cv2.putText(frame, label, (x1, y1 - 10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-            y_offset = 30
-            if 'large_mammals' in categories_detected:
-                alert_text = "🚨 WARNING: Large mammals detected!"
-                cv2.putText(frame, alert_text, (10, y_offset), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-                y_offset += 30
-            if 'carnivores' in categories_detected:
-                alert_text = "⚠️ Caution: Carnivores detected!"
-                cv2.putText(frame, alert_text, (10, y_offset),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+            detections = self.detect_frame(frame)
+            if draw:
+                self.draw_detections(frame, detections)
             return frame, detections
         except Exception as e:
             print(f"Error in process_frame: {str(e)}")
             return frame, []
-    def process_video(self, video_path: str, output_path: str = None) -> str:
+    def process_video(self, video_path: str, output_path: str = None, queue_size: int = 8,
+                      inference_workers: int = 1, sampler: FrameSampler = None, draw: bool = True) -> str:
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video not found: {video_path}")
         if output_path is None:
             base, ext = os.path.splitext(video_path)
             output_path = f"{base}_detected{ext}"
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise IOError(f"Could not open video: {video_path}")
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        frame_count = 0
-        try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                processed_frame, _ = self.process_frame(frame)
-                out.write(processed_frame)
-                frame_count += 1
-                if frame_count % 10 == 0:
-                    print(f"Processed {frame_count}/{total_frames} frames")
-        finally:
-            cap.release()
-            out.release()
+        def report(frames_done: int, total_frames: int):
+            if frames_done % 10 == 0:
+                print(f"Processed {frames_done}/{total_frames} frames")
+        pipeline = VideoPipeline(lambda index, frame: self.process_frame(frame, draw=draw),
+                                 queue_size=queue_size, inference_workers=inference_workers,
+                                 sampler=sampler, carry_forward=self.draw_detections if draw else None)
+        pipeline.run(video_path, output_path, on_progress=report)
         print(f"Video processing complete. Output saved to: {output_path}")
         return output_path
@@ -0,0 +1,129 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    """
+    Cheap motion / scene-change detector working on a downscaled grayscale copy of each frame.
+    'diff' compares against the previous frame; 'mog2' uses OpenCV background subtraction,
+    which is more robust to swaying vegetation and lighting drift but a little slower.
+    """
+    def __init__(self, method: str = 'diff', width: int = 160, pixel_threshold: int = 25,
+                 min_changed_fraction: float = 0.01):
+        """
+        Args:
+            method: 'diff' or 'mog2'
+            width: Width of the analysis image; height follows the aspect ratio
+            pixel_threshold: Grey-level change for a pixel to count as changed ('diff' only)
+            min_changed_fraction: Fraction of changed pixels that counts as motion
+        """
+        if method not in ('diff', 'mog2'):
+            raise ValueError(f"Unknown motion method: {method}")
+        self.method = method
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self._previous = None
+        self._subtractor = None
+        self._mask = None
+
+    def reset(self):
+        self._previous = None
+        self._subtractor = None
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        small_h = max(1, int(round(height * self.width / width)))
+        small = cv2.resize(frame, (self.width, small_h), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def score(self, frame: np.ndarray) -> float:
+        """Fraction of pixels that changed since the previous call (1.0 for the first frame)."""
+        gray = self._prepare(frame)
+        if self.method == 'mog2':
+            if self._subtractor is None:
+                self._subtractor = cv2.createBackgroundSubtractorMOG2(history=200, detectShadows=False)
+                self._subtractor.apply(gray, learningRate=1.0)
+                return 1.0
+            mask = self._subtractor.apply(gray)
+            return float(np.count_nonzero(mask)) / mask.size
+        previous, self._previous = self._previous, gray
+        if previous is None or previous.shape != gray.shape:
+            return 1.0
+        self._mask = cv2.absdiff(gray, previous, dst=self._mask)
+        return float(np.count_nonzero(self._mask > self.pixel_threshold)) / gray.size
+
+    def has_motion(self, frame: np.ndarray) -> bool:
+        return self.score(frame) >= self.min_changed_fraction
+
+
+class FrameSampler:
+    """
+    Decides which video frames go through full detection.
+    Policies:
+        'stride': every Nth frame
+        'motion': frames where the motion detector fires, at most one per min_interval frames,
+                  plus a refresh every keyframe_interval frames so stationary animals stay tracked
+        'fps':    at most max_fps inferred frames per second of video
+    Sampling is stateful, so frames must be offered in order.
+    """
+    POLICIES = ('stride', 'motion', 'fps')
+
+    def __init__(self, policy: str = 'stride', stride: int = 5, max_fps: float = 2.0,
+                 motion: Optional[MotionDetector] = None, min_interval: int = 3, keyframe_interval: int = 150):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown sampling policy: {policy}")
+        if int(stride) < 1:
+            raise ValueError(f"Sampling stride must be at least 1, got {stride}")
+        if not max_fps > 0:
+            raise ValueError(f"Sampling max_fps must be greater than 0, got {max_fps}")
+        self.policy = policy
+        self.stride = int(stride)
+        self.max_fps = max_fps
+        self.motion = motion or MotionDetector()
+        self.min_interval = max(1, int(min_interval))
+        self.keyframe_interval = keyframe_interval
+        self.fps = 30.0
+        self.frames = 0
+        self.selected = 0
+        self._last_selected = None
+
+    def reset(self, fps: float = 30.0):
+        """Start a new video with the given frame rate."""
+        self.fps = fps or 30.0
+        self.frames = 0
+        self.selected = 0
+        self._last_selected = None
+        self.motion.reset()
+
+    def should_detect(self, index: int, frame: np.ndarray) -> bool:
+        self.frames += 1
+        since_last = index - self._last_selected if self._last_selected is not None else None
+        if self.policy == 'stride':
+            selected = index % self.stride == 0
+        elif self.policy == 'fps':
+            selected = since_last is None or since_last >= self.fps / self.max_fps
+        else:
+            # Always feed the motion model so its background stays current
+            moving = self.motion.has_motion(frame)
+            if since_last is None:
+                selected = True
+            elif self.keyframe_interval and since_last >= self.keyframe_interval:
+                selected = True
+            else:
+                selected = moving and since_last >= self.min_interval
+        if selected:
+            self._last_selected = index
+            self.selected += 1
+        return selected
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'frames': self.frames,
+            'inferred': self.selected,
+            'skipped': self.frames - self.selected,
+        }
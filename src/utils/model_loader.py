@@ -1,47 +1,247 @@
 import os
-from typing import Optional, Dict, Any
+import time
+import tempfile
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator
+
+import cv2
+import numpy as np
+
+MODEL_SIZES = ('n', 's', 'm', 'l', 'x')
+BACKENDS = ('torch', 'onnx', 'openvino')
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def _iter_images(folder: str, limit: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Yield BGR images from a folder in a stable order."""
+    count = 0
+    for path in sorted(Path(folder).rglob('*')):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        img = cv2.imread(str(path))
+        if img is None:
+            continue
+        yield img
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
+
+class _CalibrationReader:
+    """ONNX Runtime calibration data reader that letterboxes images from a folder."""
+    def __init__(self, folder: str, input_name: str, imgsz: int, limit: int):
+        from src.utils.detection import letterbox
+        self._batches = []
+        for img in _iter_images(folder, limit):
+            padded, _, _ = letterbox(img, (imgsz, imgsz))
+            rgb = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB)
+            tensor = rgb.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            self._batches.append({input_name: tensor})
+        if not self._batches:
+            raise ValueError(f"No calibration images found in {folder}")
+        self._iter = iter(self._batches)
+
+    def get_next(self):
+        return next(self._iter, None)
+
+    def rewind(self):
+        self._iter = iter(self._batches)
+
 
 class ModelLoader:
     """
     Utility class for loading and managing animal detection models.
-    Extend this class to add support for more models.
+    Supports YOLOv8 sizes n/s/m/l/x on three backends: eager PyTorch, ONNX Runtime and
+    OpenVINO, with optional INT8 post-training quantization from a calibration folder.
+    Exported models are cached next to the weights so export only happens once.
     """
     @staticmethod
-    def load_model(model_type: str = 'default', model_path: Optional[str] = None) -> Dict[str, Any]:
+    def resolve_weights(model_size: str = 'x', model_path: Optional[str] = None) -> str:
+        """Return the PyTorch weights to load or export: a custom model path or yolov8<size>.pt."""
+        if model_path and os.path.exists(model_path):
+            return model_path
+        if model_size not in MODEL_SIZES:
+            raise ValueError(f"Unknown model size '{model_size}', expected one of {MODEL_SIZES}")
+        return f'yolov8{model_size}.pt'
+
+    @staticmethod
+    def exported_path(weights: str, backend: str, int8: bool = False, output_dir: Optional[str] = None) -> str:
+        """Where the exported variant of weights for backend is (or will be) stored."""
+        stem = Path(weights).stem + ('_int8' if int8 else '')
+        directory = Path(output_dir) if output_dir else Path(weights).resolve().parent
+        if backend == 'onnx':
+            return str(directory / f'{stem}.onnx')
+        if backend == 'openvino':
+            return str(directory / f'{stem}_openvino_model')
+        return weights
+
+    @staticmethod
+    def _calibration_yaml(calibration_dir: str, names: Dict[int, str]) -> str:
+        """Write a minimal dataset YAML whose val split is the calibration folder, for ultralytics export."""
+        import yaml
+        handle, path = tempfile.mkstemp(suffix='.yaml')
+        with os.fdopen(handle, 'w') as f:
+            root = os.path.abspath(calibration_dir)
+            yaml.safe_dump({'path': root, 'train': root, 'val': root, 'names': dict(names)}, f)
+        return path
+
+    @staticmethod
+    def export_model(weights: str, backend: str, imgsz: int = 640, int8: bool = False,
+                     calibration_dir: Optional[str] = None, output_dir: Optional[str] = None,
+                     calibration_images: int = 200) -> str:
+        """
+        Export PyTorch weights to an ONNX Runtime or OpenVINO model.
+        Args:
+            weights: Path to the .pt weights
+            backend: 'onnx' or 'openvino'
+            imgsz: Export image size (shapes stay dynamic so batches and rectangular inputs work)
+            int8: Apply INT8 post-training quantization
+            calibration_dir: Folder of representative images, required when int8 is set
+            output_dir: Where to write the exported model (defaults to the weights' folder)
+            calibration_images: Maximum number of calibration images to use
+        Returns:
+            Path to the exported model
+        """
+        from ultralytics import YOLO
+        if backend not in ('onnx', 'openvino'):
+            raise ValueError(f"Cannot export to backend '{backend}'")
+        if int8 and not calibration_dir:
+            raise ValueError("INT8 quantization needs a calibration folder")
+        target = ModelLoader.exported_path(weights, backend, int8, output_dir)
+        if os.path.exists(target):
+            return target
+        model = YOLO(weights, verbose=False)
+        if backend == 'openvino':
+            options = {'format': 'openvino', 'imgsz': imgsz, 'dynamic': True}
+            if int8:
+                options.update(int8=True, data=ModelLoader._calibration_yaml(calibration_dir, model.names),
+                               fraction=1.0)
+            exported = model.export(**options)
+        else:
+            exported = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+            if int8:
+                import onnx
+                from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+                input_name = onnx.load(exported, load_external_data=False).graph.input[0].name
+                reader = _CalibrationReader(calibration_dir, input_name, imgsz, calibration_images)
+                quantized = exported.replace('.onnx', '_int8.onnx')
+                quantize_static(exported, quantized, reader, quant_format=QuantFormat.QDQ,
+                                activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                                per_channel=True)
+                exported = quantized
+        if os.path.abspath(exported) != os.path.abspath(target):
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            os.replace(exported, target)
+        return target
+
+    @staticmethod
+    def load_model(model_type: str = 'default', model_path: Optional[str] = None, backend: str = 'torch',
+                   model_size: str = 'x', int8: bool = False, calibration_dir: Optional[str] = None,
+                   imgsz: int = 640) -> Dict[str, Any]:
         """
         Load a pre-trained model for animal detection.
         Args:
-            model_type: Type of model to load (e.g., 'yolov5', 'fasterrcnn')
-            model_path: Optional path to a custom model file
+            model_type: Model family; 'default' and 'yolov8' load YOLOv8 through ultralytics
+            model_path: Optional path to a custom .pt, .onnx or OpenVINO model
+            backend: 'torch', 'onnx' or 'openvino'; non-torch variants are exported on first use
+            model_size: YOLOv8 size when no custom model is given (n/s/m/l/x)
+            int8: Use an INT8-quantized export (requires calibration_dir on first export)
+            calibration_dir: Folder of representative images for INT8 calibration
+            imgsz: Export image size
         Returns:
             Dictionary containing the model and metadata
         """
-        # Placeholder implementation for extensibility
-        model_info = {
-            'model': None,  # Placeholder for the actual model
-            'model_type': model_type,
-            'classes': ['deer', 'fox', 'bear', 'wolf', 'rabbit'],
-            'input_size': (640, 640),
+        from ultralytics import YOLO
+        if model_type not in ('default', 'yolov8'):
+            raise ValueError(f"Unsupported model type: {model_type}")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        if model_path and (model_path.endswith('.onnx') or model_path.endswith('_openvino_model')):
+            path = model_path
+            backend = 'onnx' if model_path.endswith('.onnx') else 'openvino'
+            weights = model_path
+        else:
+            weights = ModelLoader.resolve_weights(model_size, model_path)
+            path = weights
+            if backend != 'torch':
+                path = ModelLoader.export_model(weights, backend, imgsz, int8, calibration_dir)
+        if backend == 'torch':
+            model = YOLO(path, verbose=False)
+            model.to('cpu')
+        else:
+            model = YOLO(path, task='detect', verbose=False)
+        return {
+            'model': model,
+            'model_type': 'yolov8',
+            'backend': backend,
+            'model_size': model_size,
+            'int8': int8 and backend != 'torch',
+            'weights': weights,
+            'path': path,
+            'model_id': f"{Path(path).name}:{backend}",
+            'classes': getattr(model, 'names', {}),
+            'input_size': (imgsz, imgsz),
             'confidence_threshold': 0.5
         }
-        if model_path and os.path.exists(model_path):
-            # Load model from the specified path
-            pass
-        else:
-            if model_type == 'yolov5':
-                pass
-            elif model_type == 'fasterrcnn':
-                pass
-            else:
-                pass
-        return model_info
+
     @staticmethod
     def get_available_models() -> list:
         """
         Get a list of available pre-trained models.
         """
-        return [
-            {'id': 'yolov5', 'name': 'YOLOv5', 'description': 'YOLOv5 model for animal detection'},
-            {'id': 'fasterrcnn', 'name': 'Faster R-CNN', 'description': 'Faster R-CNN model for animal detection'},
-            {'id': 'default', 'name': 'Default', 'description': 'Default animal detection model'}
-        ]
+        models = []
+        for size in MODEL_SIZES:
+            for backend in BACKENDS:
+                models.append({
+                    'id': f'yolov8{size}-{backend}',
+                    'name': f'YOLOv8{size} ({backend})',
+                    'description': f'YOLOv8{size} animal detection on {backend}',
+                    'model_size': size,
+                    'backend': backend,
+                })
+        return models
+
+    @staticmethod
+    def compare_variants(variants: List[Dict[str, Any]], images_dir: str, data_yaml: Optional[str] = None,
+                         imgsz: int = 640, runs: int = 20, warmup: int = 3) -> List[Dict[str, Any]]:
+        """
+        Report CPU latency and, when a labelled dataset YAML is given, mAP for each model variant.
+        Args:
+            variants: load_model keyword arguments, e.g. {'backend': 'onnx', 'model_size': 's', 'int8': True}
+            images_dir: Folder of sample images used for latency
+            data_yaml: Optional ultralytics dataset YAML used for mAP validation
+            runs: Timed inferences per variant
+            warmup: Untimed inferences before timing
+        Returns:
+            One row per variant with p50/p95 latency in ms and mAP50 / mAP50-95 (None without data_yaml)
+        """
+        images = list(_iter_images(images_dir, limit=max(runs, 1)))
+        if not images:
+            raise ValueError(f"No images found in {images_dir}")
+        rows = []
+        for options in variants:
+            info = ModelLoader.load_model(imgsz=imgsz, **options)
+            model = info['model']
+            for i in range(warmup):
+                model(images[i % len(images)], imgsz=imgsz, verbose=False)
+            timings = []
+            for i in range(runs):
+                started = time.perf_counter()
+                model(images[i % len(images)], imgsz=imgsz, verbose=False)
+                timings.append((time.perf_counter() - started) * 1000.0)
+            row = {
+                'backend': info['backend'],
+                'model_size': info['model_size'],
+                'int8': info['int8'],
+                'path': info['path'],
+                'latency_p50_ms': float(np.percentile(timings, 50)),
+                'latency_p95_ms': float(np.percentile(timings, 95)),
+                'map50': None,
+                'map50_95': None,
+            }
+            if data_yaml:
+                metrics = model.val(data=data_yaml, imgsz=imgsz, batch=1, device='cpu', verbose=False, plots=False)
+                row['map50'] = float(metrics.box.map50)
+                row['map50_95'] = float(metrics.box.map)
+            rows.append(row)
+        return rows
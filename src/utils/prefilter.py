@@ -0,0 +1,214 @@
+"""
+Cheap first-stage filter for camera-trap images.
+
+Most trap images are empty, so an optional small, downsampled model (YOLOv8n at 320px by default)
+looks at every image first and only images where it sees a possible animal reach the full model.
+Measure how much recall the filter costs on a labelled folder before enabling it:
+
+    python -m src.utils.prefilter /data/labelled --threshold 0.1 --target-recall 0.99
+
+where /data/labelled has animal/ and empty/ subfolders.
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from src.utils.metrics import PREFILTER_IMAGES, timed
+
+PREFILTER_DEFAULTS = {
+    'model_size': 'n',
+    'model_path': None,
+    'backend': 'torch',
+    'imgsz': 320,
+    'threshold': 0.1,
+    'min_std': 0.0,
+}
+SWEEP_THRESHOLDS = (0.01, 0.02, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5)
+
+
+class EmptyFramePrefilter:
+    """
+    Scores each image with the highest animal confidence from a small model run at low resolution
+    and passes on only images scoring at least threshold. Images that are almost uniform
+    (lens cap, black night frames) can be dropped before the model with min_std.
+    """
+    def __init__(self, model_size: str = 'n', model_path: Optional[str] = None, backend: str = 'torch',
+                 imgsz: int = 320, threshold: float = 0.1, min_std: float = 0.0, score_floor: float = 0.01):
+        """
+        Args:
+            model_size: YOLOv8 size of the filter model
+            model_path: Custom filter weights instead of model_size
+            backend: torch, onnx or openvino
+            imgsz: Long-side inference size of the filter pass
+            threshold: Lowest animal confidence that sends an image on to the full model
+            min_std: Drop images whose grayscale standard deviation is below this without running the model
+            score_floor: Lowest confidence the filter model reports, so scores below threshold are still measured
+        """
+        from src.utils.detection import AnimalDetector  # Deferred: detection imports this module
+        self.model_size = model_size
+        self.model_path = model_path
+        self.backend = backend
+        self.imgsz = imgsz
+        self.threshold = threshold
+        self.min_std = min_std
+        self.detector = AnimalDetector(model_path=model_path, conf_threshold=min(score_floor, threshold),
+                                       backend=backend, model_size=model_size)
+        self._lock = threading.Lock()
+        self.images = 0
+        self.candidates = 0
+        self.flat = 0
+        self.seconds = 0.0
+
+    @classmethod
+    def from_options(cls, options: Any) -> 'EmptyFramePrefilter':
+        """Build from True (defaults) or a dict of PREFILTER_DEFAULTS overrides."""
+        return cls(**{**PREFILTER_DEFAULTS, **(options if isinstance(options, dict) else {})})
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            'model_size': self.model_size,
+            'model_path': self.model_path,
+            'backend': self.backend,
+            'imgsz': self.imgsz,
+            'threshold': self.threshold,
+            'min_std': self.min_std,
+        }
+
+    def _is_flat(self, img: np.ndarray) -> bool:
+        if self.min_std <= 0:
+            return False
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (max(1, gray.shape[1] // 8), max(1, gray.shape[0] // 8)), interpolation=cv2.INTER_AREA)
+        return float(small.std()) < self.min_std
+
+    def _score(self, images: List[np.ndarray]):
+        flat = np.array([self._is_flat(img) for img in images], dtype=bool)
+        scores = np.zeros(len(images), dtype=np.float32)
+        indices = np.flatnonzero(~flat).tolist()
+        if indices:
+            with timed('prefilter'):
+                outputs = self.detector._predict_batch([images[i] for i in indices], self.imgsz)
+            for i, (_, conf, _) in zip(indices, outputs):
+                if len(conf):
+                    scores[i] = float(conf.max())
+        return scores, flat
+
+    def scores(self, images: List[np.ndarray]) -> np.ndarray:
+        """Highest animal confidence the filter model finds in each BGR image (0 for flat images)."""
+        return self._score(images)[0]
+
+    def filter(self, images: List[np.ndarray]) -> List[bool]:
+        """Which images may contain an animal and should go through the full model."""
+        started = time.perf_counter()
+        scores, flat = self._score(images)
+        keep = ((scores >= self.threshold) & ~flat).tolist()
+        passed = sum(keep)
+        with self._lock:
+            self.images += len(images)
+            self.candidates += passed
+            self.flat += int(flat.sum())
+            self.seconds += time.perf_counter() - started
+        PREFILTER_IMAGES.inc(passed, result='candidate')
+        PREFILTER_IMAGES.inc(len(images) - passed, result='filtered')
+        return keep
+
+    def warmup(self, shapes=((640, 640),)):
+        for height, width in shapes:
+            self.scores([np.zeros((height, width, 3), dtype=np.uint8)])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            filtered = self.images - self.candidates
+            return {
+                **self.config(),
+                'images': self.images,
+                'candidates': self.candidates,
+                'filtered': filtered,
+                'filtered_flat': self.flat,
+                'filter_rate': filtered / self.images if self.images else 0.0,
+                'avg_ms': self.seconds * 1000.0 / self.images if self.images else 0.0,
+            }
+
+
+def evaluate_recall(prefilter: EmptyFramePrefilter, folder: str, target_recall: float = 0.99,
+                    batch_size: int = 16) -> Dict[str, Any]:
+    """
+    Measure the filter on a labelled folder with animal/ and empty/ subfolders.
+    Returns:
+        Recall on animal images and filter rate on empty images at the configured threshold, the same
+        figures for a sweep of thresholds, and the highest threshold that keeps target_recall
+    """
+    from src.utils.model_loader import _iter_images
+    scores = {}
+    for label in ('animal', 'empty'):
+        path = os.path.join(folder, label)
+        if not os.path.isdir(path):
+            raise ValueError(f"Missing {label}/ subfolder in {folder}")
+        values, batch = [], []
+        for img in _iter_images(path):
+            batch.append(img)
+            if len(batch) == batch_size:
+                values.extend(prefilter.scores(batch).tolist())
+                batch = []
+        if batch:
+            values.extend(prefilter.scores(batch).tolist())
+        scores[label] = np.array(values, dtype=np.float32)
+    animal, empty = scores['animal'], scores['empty']
+    if not len(animal):
+        raise ValueError(f"No images in {os.path.join(folder, 'animal')}")
+
+    def at(threshold: float) -> Dict[str, Any]:
+        passed = int((animal >= threshold).sum() + (empty >= threshold).sum())
+        return {
+            'threshold': threshold,
+            'recall': float((animal >= threshold).mean()),
+            'empty_filter_rate': float((empty < threshold).mean()) if len(empty) else None,
+            'pass_rate': passed / (len(animal) + len(empty)),
+        }
+
+    # Highest threshold that still passes ceil(target_recall * n) of the animal images
+    ranked = np.sort(animal)[::-1]
+    needed = min(len(ranked), max(1, int(np.ceil(target_recall * len(ranked)))))
+    return {
+        'animal_images': len(animal),
+        'empty_images': len(empty),
+        'current': at(prefilter.threshold),
+        'sweep': [at(threshold) for threshold in SWEEP_THRESHOLDS],
+        'target_recall': target_recall,
+        'recommended_threshold': float(ranked[needed - 1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the empty-frame prefilter's recall on a labelled folder")
+    parser.add_argument('folder', help="Folder with animal/ and empty/ subfolders")
+    parser.add_argument('--model-size', default=PREFILTER_DEFAULTS['model_size'])
+    parser.add_argument('--model-path', help="Custom filter weights instead of --model-size")
+    parser.add_argument('--backend', default=PREFILTER_DEFAULTS['backend'])
+    parser.add_argument('--imgsz', type=int, default=PREFILTER_DEFAULTS['imgsz'])
+    parser.add_argument('--threshold', type=float, default=PREFILTER_DEFAULTS['threshold'])
+    parser.add_argument('--min-std', type=float, default=PREFILTER_DEFAULTS['min_std'])
+    parser.add_argument('--target-recall', type=float, default=0.99)
+    args = parser.parse_args()
+
+    prefilter = EmptyFramePrefilter(model_size=args.model_size, model_path=args.model_path, backend=args.backend,
+                                    imgsz=args.imgsz, threshold=args.threshold, min_std=args.min_std)
+    report = evaluate_recall(prefilter, args.folder, target_recall=args.target_recall)
+    print(f"{'threshold':>10}{'recall':>10}{'empty filtered':>16}{'pass rate':>11}")
+    for row in report['sweep']:
+        empty_rate = f"{row['empty_filter_rate']:.3f}" if row['empty_filter_rate'] is not None else '-'
+        print(f"{row['threshold']:>10.2f}{row['recall']:>10.3f}{empty_rate:>16}{row['pass_rate']:>11.3f}")
+    current = report['current']
+    print(f"At --threshold {current['threshold']}: recall {current['recall']:.3f}, pass rate {current['pass_rate']:.3f}")
+    print(f"Highest threshold keeping {args.target_recall:.1%} recall: {report['recommended_threshold']:.3f}")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
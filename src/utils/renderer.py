@@ -0,0 +1,304 @@
+"""
+Box and label drawing for annotated frames and images.
+
+Labels are rasterised once with Pillow, so the category emoji actually render (the Hershey fonts
+behind cv2.putText have no glyphs for them), and kept as premultiplied BGR + alpha sprites. A frame
+then costs only the box outlines plus one small alpha blend per label: the class part of each label
+and the confidence digits are cached glyph sprites, and composed labels are kept in an LRU, so a
+box that persists between frames (tracked boxes, carried-forward video frames) is redrawn from its
+cached sprite without rasterising anything. No pass ever touches pixels outside the annotations.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from src.utils.metrics import timed
+
+# Box and label background colour per category (BGR); config/taxonomy.json overrides these
+CATEGORY_COLORS = {
+    'large_mammals': (0, 0, 255),
+    'carnivores': (0, 165, 255),
+    'herbivores': (0, 255, 0),
+    'primates': (180, 105, 255),
+    'birds': (255, 160, 0),
+    'reptiles': (0, 140, 140),
+    'small_mammals': (200, 200, 0),
+}
+DEFAULT_COLOR = (0, 255, 0)
+DEFAULT_EMOJI = '🐾'
+# Banners drawn in the top-left corner, in order, when a detection of the category is present
+# (the default; detectors pass their taxonomy's banners)
+ALERTS = (
+    ('large_mammals', '🚨 WARNING: Large mammals detected!'),
+    ('carnivores', '⚠️ Caution: Carnivores detected!'),
+)
+FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
+    '/Library/Fonts/Arial Bold.ttf',
+    'C:/Windows/Fonts/arialbd.ttf',
+    'DejaVuSans-Bold.ttf',  # Pillow also looks in the platform font directories
+)
+EMOJI_FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf',
+    '/usr/share/fonts/noto/NotoColorEmoji.ttf',
+    '/usr/share/fonts/google-noto-emoji/NotoColorEmoji.ttf',
+    '/System/Library/Fonts/Apple Color Emoji.ttc',
+    'C:/Windows/Fonts/seguiemj.ttf',
+    'NotoColorEmoji.ttf',
+)
+# Bitmap emoji fonts only load at their strike sizes (109 for Noto, 160 / 96 / 64 for Apple)
+_EMOJI_SIZES = (109, 160, 96, 64, 48, 32)
+
+Sprite = Tuple[np.ndarray, np.ndarray]  # (premultiplied BGR * 255, 255 - alpha), both uint16
+
+
+def _is_emoji(char: str) -> bool:
+    code = ord(char)
+    return code >= 0x1F000 or 0x2600 <= code <= 0x27BF or 0x2B00 <= code <= 0x2BFF
+
+
+def _load_font(candidates: Sequence[Optional[str]], size: int):
+    for path in candidates:
+        if not path:
+            continue
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def _load_emoji_font(candidates: Sequence[Optional[str]]):
+    for path in candidates:
+        if not path:
+            continue
+        for size in _EMOJI_SIZES:
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    return None
+
+
+def _text_color(background: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    """Black or white text, whichever reads better on the background."""
+    blue, green, red = background
+    return (0, 0, 0) if 0.114 * blue + 0.587 * green + 0.299 * red > 150 else (255, 255, 255)
+
+
+def _describe(det: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """Label name and category of a process_frame-style or detect_animals-style detection."""
+    cls = det['class']
+    if isinstance(cls, dict):
+        return cls['name'].replace('_', ' ').title(), cls.get('category')
+    return det.get('display_name') or str(cls), det.get('category')
+
+
+def blend(frame: np.ndarray, sprite: Sprite, x: int, y: int):
+    """Alpha-blend a sprite onto the frame in place with its top-left corner at (x, y), clipped to the frame."""
+    premul, inverse = sprite
+    height, width = premul.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, frame.shape[1]), min(y + height, frame.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+    src = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+    roi = frame[y0:y1, x0:x1]
+    mixed = roi * inverse[src]
+    mixed += premul[src]
+    mixed += 127
+    mixed //= 255
+    roi[...] = mixed
+
+
+class AnnotationRenderer:
+    """
+    Draws detections (boxes, labels with category emoji and confidence, category alert banners)
+    onto BGR frames in place. Thread-safe; one instance is normally shared by every detector with
+    the same emoji table through shared_renderer().
+    """
+    def __init__(self, category_emojis: Optional[Dict[str, str]] = None, font_path: Optional[str] = None,
+                 emoji_font_path: Optional[str] = None, font_size: int = 16, box_thickness: int = 2,
+                 label_alpha: float = 0.8, colors: Optional[Dict[str, Tuple[int, int, int]]] = None,
+                 alerts: Optional[Sequence[Tuple[str, str]]] = None, max_labels: int = 1024):
+        """
+        Args:
+            category_emojis: Emoji shown before the class name, per category
+            font_path: TrueType font for label text (the first of FONT_CANDIDATES found by default)
+            emoji_font_path: Colour emoji font (the first of EMOJI_FONT_CANDIDATES found by default);
+                without one, labels are drawn without their emoji
+            font_size: Label text size in pixels; alert banners are a quarter larger
+            box_thickness: Box outline width in pixels
+            label_alpha: Opacity of the label and banner backgrounds
+            colors: Per-category BGR overrides of CATEGORY_COLORS
+            alerts: (category, text) banners to draw instead of ALERTS
+            max_labels: Composed label sprites kept, least recently used dropped first
+        """
+        self.category_emojis = dict(category_emojis or {})
+        self.colors = {**CATEGORY_COLORS, **{name: tuple(color) for name, color in (colors or {}).items()}}
+        self.alerts = tuple(tuple(alert) for alert in (alerts if alerts is not None else ALERTS))
+        self.box_thickness = box_thickness
+        self.label_alpha = label_alpha
+        self.max_labels = max_labels
+        self.font = _load_font((font_path,) + FONT_CANDIDATES, font_size)
+        self.alert_font = _load_font((font_path,) + FONT_CANDIDATES, int(round(font_size * 1.25)))
+        self.emoji_font = _load_emoji_font((emoji_font_path,) + EMOJI_FONT_CANDIDATES)
+        self._pieces: Dict[Tuple, np.ndarray] = {}  # Rasterised class names, digits and emoji
+        self._labels: 'OrderedDict[Tuple, Sprite]' = OrderedDict()
+        self._banners: Dict[str, Sprite] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def color(self, category: Optional[str]) -> Tuple[int, int, int]:
+        return self.colors.get(category, DEFAULT_COLOR)
+
+    def _emoji(self, char: str, height: int) -> Optional[np.ndarray]:
+        """A colour emoji as a BGRA array scaled to height, or None when the font has no glyph."""
+        size = self.emoji_font.size
+        canvas = Image.new('RGBA', (2 * size, 2 * size), (0, 0, 0, 0))
+        ImageDraw.Draw(canvas).text((0, 0), char, font=self.emoji_font, embedded_color=True)
+        box = canvas.getbbox()
+        if box is None:
+            return None
+        glyph = canvas.crop(box)
+        glyph = glyph.resize((max(1, int(round(glyph.width * height / glyph.height))), height), Image.LANCZOS)
+        return np.ascontiguousarray(np.asarray(glyph)[..., [2, 1, 0, 3]])
+
+    def _rasterize(self, text: str, font, fg: Tuple[int, int, int]) -> np.ndarray:
+        """Text as a BGRA array one line high: fg-coloured letters and colour emoji on transparent."""
+        key = (text, id(font), fg)
+        piece = self._pieces.get(key)
+        if piece is not None:
+            return piece
+        try:
+            ascent, descent = font.getmetrics()
+        except AttributeError:  # Bitmap fallback font
+            ascent, descent = font.getbbox('Ag')[3], 0
+        height = ascent + descent
+        text = text.replace('\ufe0f', '').replace('\u200d', '')
+        if self.emoji_font is None:
+            text = ''.join(char for char in text if not _is_emoji(char)).lstrip()
+        parts: List[np.ndarray] = []
+        run = ''
+        for char in text + '\0':
+            if char != '\0' and not _is_emoji(char):
+                run += char
+                continue
+            if run:
+                mask = Image.new('L', (max(1, int(np.ceil(font.getlength(run)))), height), 0)
+                ImageDraw.Draw(mask).text((0, 0), run, fill=255, font=font)
+                part = np.empty((height, mask.width, 4), dtype=np.uint8)
+                part[..., :3] = fg
+                part[..., 3] = np.asarray(mask)
+                parts.append(part)
+                run = ''
+            if char != '\0':
+                glyph = self._emoji(char, ascent)
+                if glyph is not None:
+                    parts.append(np.pad(glyph, ((0, height - ascent), (0, 0), (0, 0))))
+        piece = np.hstack(parts) if parts else np.zeros((height, 1, 4), dtype=np.uint8)
+        self._pieces[key] = piece
+        return piece
+
+    def _sprite(self, bgra: np.ndarray, background: Tuple[int, int, int], pad: Tuple[int, int] = (4, 2)) -> Sprite:
+        """Composite text over a translucent background box and premultiply it for blend()."""
+        pad_x, pad_y = pad
+        height, width = bgra.shape[:2]
+        fg_alpha = np.zeros((height + 2 * pad_y, width + 2 * pad_x, 1), dtype=np.float32)
+        fg = np.zeros((height + 2 * pad_y, width + 2 * pad_x, 3), dtype=np.float32)
+        fg_alpha[pad_y:pad_y + height, pad_x:pad_x + width] = bgra[..., 3:] / 255.0
+        fg[pad_y:pad_y + height, pad_x:pad_x + width] = bgra[..., :3]
+        bg_alpha = self.label_alpha * (1.0 - fg_alpha)
+        alpha = fg_alpha + bg_alpha
+        straight = (fg * fg_alpha + np.float32(background) * bg_alpha) / np.maximum(alpha, 1e-6)
+        alpha = np.round(alpha * 255.0)
+        premul = np.round(straight * alpha).astype(np.uint16)
+        # Full three channels: broadcasting a single alpha channel makes the blend several times slower
+        return premul, np.repeat(255 - alpha, 3, axis=2).astype(np.uint16)
+
+    def label(self, name: str, category: Optional[str], confidence: float) -> Sprite:
+        """The label sprite for a detection; the class part and the digits are rasterised once each."""
+        score = f"{confidence:.2f}"
+        key = (name, category, score)
+        with self._lock:
+            sprite = self._labels.get(key)
+            if sprite is not None:
+                self._labels.move_to_end(key)
+                self.hits += 1
+                return sprite
+            self.misses += 1
+        background = self.color(category)
+        fg = _text_color(background)
+        emoji = self.category_emojis.get(category, DEFAULT_EMOJI)
+        parts = [self._rasterize(f"{emoji} {name} ", self.font, fg)]
+        parts.extend(self._rasterize(char, self.font, fg) for char in score)
+        sprite = self._sprite(np.hstack(parts), background)
+        with self._lock:
+            self._labels[key] = sprite
+            while len(self._labels) > self.max_labels:
+                self._labels.popitem(last=False)
+        return sprite
+
+    def banner(self, category: str, text: str) -> Sprite:
+        sprite = self._banners.get(category)
+        if sprite is None:
+            background = self.color(category)
+            sprite = self._sprite(self._rasterize(text, self.alert_font, _text_color(background)), background, (6, 3))
+            self._banners[category] = sprite
+        return sprite
+
+    def draw(self, frame: np.ndarray, detections: List[Dict[str, Any]]) -> np.ndarray:
+        """Draw process_frame-style or detect_animals-style detections onto a BGR frame in place."""
+        with timed('draw'):
+            categories = set()
+            for det in detections:
+                name, category = _describe(det)
+                categories.add(category)
+                x1, y1, x2, y2 = det['bbox']
+                cv2.rectangle(frame, (x1, y1), (x2, y2), self.color(category), self.box_thickness)
+                sprite = self.label(name, category, det['confidence'])
+                label_height = sprite[0].shape[0]
+                # Above the box, or just inside its top edge when there is no room above
+                blend(frame, sprite, x1, y1 - label_height if y1 >= label_height else y1)
+            y = 10
+            for category, text in self.alerts:
+                if category in categories:
+                    sprite = self.banner(category, text)
+                    blend(frame, sprite, 10, y)
+                    y += sprite[0].shape[0] + 4
+        return frame
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'labels': len(self._labels),
+                'hits': self.hits,
+                'misses': self.misses,
+                'font': getattr(self.font, 'path', None),
+                'emoji_font': getattr(self.emoji_font, 'path', None),
+            }
+
+
+_renderers: Dict[str, AnnotationRenderer] = {}
+_renderers_lock = threading.Lock()
+
+
+def shared_renderer(category_emojis: Optional[Dict[str, str]] = None, **options) -> AnnotationRenderer:
+    """One renderer per emoji table and options, so detectors with the same settings share sprite caches."""
+    key = json.dumps([category_emojis or {}, options], sort_keys=True, default=str)
+    with _renderers_lock:
+        renderer = _renderers.get(key)
+        if renderer is None:
+            renderer = _renderers[key] = AnnotationRenderer(category_emojis, **options)
+        return renderer
@@ -0,0 +1,168 @@
+"""
+Class taxonomy: which model class ids are animals and their names, categories, confidence
+thresholds, colours, emoji and alert messages. It is read from config/taxonomy.json by default, or
+from any JSON / YAML file with the same layout, so a custom model's class map and thresholds can be
+retargeted without code changes:
+
+    {"default_emoji": "🐾",
+     "categories": {"carnivores": {"emoji": "🐺", "color": [0, 165, 255],
+                                   "message": "{emoji} Caution: {name} detected! {emoji}",
+                                   "banner": "⚠️ Caution: Carnivores detected!"}},
+     "classes": {"9": {"name": "hyena", "category": "carnivores", "threshold": 0.5}}}
+
+Classes without a threshold use the detector's conf_threshold; categories without a message use
+DEFAULT_MESSAGE and only categories with a banner get one drawn on annotated frames. Each file is
+parsed and compiled once per process into read-only tables indexed by class id, shared by every
+detector (and, in worker processes, every worker detector) that uses it.
+"""
+import os
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                     'config', 'taxonomy.json')
+DEFAULT_MESSAGE = "{emoji} Detected: {name} {emoji}"
+DEFAULT_COLOR = (0, 255, 0)
+
+_cache: Dict[Tuple[str, float], 'Taxonomy'] = {}
+_cache_lock = threading.Lock()
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class Taxonomy:
+    """
+    Compiled class tables. Build with load() (cached per file) or from_dicts(); treat instances as
+    immutable, since they are shared between detectors.
+    """
+    def __init__(self, classes: Dict[int, Dict[str, Any]], categories: Dict[str, Dict[str, Any]],
+                 default_emoji: str = '🐾', source: Optional[str] = None):
+        """
+        Args:
+            classes: Class id -> {'name', 'category', optional 'threshold'}
+            categories: Category -> {optional 'emoji', 'color' (BGR), 'message', 'banner'}
+            default_emoji: Emoji for categories without one
+            source: File the tables were read from, if any
+        """
+        self.source = source
+        self.default_emoji = default_emoji
+        self.categories = {name: dict(options or {}) for name, options in categories.items()}
+        # The detector's editable dict views: id -> {'name', 'category'}, category -> emoji, name -> threshold
+        self.classes: Dict[int, Dict[str, str]] = {}
+        self.emojis = {name: options.get('emoji', default_emoji) for name, options in self.categories.items()}
+        self.class_thresholds: Dict[str, float] = {}
+        for class_id, info in classes.items():
+            if not info.get('name') or not info.get('category'):
+                raise ValueError(f"Class {class_id} needs a name and a category")
+            self.classes[int(class_id)] = {'name': info['name'], 'category': info['category']}
+            if info.get('threshold') is not None:
+                self.class_thresholds.setdefault(info['name'], float(info['threshold']))
+
+        size = max(self.classes, default=-1) + 1
+        self.class_ids: Tuple[int, ...] = tuple(self.classes)
+        self.info: List[Optional[Dict[str, str]]] = [None] * size
+        self.display_names: List[Optional[str]] = [None] * size
+        self.messages: List[Optional[str]] = [None] * size
+        self.id_by_name: Dict[str, int] = {}
+        # NaN marks classes that fall back to the detector's default threshold
+        explicit = np.full(size, np.nan, dtype=np.float64)
+        animal = np.zeros(size, dtype=bool)
+        colors = np.empty((size, 3), dtype=np.uint8)
+        colors[:] = DEFAULT_COLOR
+        category_colors = self.category_colors
+        for class_id, info in self.classes.items():
+            category = info['category']
+            display = info['name'].replace('_', ' ').title()
+            self.info[class_id] = info
+            self.display_names[class_id] = display
+            self.messages[class_id] = self._format_message(category, display)
+            self.id_by_name.setdefault(info['name'], class_id)
+            explicit[class_id] = self.class_thresholds.get(info['name'], np.nan)
+            animal[class_id] = True
+            colors[class_id] = category_colors.get(category, DEFAULT_COLOR)
+        self._explicit_thresholds = _readonly(explicit)
+        self.is_animal = _readonly(animal)
+        self.colors = _readonly(colors)
+        self._thresholds: Dict[float, np.ndarray] = {}
+
+    @property
+    def category_colors(self) -> Dict[str, Tuple[int, int, int]]:
+        return {name: tuple(options['color']) for name, options in self.categories.items() if 'color' in options}
+
+    @property
+    def banners(self) -> Tuple[Tuple[str, str], ...]:
+        """(category, text) alert banners, in file order."""
+        return tuple((name, options['banner']) for name, options in self.categories.items() if options.get('banner'))
+
+    def _format_message(self, category: str, display_name: str) -> str:
+        template = self.categories.get(category, {}).get('message') or DEFAULT_MESSAGE
+        return template.format(emoji=self.emojis.get(category, self.default_emoji), name=display_name)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'Taxonomy':
+        """The compiled taxonomy for a JSON / YAML file (DEFAULT_TAXONOMY_PATH by default), parsed once per change."""
+        path = os.path.abspath(path or DEFAULT_TAXONOMY_PATH)
+        key = (path, os.path.getmtime(path))
+        with _cache_lock:
+            taxonomy = _cache.get(key)
+            if taxonomy is None:
+                with open(path, 'r', encoding='utf-8') as f:
+                    if path.endswith(('.yaml', '.yml')):
+                        import yaml
+                        config = yaml.safe_load(f) or {}
+                    else:
+                        config = json.load(f)
+                taxonomy = cls(config.get('classes', {}), config.get('categories', {}),
+                               default_emoji=config.get('default_emoji', '🐾'), source=path)
+                for stale in [k for k in _cache if k[0] == path]:
+                    del _cache[stale]
+                _cache[key] = taxonomy
+            return taxonomy
+
+    @classmethod
+    def from_dicts(cls, animal_classes: Dict[int, Dict[str, str]], animal_categories: Dict[str, str],
+                   class_conf_thresholds: Dict[str, float], base: Optional['Taxonomy'] = None) -> 'Taxonomy':
+        """Compile the detector's editable dicts, keeping colours, messages and banners from base."""
+        base_categories = base.categories if base is not None else {}
+        categories = {name: dict(options) for name, options in base_categories.items()}
+        for name, emoji in animal_categories.items():
+            categories.setdefault(name, {})['emoji'] = emoji
+        classes = {class_id: {**info, 'threshold': class_conf_thresholds.get(info['name'])}
+                   for class_id, info in animal_classes.items()}
+        return cls(classes, categories, default_emoji=base.default_emoji if base is not None else '🐾')
+
+    def matches(self, animal_classes: Dict[int, Dict[str, str]], animal_categories: Dict[str, str],
+                class_conf_thresholds: Dict[str, float]) -> bool:
+        """Whether the detector's dicts still describe these tables."""
+        thresholds = {name: value for name, value in class_conf_thresholds.items() if name in self.id_by_name}
+        return (animal_classes == self.classes and animal_categories == self.emojis
+                and thresholds == self.class_thresholds)
+
+    def thresholds(self, default: float) -> np.ndarray:
+        """Per-class-id confidence thresholds: explicit ones, default for the rest and inf for non-animal ids."""
+        table = self._thresholds.get(default)
+        if table is None:
+            table = np.where(np.isnan(self._explicit_thresholds), default, self._explicit_thresholds)
+            table[~self.is_animal] = np.inf
+            table = self._thresholds[default] = _readonly(table)
+        return table
+
+    def message(self, class_identifier: Union[str, int]) -> str:
+        """Alert message for a class id or name."""
+        if isinstance(class_identifier, str):
+            class_id = self.id_by_name.get(class_identifier)
+            if class_id is None:
+                return f"Detected: {class_identifier}"
+        elif isinstance(class_identifier, int):
+            class_id = class_identifier
+            if class_id not in self.classes:
+                return f"Detected: Unknown class {class_id}"
+        else:
+            return "Detected: Unknown"
+        return self.messages[class_id]
@@ -0,0 +1,130 @@
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Default slicing options; see tile_grid / active_tiles / detect_tiled
+TILING_DEFAULTS = {
+    'tile_size': 640,
+    'overlap': 0.2,
+    'batch_size': 8,
+    'min_side': 1280,
+    'min_tile_std': 4.0,
+    'include_full': True,
+}
+
+
+def tile_grid(height: int, width: int, tile_size: int = 640, overlap: float = 0.2) -> np.ndarray:
+    """
+    Overlapping square tiles covering an image, as an (N, 4) int array of x1, y1, x2, y2.
+    The last row and column are shifted back to the image edge so every tile is full size
+    (unless the image itself is smaller than a tile).
+    """
+    step = max(1, int(tile_size * (1.0 - overlap)))
+
+    def starts(length: int) -> np.ndarray:
+        if length <= tile_size:
+            return np.array([0])
+        positions = np.arange(0, length - tile_size, step)
+        return np.unique(np.append(positions, length - tile_size))
+
+    ys, xs = starts(height), starts(width)
+    x1, y1 = np.meshgrid(xs, ys)
+    x1, y1 = x1.ravel(), y1.ravel()
+    return np.stack([x1, y1, np.minimum(x1 + tile_size, width), np.minimum(y1 + tile_size, height)], axis=1)
+
+
+def active_tiles(img: np.ndarray, tiles: np.ndarray, min_std: float = 4.0, scale: int = 8) -> np.ndarray:
+    """
+    Boolean mask of tiles worth running the detector on, computed on a 1/scale grayscale thumbnail.
+    A tile is skipped when its grey levels are almost flat (sky, lens cap, night-time black).
+    Unchanged tiles are not skipped; frame-to-frame change is handled by the video frame samplers.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (max(1, gray.shape[1] // scale), max(1, gray.shape[0] // scale)),
+                       interpolation=cv2.INTER_AREA).astype(np.float32)
+    keep = np.ones(len(tiles), dtype=bool)
+    for i, (x1, y1, x2, y2) in enumerate(tiles // scale):
+        region = small[y1:max(y2, y1 + 1), x1:max(x2, x1 + 1)]
+        if region.size == 0 or region.std() < min_std:
+            keep[i] = False
+    return keep
+
+
+def nms(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, iou_threshold: float = 0.45) -> np.ndarray:
+    """
+    Class-aware non-maximum suppression in NumPy.
+    Boxes of different classes are offset into disjoint coordinate ranges so one pass handles
+    every class, and each step suppresses all overlapping boxes with a single vectorized IoU.
+    Returns:
+        Indices of the kept boxes, highest confidence first
+    """
+    if len(xyxy) == 0:
+        return np.empty(0, dtype=np.int64)
+    offset = cls.astype(np.float64)[:, None] * (float(xyxy.max()) + 1.0)
+    boxes = xyxy.astype(np.float64) + offset
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-conf, kind='stable')
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def detect_tiled(detector, img: np.ndarray,
+                 options: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, int]]:
+    """
+    Sliced inference for large images: overlapping tiles run at native resolution in batches,
+    boxes are shifted back to full-image coordinates and duplicates across tiles are merged with NMS.
+    Args:
+        detector: AnimalDetector whose _predict_batch runs the forward passes
+        img: BGR image
+        options: Overrides for TILING_DEFAULTS:
+            tile_size / overlap: Tile edge in pixels and the fraction shared by neighbouring tiles
+            batch_size: Tiles per forward pass
+            min_side: Images whose long side is at most this are not sliced
+            min_tile_std: Tiles whose thumbnail grey-level std is below this are skipped as flat
+            include_full: Also run the whole image once at tile_size so large animals that span
+                several tiles are found in one piece
+    Returns:
+        Raw (xyxy, conf, cls) arrays like _predict_batch, plus tile statistics
+    """
+    options = {**TILING_DEFAULTS, **(options or {})}
+    tile_size = int(options['tile_size'])
+    height, width = img.shape[:2]
+    if max(height, width) <= max(tile_size, options['min_side']):
+        xyxy, conf, cls = detector._infer(img, min(tile_size, max(height, width)))
+        return xyxy, conf, cls, {'tiles': 0, 'skipped': 0}
+    tiles = tile_grid(height, width, tile_size, options['overlap'])
+    keep = active_tiles(img, tiles, options['min_tile_std'])
+    selected = tiles[keep]
+    boxes, scores, classes = [], [], []
+    batch_size = max(1, int(options['batch_size']))
+    for start in range(0, len(selected), batch_size):
+        chunk = selected[start:start + batch_size]
+        crops = [img[y1:y2, x1:x2] for x1, y1, x2, y2 in chunk]
+        for (x1, y1, _, _), (xyxy, conf, cls) in zip(chunk, detector._predict_batch(crops, tile_size)):
+            boxes.append(xyxy + np.array([x1, y1, x1, y1], dtype=np.float32))
+            scores.append(conf)
+            classes.append(cls)
+    if options['include_full']:
+        xyxy, conf, cls = detector._infer(img, tile_size)
+        boxes.append(xyxy)
+        scores.append(conf)
+        classes.append(cls)
+    stats = {'tiles': int(len(tiles)), 'skipped': int(len(tiles) - len(selected))}
+    if not boxes:
+        return (np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32),
+                np.empty(0, dtype=np.float32), stats)
+    xyxy = np.concatenate(boxes)
+    conf = np.concatenate(scores)
+    cls = np.concatenate(classes)
+    kept = nms(xyxy, conf, cls, detector.iou_threshold)
+    return xyxy[kept], conf[kept], cls[kept], stats
@@ -0,0 +1,232 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy box arrays."""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class KalmanBoxFilter:
+    """
+    Constant-velocity Kalman filter over a bounding box, as used by SORT.
+    State is [cx, cy, area, aspect, vx, vy, varea]; measurements are [cx, cy, area, aspect].
+    """
+    _F = np.eye(7, dtype=np.float64)
+    _F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+    _H = np.eye(4, 7, dtype=np.float64)
+    _R = np.diag([1.0, 1.0, 10.0, 10.0])
+    _Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+
+    def __init__(self, bbox: List[float]):
+        self.x = np.zeros(7, dtype=np.float64)
+        self.x[:4] = self._to_z(bbox)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+
+    @staticmethod
+    def _to_z(bbox: List[float]) -> np.ndarray:
+        x1, y1, x2, y2 = bbox
+        w, h = max(x2 - x1, 1e-3), max(y2 - y1, 1e-3)
+        return np.array([x1 + w / 2.0, y1 + h / 2.0, w * h, w / h], dtype=np.float64)
+
+    def bbox(self) -> List[float]:
+        cx, cy, area, aspect = self.x[:4]
+        area = max(area, 1e-3)
+        w = np.sqrt(area * max(aspect, 1e-3))
+        h = area / w
+        return [cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0]
+
+    def predict(self) -> List[float]:
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self._F @ self.x
+        self.P = self._F @ self.P @ self._F.T + self._Q
+        return self.bbox()
+
+    def update(self, bbox: List[float]):
+        y = self._to_z(bbox) - self._H @ self.x
+        S = self._H @ self.P @ self._H.T + self._R
+        K = self.P @ self._H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self._H) @ self.P
+
+
+class Track:
+    """One tracked animal with its Kalman state and lifetime summary."""
+    def __init__(self, track_id: int, detection: Dict[str, Any], frame_index: int, timestamp: float):
+        self.track_id = track_id
+        self.filter = KalmanBoxFilter(detection['bbox'])
+        self.detection = detection
+        self.first_frame = self.last_frame = frame_index
+        self.first_seen = self.last_seen = timestamp
+        self.peak_confidence = detection['confidence']
+        self.hits = 1
+        self.misses = 0
+
+    def update(self, detection: Dict[str, Any], frame_index: int, timestamp: float):
+        self.filter.update(detection['bbox'])
+        self.detection = detection
+        self.last_frame = frame_index
+        self.last_seen = timestamp
+        self.peak_confidence = max(self.peak_confidence, detection['confidence'])
+        self.hits += 1
+        self.misses = 0
+
+    def current(self) -> Dict[str, Any]:
+        """The track's latest detection with its box replaced by the filter estimate."""
+        return {**self.detection, 'bbox': [int(round(v)) for v in self.filter.bbox()], 'track_id': self.track_id}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'track_id': self.track_id,
+            'class': self.detection['class'],
+            'display_name': self.detection.get('display_name'),
+            'category': self.detection.get('category'),
+            'alert': self.detection.get('alert'),
+            'confidence': self.peak_confidence,
+            'bbox': self.detection['bbox'],
+            'first_seen_frame': self.first_frame,
+            'last_seen_frame': self.last_frame,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'hits': self.hits,
+        }
+
+
+class MultiObjectTracker:
+    """
+    SORT-style multi-object tracker: Kalman prediction plus greedy IoU matching within each class.
+    Feed it process_frame-style detections with step(); frames without detection (None) only
+    advance the motion model so boxes can be propagated between detector runs. Track age is
+    counted in detector runs, so sparse sampling (e.g. motion-triggered keyframes) doesn't
+    expire a stationary animal's track between runs.
+    """
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30, min_hits: int = 1):
+        """
+        Args:
+            iou_threshold: Minimum IoU between a prediction and a detection to match them
+            max_age: Detector runs a track survives without a matching detection
+            min_hits: Matches needed before a track is reported
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.tracks: List[Track] = []
+        self.finished: List[Track] = []
+        self.lost_on_last_update = 0
+        self._last_detection_frame = None
+        self._next_id = 1
+
+    def step(self, frame_index: int, detections: Optional[List[Dict[str, Any]]],
+             timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Advance one frame.
+        Args:
+            frame_index: Index of this frame in the stream
+            detections: Detections for this frame, or None if the detector did not run
+            timestamp: Optional time of the frame in seconds (defaults to frame_index)
+        Returns:
+            Current boxes of the confirmed tracks
+        """
+        timestamp = float(frame_index) if timestamp is None else timestamp
+        predicted = [track.filter.predict() for track in self.tracks]
+        if detections is None:
+            return self.active()
+        for track in self.tracks:
+            track.misses += 1
+        self._match(predicted, detections, frame_index, timestamp)
+        expired = [t for t in self.tracks if t.misses > self.max_age]
+        if expired:
+            self.tracks = [t for t in self.tracks if t.misses <= self.max_age]
+            self.finished.extend(t for t in expired if t.hits >= self.min_hits)
+        return self.active()
+
+    def _match(self, predicted: List[List[float]], detections: List[Dict[str, Any]],
+               frame_index: int, timestamp: float):
+        unmatched_detections = set(range(len(detections)))
+        matched_tracks = set()
+        if self.tracks and detections:
+            iou = iou_matrix(np.array(predicted), np.array([d['bbox'] for d in detections]))
+            track_classes = np.array([str(t.detection['class']) for t in self.tracks])
+            det_classes = np.array([str(d['class']) for d in detections])
+            iou[track_classes[:, None] != det_classes[None, :]] = 0.0
+            order = np.dstack(np.unravel_index(np.argsort(-iou, axis=None), iou.shape))[0]
+            for t, d in order:
+                if iou[t, d] < self.iou_threshold:
+                    break
+                if t in matched_tracks or d not in unmatched_detections:
+                    continue
+                self.tracks[t].update(detections[d], frame_index, timestamp)
+                matched_tracks.add(t)
+                unmatched_detections.discard(d)
+        # Only tracks that were seen at the previous detector run count as newly lost
+        self.lost_on_last_update = sum(
+            1 for i, t in enumerate(self.tracks)
+            if i not in matched_tracks and t.last_frame == self._last_detection_frame
+        )
+        self._last_detection_frame = frame_index
+        for d in sorted(unmatched_detections):
+            self.tracks.append(Track(self._next_id, detections[d], frame_index, timestamp))
+            self._next_id += 1
+
+    def active(self) -> List[Dict[str, Any]]:
+        """Confirmed tracks matched at the latest detector run; unmatched tracks are kept for re-association only."""
+        return [t.current() for t in self.tracks
+                if t.hits >= self.min_hits and t.last_frame == self._last_detection_frame]
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Per-track summaries of every track seen so far, ordered by first appearance."""
+        tracks = self.finished + [t for t in self.tracks if t.hits >= self.min_hits]
+        return [t.summary() for t in sorted(tracks, key=lambda t: t.track_id)]
+
+
+class TrackingDetector:
+    """
+    Runs full detection only every detect_every frames, or sooner when tracks were lost,
+    and propagates tracked boxes with the Kalman filter in between. With draw=False frames are
+    returned unannotated, for callers that only need the tracked boxes.
+    """
+    def __init__(self, detector, detect_every: int = 5, tracker: Optional[MultiObjectTracker] = None,
+                 draw: bool = True):
+        self.detector = detector
+        self.draw = draw
+        self.detect_every = max(1, detect_every)
+        self.tracker = tracker or MultiObjectTracker(max_age=3)
+        self.frame_index = 0
+        self.detector_runs = 0
+        self._since_detect = None
+
+    def _needs_detection(self) -> bool:
+        return (self._since_detect is None
+                or self._since_detect + 1 >= self.detect_every
+                or self.tracker.lost_on_last_update > 0)
+
+    def process_frame(self, frame: np.ndarray, timestamp: Optional[float] = None):
+        """Detect or propagate, draw the tracked boxes (if enabled) and return (frame, tracked detections)."""
+        if self._needs_detection():
+            try:
+                detections = self.detector.detect_frame(frame)
+            except Exception as e:
+                print(f"Error in process_frame: {str(e)}")
+                detections = []
+            self.detector_runs += 1
+            self._since_detect = 0
+        else:
+            detections = None
+            self._since_detect += 1
+        tracked = self.tracker.step(self.frame_index, detections, timestamp)
+        self.frame_index += 1
+        if self.draw:
+            self.detector.draw_detections(frame, tracked)
+        return frame, tracked
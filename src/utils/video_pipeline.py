@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.utils.metrics import timed
+
+FrameProcessor = Callable[[int, np.ndarray], Tuple[np.ndarray, List[Dict]]]
+
+_END = object()
+
+
+class VideoPipeline:
+    """
+    Streaming decode -> infer -> encode pipeline for video files.
+    A decoder thread reads frames, the calling thread runs inference and an encoder
+    thread writes the output. Bounded queues between the stages provide backpressure
+    so memory stays flat on long videos, and frames are always written in order.
+    """
+    def __init__(self, process: FrameProcessor, queue_size: int = 8, inference_workers: int = 1,
+                 sampler=None, carry_forward: Optional[Callable[[np.ndarray, List[Dict]], Any]] = None):
+        """
+        Args:
+            process: Called as process(frame_index, frame) and returns (output_frame, detections)
+            queue_size: Capacity of each inter-stage queue, in frames
+            inference_workers: Frames processed concurrently by the inference stage; values above 1
+                only help when process() releases the GIL or dispatches to a scheduler / worker pool
+            sampler: Optional FrameSampler; frames it rejects skip process() entirely
+            carry_forward: Called as carry_forward(frame, detections) to draw the most recent
+                detections onto skipped frames so the annotated output stays continuous
+        """
+        self.process = process
+        self.queue_size = max(1, queue_size)
+        self.inference_workers = max(1, inference_workers)
+        self.sampler = sampler
+        self.carry_forward = carry_forward
+
+    def run(self, video_path: str, output_path: Optional[str], fourcc: str = 'mp4v',
+            on_frame: Optional[Callable[[int, List[Dict]], None]] = None,
+            on_progress: Optional[Callable[[int, int], None]] = None,
+            stop_event: Optional[threading.Event] = None, start_frame: int = 0,
+            end_frame: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Process a whole video.
+        Args:
+            video_path: Input video file
+            output_path: Annotated output file, or None to only collect detections without encoding
+            fourcc: Output codec
+            on_frame: Called as on_frame(frame_index, detections) in frame order; detections is
+                None for frames the sampler skipped
+            on_progress: Called as on_progress(frames_done, total_frames) after each written frame
+            stop_event: When set, the pipeline stops early and keeps what was written so far
+            start_frame: First frame to process; frame indices passed to callbacks stay absolute
+            end_frame: Frame index to stop before (defaults to the end of the video)
+        Returns:
+            Dictionary with frame count, video properties and elapsed time
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video: {video_path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if end_frame is not None:
+            total_frames = min(total_frames, end_frame) if total_frames > 0 else end_frame
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            total_frames = max(0, total_frames - start_frame)
+        out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height)) \
+            if output_path else None
+        if self.sampler is not None:
+            self.sampler.reset(fps)
+        halt = threading.Event()
+
+        def stopped() -> bool:
+            return halt.is_set() or (stop_event is not None and stop_event.is_set())
+
+        decoded = queue.Queue(maxsize=self.queue_size)
+        inferred = queue.Queue(maxsize=self.queue_size)
+        errors: List[BaseException] = []
+        written = [0]
+        started = time.perf_counter()
+
+        def put(q: queue.Queue, item) -> bool:
+            while not stopped():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def decode():
+            try:
+                index = start_frame
+                while not stopped() and (end_frame is None or index < end_frame):
+                    with timed('decode'):
+                        ret, frame = cap.read()
+                    if not ret:
+                        break
+                    if not put(decoded, (index, frame)):
+                        break
+                    index += 1
+            except BaseException as e:
+                errors.append(e)
+                halt.set()
+            finally:
+                cap.release()
+                put(decoded, _END)
+
+        def encode():
+            last_detections: List[Dict] = []
+            try:
+                while True:
+                    item = inferred.get()
+                    if item is _END:
+                        break
+                    index, result = item
+                    frame, detections = result.result() if isinstance(result, Future) else result
+                    if detections is None:
+                        # Skipped by the sampler: reuse the latest detections for the overlay
+                        if out is not None and self.carry_forward is not None and last_detections:
+                            self.carry_forward(frame, last_detections)
+                    else:
+                        last_detections = detections
+                    if out is not None:
+                        with timed('encode'):
+                            out.write(frame)
+                    written[0] += 1
+                    if on_frame is not None:
+                        on_frame(index, detections)
+                    if on_progress is not None:
+                        on_progress(written[0], total_frames)
+            except BaseException as e:
+                errors.append(e)
+                halt.set()
+                # Drain so the inference stage is never blocked on a dead consumer
+                while inferred.get() is not _END:
+                    pass
+            finally:
+                if out is not None:
+                    out.release()
+
+        decoder = threading.Thread(target=decode, name='video-decoder', daemon=True)
+        encoder = threading.Thread(target=encode, name='video-encoder', daemon=True)
+        decoder.start()
+        encoder.start()
+        executor = ThreadPoolExecutor(self.inference_workers) if self.inference_workers > 1 else None
+        in_flight = deque()
+        try:
+            while True:
+                try:
+                    item = decoded.get(timeout=0.1)
+                except queue.Empty:
+                    if stopped() and not decoder.is_alive():
+                        break
+                    continue
+                if item is _END:
+                    break
+                index, frame = item
+                if self.sampler is not None and not self.sampler.should_detect(index, frame):
+                    result = (frame, None)
+                elif executor is not None:
+                    # Bound the number of frames in flight; the encoder resolves futures in order
+                    while len(in_flight) >= self.inference_workers:
+                        in_flight.popleft().result()
+                    future = executor.submit(self.process, index, frame)
+                    in_flight.append(future)
+                    result = future
+                else:
+                    result = self.process(index, frame)
+                if not put(inferred, (index, result)):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            halt.set()
+        finally:
+            inferred.put(_END)
+            encoder.join()
+            halt.set()
+            while decoder.is_alive():
+                try:
+                    decoded.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            decoder.join()
+            if executor is not None:
+                executor.shutdown(wait=True)
+        if errors:
+            raise errors[0]
+        return {
+            'frames': written[0],
+            'total_frames': total_frames,
+            'fps': fps,
+            'width': width,
+            'height': height,
+            'elapsed': time.perf_counter() - started,
+            'cancelled': stop_event is not None and stop_event.is_set(),
+            'sampling': self.sampler.stats() if self.sampler is not None else None,
+        }
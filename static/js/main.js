@@ -7,6 +7,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const previewSection = document.getElementById('previewSection');
     const resultImage = document.getElementById('resultImage');
     const resultVideo = document.getElementById('resultVideo');
+    const resultOverlay = document.getElementById('resultOverlay');
     const detectionLog = document.getElementById('detectionLog');
     const loadingSpinner = document.getElementById('loadingSpinner');
 
@@ -48,6 +49,8 @@ document.addEventListener('DOMContentLoaded', function() {
         const formData = new FormData();
         formData.append('file', file);
         formData.append('type', type);
+        // Ask for boxes only and draw them over the local file instead of downloading re-encoded media
+        formData.append('render', 'overlay');
         
         // Show preview
         const reader = new FileReader();
@@ -77,7 +80,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (data.error) {
                 throw new Error(data.error);
             }
-            showResults(data, type);
+            showResults(data, type, file);
         })
         .catch(error => {
             console.error('Error:', error);
@@ -86,7 +89,7 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    function showResults(data, type) {
+    function showResults(data, type, file) {
         resultSection.style.display = 'block';
         detectionLog.innerHTML = '';
         
@@ -102,8 +105,14 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (det.alert && det.alert.match(/\p{Emoji}/u)) {
                     emoji = det.alert.match(/\p{Emoji}/u)[0] + ' ';
                 }
+                // Video results are per-track summaries with first/last seen times in seconds
+                let seen = '';
+                if (det.track_id !== undefined) {
+                    seen = `<span class="log-time">#${det.track_id} ${det.first_seen.toFixed(1)}s–${det.last_seen.toFixed(1)}s</span>`;
+                }
                 logItem.innerHTML = `
                     <span class="log-label">${emoji}${label}</span>
+                    ${seen}
                     <span class="log-confidence">${(det.confidence * 100).toFixed(2)}%</span>
                 `;
                 detectionLog.appendChild(logItem);
@@ -112,6 +121,12 @@ document.addEventListener('DOMContentLoaded', function() {
             detectionLog.innerHTML = '<div class="no-detections">No animals detected</div>';
         }
         
+        stopOverlay();
+        if (data.render === 'overlay') {
+            showOverlay(data, type, file);
+            return;
+        }
+
         // Show the processed media with bounding boxes
         if (type === 'image' && data.image_url) {
             resultImage.src = data.image_url;
@@ -128,6 +143,99 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Overlay mode: the server returns boxes and the browser draws them over the original media
+    let overlayLoop = null;
+    let objectUrl = null;
+
+    function boxColor(category) {
+        if (category === 'large_mammals') return '#ff0000';
+        if (category === 'carnivores') return '#ffa500';
+        return '#00ff00';
+    }
+
+    function placeOverlay(media, width, height) {
+        // Resizing clears the canvas, so only do it when the displayed size changed
+        if (resultOverlay.width !== media.clientWidth || resultOverlay.height !== media.clientHeight) {
+            resultOverlay.width = media.clientWidth;
+            resultOverlay.height = media.clientHeight;
+        }
+        resultOverlay.style.left = media.offsetLeft + 'px';
+        resultOverlay.style.top = media.offsetTop + 'px';
+        return resultOverlay.width / width;
+    }
+
+    function drawBoxes(boxes, scale) {
+        const ctx = resultOverlay.getContext('2d');
+        ctx.clearRect(0, 0, resultOverlay.width, resultOverlay.height);
+        ctx.lineWidth = 2;
+        ctx.font = '14px sans-serif';
+        boxes.forEach(([x1, y1, x2, y2, confidence, label, category]) => {
+            ctx.strokeStyle = ctx.fillStyle = boxColor(category);
+            ctx.strokeRect(x1 * scale, y1 * scale, (x2 - x1) * scale, (y2 - y1) * scale);
+            ctx.fillText(`${label} ${confidence.toFixed(2)}`, x1 * scale, Math.max(12, y1 * scale - 4));
+        });
+    }
+
+    function stopOverlay() {
+        if (overlayLoop !== null) {
+            cancelAnimationFrame(overlayLoop);
+            overlayLoop = null;
+        }
+        if (objectUrl !== null) {
+            URL.revokeObjectURL(objectUrl);
+            objectUrl = null;
+        }
+        resultOverlay.style.display = 'none';
+    }
+
+    function showOverlay(data, type, file) {
+        objectUrl = URL.createObjectURL(file);
+        if (type === 'image') {
+            const boxes = (data.detections || []).map(det => {
+                const name = (det.class && det.class.name) || det.class || 'animal';
+                const category = det.class && det.class.category;
+                return [...det.bbox, det.confidence, name.replace(/_/g, ' '), category];
+            });
+            resultImage.onload = function() {
+                resultOverlay.style.display = 'block';
+                drawBoxes(boxes, placeOverlay(resultImage, data.width, data.height));
+            };
+            resultImage.src = objectUrl;
+            resultImage.style.display = 'block';
+            resultVideo.style.display = 'none';
+            return;
+        }
+        resultVideo.innerHTML = '';
+        resultVideo.src = objectUrl;
+        resultVideo.style.display = 'block';
+        resultImage.style.display = 'none';
+        fetch(data.overlay_url)
+            .then(response => response.json())
+            .then(overlay => {
+                const indices = overlay.frames.map(entry => entry[0]);
+                resultOverlay.style.display = 'block';
+                let shown = -1;
+                const render = function() {
+                    // Boxes from the latest inferred frame at or before the current playback position
+                    const frame = Math.floor(resultVideo.currentTime * overlay.fps);
+                    let lo = 0, hi = indices.length - 1, found = -1;
+                    while (lo <= hi) {
+                        const mid = (lo + hi) >> 1;
+                        if (indices[mid] <= frame) { found = mid; lo = mid + 1; } else { hi = mid - 1; }
+                    }
+                    const scale = placeOverlay(resultVideo, overlay.width, overlay.height);
+                    if (found !== shown || resultOverlay.dataset.scale !== String(scale)) {
+                        drawBoxes(found >= 0 ? overlay.frames[found][1] : [], scale);
+                        shown = found;
+                        resultOverlay.dataset.scale = String(scale);
+                    }
+                    overlayLoop = requestAnimationFrame(render);
+                };
+                render();
+            })
+            .catch(error => console.error('Error loading overlay:', error));
+    }
+
     function showLoading(show) {
         if (show) {
             loadingSpinner.style.display = 'block';
@@ -0,0 +1,87 @@
+import json
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+
+from src.services.bulk_ingest import BulkIngestor, iter_items
+
+
+class FakeDetector:
+    """Stands in for AnimalDetector: no detections, and optionally fails after a number of batches."""
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.batches = 0
+
+    def detect_frames(self, frames):
+        if self.fail_after is not None and self.batches >= self.fail_after:
+            raise KeyboardInterrupt  # Simulates the run being interrupted
+        self.batches += 1
+        return [[] for _ in frames]
+
+
+def _jpeg(seed=0) -> bytes:
+    img = np.full((32, 48, 3), seed * 20 % 255, dtype=np.uint8)
+    return cv2.imencode('.jpg', img)[1].tobytes()
+
+
+def _rows(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_empty_and_corrupt_files_become_error_rows(tmp_path):
+    folder = tmp_path / 'images'
+    folder.mkdir()
+    (folder / 'a.jpg').write_bytes(_jpeg())
+    (folder / 'b.jpg').write_bytes(b'')
+    (folder / 'c.jpg').write_bytes(_jpeg()[:20])
+    output = tmp_path / 'out.jsonl'
+
+    stats = BulkIngestor(FakeDetector(), str(output), batch_size=2).run([str(folder)])
+
+    assert stats['images'] == 3
+    assert stats['errors'] == 2
+    rows = {row['key'].rsplit('/', 1)[-1]: row for row in _rows(output)}
+    assert rows['a.jpg']['error'] is None and rows['a.jpg']['width'] == 48
+    assert rows['b.jpg']['error'] == 'Empty file'
+    assert rows['c.jpg']['error'] is not None
+
+
+def test_resume_skips_archive_members_without_reading_them(tmp_path, monkeypatch):
+    archive = tmp_path / 'season.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for i in range(10):
+            zf.writestr(f'img{i:02d}.jpg', _jpeg(i))
+    output = tmp_path / 'out.jsonl'
+
+    with pytest.raises(KeyboardInterrupt):
+        BulkIngestor(FakeDetector(fail_after=3), str(output), batch_size=2, decode_threads=1,
+                     checkpoint_every=2).run([str(archive)])
+
+    read = []
+    original_read = zipfile.ZipFile.read
+    monkeypatch.setattr(zipfile.ZipFile, 'read',
+                        lambda self, name, pwd=None: read.append(getattr(name, 'filename', name))
+                        or original_read(self, name, pwd))
+    stats = BulkIngestor(FakeDetector(), str(output), batch_size=2, decode_threads=1,
+                         checkpoint_every=2).run([str(archive)])
+
+    assert stats['resumed_from'] == 6
+    assert read == [f'img{i:02d}.jpg' for i in range(6, 10)]
+    keys = [row['key'].rsplit('::', 1)[-1] for row in _rows(output)]
+    assert keys == [f'img{i:02d}.jpg' for i in range(10)]
+
+
+def test_iter_items_skip_counts_across_inputs(tmp_path):
+    folder = tmp_path / 'images'
+    folder.mkdir()
+    for i in range(3):
+        (folder / f'{i}.jpg').write_bytes(_jpeg(i))
+    single = tmp_path / 'single.jpg'
+    single.write_bytes(_jpeg())
+
+    keys = [key for key, _ in iter_items([str(folder), str(single)], skip=2)]
+
+    assert keys == [str(folder / '2.jpg'), str(single)]
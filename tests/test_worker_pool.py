@@ -0,0 +1,69 @@
+import queue
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from src.services.worker_pool import InferenceWorkerPool
+
+
+class FakePool(InferenceWorkerPool):
+    """An InferenceWorkerPool without worker processes; submitted jobs resolve from a script of outcomes."""
+    def __init__(self, slots, outcomes):
+        self._slots = [None] * slots
+        self._free_slots = queue.Queue()
+        for index in range(slots):
+            self._free_slots.put(index)
+        self.task_timeout = 1.0
+        self._completed = 0
+        self._failed = 0
+        self.outcomes = list(outcomes)
+
+    def _submit(self, method, frame):
+        try:
+            slot_index = self._free_slots.get_nowait()
+        except queue.Empty:
+            raise RuntimeError("No free inference slot")
+        outcome = self.outcomes.pop(0)
+        if outcome == 'submit-error':
+            self._free_slots.put(slot_index)
+            raise RuntimeError("Submit failed")
+        future = Future()
+        if isinstance(outcome, Exception):
+            future.set_exception(outcome)
+        else:
+            future.set_result(outcome)
+        return future, None, slot_index
+
+
+def _images(count):
+    return [np.zeros((8, 8, 3), dtype=np.uint8)] * count
+
+
+def test_detect_batch_returns_results_in_order():
+    pool = FakePool(4, [[{'n': i}] for i in range(6)])
+    assert pool.detect_batch(_images(6)) == [[{'n': i}] for i in range(6)]
+    assert pool._free_slots.qsize() == 4
+
+
+def test_failed_future_returns_every_slot():
+    pool = FakePool(4, [[], RuntimeError("Worker error"), [], []] * 3)
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match="Worker error"):
+            pool.detect_batch(_images(4))
+        assert pool._free_slots.qsize() == 4
+    assert pool._failed == 3
+
+
+def test_submit_failure_returns_slots_already_submitted():
+    pool = FakePool(4, [[], [], 'submit-error'])
+    with pytest.raises(RuntimeError, match="Submit failed"):
+        pool.detect_batch(_images(4))
+    assert pool._free_slots.qsize() == 4
+
+
+def test_bad_image_returns_slots_already_submitted():
+    pool = FakePool(4, [[], []])
+    with pytest.raises(ValueError, match="Image 2"):
+        pool.detect_batch(_images(2) + [b'not an image'])
+    assert pool._free_slots.qsize() == 4